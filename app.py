@@ -1,8 +1,13 @@
-import streamlit as st
 import os
 import tempfile
-from classes import ParserSQL
-from classes.grafos import gerar_grafos_otimizados
+import time
+
+import streamlit as st
+from classes import CachePlanos
+from classes.explicacao import FATOR_DESVIO
+from classes.grafos import construir_grafos, renderizar_grafos
+from classes.lexer import normalizar_espacos
+from classes.perfil import perfilar
 
 # Configuração da página
 st.set_page_config(
@@ -72,6 +77,113 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Análise e grafos memorizados por consulta (texto com os espaços normalizados).
+# Tudo fica em memória: nada de diretório temporário nem os.chdir, que é
+# global ao processo e misturaria as sessões de usuários simultâneos.
+
+@st.cache_resource
+def _cache_planos():
+    """Cache de planos compartilhado por todas as sessões (seguro entre threads)."""
+    return CachePlanos(capacidade=4096)
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def analisar_consulta(sql):
+    """
+    Componentes e álgebra relacional da consulta (None se inválida) e o
+    perfil das etapas que os produziram.
+    """
+    with perfilar() as perfil:
+        parser = _cache_planos().analisar(sql)
+        if not parser.eh_valido():
+            return None
+        analise = {
+            'components': parser.get_components(),
+            'ra_original': parser.to_rel_algebra(),
+            'ra_otimizada': parser.otimizar_algebra_relacional(),
+            'avisos': parser.avisos(),
+        }
+    analise['perfil'] = perfil.para_dict()
+    return analise
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def grafos_svg(sql):
+    """
+    Os três grafos da consulta em SVG (texto), na ordem literal, tuplas,
+    atributos, e o perfil da construção e do desenho.
+    """
+    with perfilar() as perfil:
+        grafos = construir_grafos(_cache_planos().analisar(sql))
+        svgs = renderizar_grafos(grafos, "svg") if grafos is not None else []
+    return svgs, perfil.para_dict()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def explicar_consulta(sql, arquivos, coletar_estatisticas):
+    """
+    EXPLAIN ANALYZE da consulta sobre os `arquivos` enviados ((nome, bytes),
+    cada um vira a tabela com o nome do arquivo sem a extensão): os
+    operadores dos dois planos, o grafo otimizado anotado em SVG e o erro
+    de execução, se houver.
+    """
+    from classes.executor import BancoDados, ErroExecucao
+    from classes.estatisticas import CatalogoEstatisticas
+
+    banco = BancoDados()
+    # Os arquivos só existem durante a carga: as tabelas ficam em memória
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, conteudo in arquivos:
+            with open(os.path.join(pasta, nome), 'wb') as f:
+                f.write(conteudo)
+        for nome in banco.registrar_pasta(pasta):
+            banco.registrar(nome, banco.tabela(nome).carregar())
+
+    parser = _cache_planos().analisar(sql)
+    if coletar_estatisticas:
+        parser.usar_estatisticas(CatalogoEstatisticas.de_banco(banco))
+    try:
+        explicacao = parser.explicar(banco)
+    except ErroExecucao as erro:
+        return {'erro': str(erro)}
+    grafos = construir_grafos(parser, banco=banco, explicacao=explicacao)
+    resultado = explicacao.para_dict()
+    resultado['svg'] = renderizar_grafos(grafos[1:2], "svg")[0]
+    return resultado
+
+
+def _mostrar_operadores(titulo, plano):
+    st.markdown(f"**{titulo}** – {plano['tempo_ms']:.2f} ms")
+    st.dataframe(
+        [{'': '⚠️' if op['discrepante'] else '',
+          'operador': '\u2003' * op['profundidade'] + op['operador'],
+          'linhas': op['linhas'], 'bytes/linha': op['largura_bytes'], 'ms': round(op['tempo_ms'], 3),
+          'estimadas': None if op['estimadas'] is None else round(op['estimadas']),
+          'erro': None if op['erro'] is None else round(op['erro'], 1)}
+         for op in plano['operadores']],
+        hide_index=True,
+    )
+    if plano['filtros']:
+        st.caption("Filtros de Bloom: linhas eliminadas na varredura antes das junções")
+        st.dataframe(
+            [{'filtro': f['filtro'], 'testadas': f['testadas'], 'eliminadas': f['eliminadas'],
+              'bytes': f['bytes'], 'ms': round(f['tempo_ms'], 3)}
+             for f in plano['filtros']],
+            hide_index=True,
+        )
+
+
+def _mostrar_perfil(titulo, perfil):
+    st.markdown(f"**{titulo}** – {perfil['total_ms']:.2f} ms")
+    st.dataframe(
+        [{'etapa': '\u2003' * e['profundidade'] + e['nome'], 'ms': round(e['tempo_ms'], 3), 'blocos': e['blocos']}
+         for e in perfil['etapas']],
+        hide_index=True,
+    )
+    if perfil['contadores'] or perfil['medidas']:
+        st.json({'contadores': perfil['contadores'], 'medidas': perfil['medidas']}, expanded=False)
+
+
 # Título e descrição
 st.title("🔍 Processador SQL - Otimizador de Consultas")
 st.markdown("""
@@ -137,6 +249,14 @@ query_input = st.text_area(
     label_visibility="collapsed"
 )
 
+with st.expander("📂 Dados para o Explain analyze (opcional)"):
+    arquivos_enviados = st.file_uploader(
+        "Tabelas em CSV ou JSON lines (o nome do arquivo, sem a extensão, é o nome da tabela)",
+        type=["csv", "jsonl", "ndjson"], accept_multiple_files=True,
+    )
+    coletar_estatisticas = st.checkbox(
+        "Coletar estatísticas dos dados (mostra as linhas estimadas ao lado das reais)", value=True)
+
 # Botão de análise
 col1, col2, col3 = st.columns([1, 1, 3])
 with col1:
@@ -151,14 +271,17 @@ if limpar:
 # Processamento da query
 if analisar and query_input.strip():
     with st.spinner("Analisando consulta..."):
-        parser = ParserSQL(query_input)
+        sql = normalizar_espacos(query_input)
+        inicio = time.perf_counter()
+        analise = analisar_consulta(sql)
+        tempo_analise = time.perf_counter() - inicio
         
-        if parser.eh_valido():
+        if analise is not None:
             st.success("✅ Consulta SQL válida!")
             
             # Componentes da query
             st.header("📦 Componentes da Consulta")
-            components = parser.get_components()
+            components = analise['components']
             
             col1, col2 = st.columns(2)
             
@@ -195,51 +318,64 @@ if analisar and query_input.strip():
             
             with col1:
                 st.subheader("Original")
-                ra_original = parser.to_rel_algebra()
+                ra_original = analise['ra_original']
                 if ra_original:
                     st.markdown(f'<div class="algebra-expr">{ra_original}</div>', unsafe_allow_html=True)
             
             with col2:
                 st.subheader("Otimizada")
-                ra_otimizada = parser.otimizar_algebra_relacional()
+                ra_otimizada = analise['ra_otimizada']
                 if ra_otimizada:
                     st.markdown(f'<div class="algebra-expr">{ra_otimizada}</div>', unsafe_allow_html=True)
+
+            for aviso in analise['avisos']:
+                st.warning(f"⚠️ {aviso}")
             
             # Gerar grafos
             st.header("📊 Grafos de Otimização")
             
             with st.spinner("Gerando grafos..."):
-                # Criar diretório temporário para os grafos
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    # Mudar para o diretório temporário
-                    old_dir = os.getcwd()
-                    os.chdir(tmpdir)
-                    
-                    # Gerar grafos
-                    gerar_grafos_otimizados(query_input, "query_temp")
-                    
-                    # Exibir grafos
-                    grafos_dir = os.path.join(tmpdir, "grafos")
-                    if os.path.exists(grafos_dir):
-                        tabs = st.tabs(["🔷 Grafo Literal", "🔸 Redução de Tuplas", "🔹 Redução de Atributos"])
-                        
-                        grafos = [
-                            ("query_temp_literal.png", "Grafo Literal - Ordem exata da query SQL"),
-                            ("query_temp_tuplas.png", "Redução de Tuplas - Seleções aplicadas precocemente"),
-                            ("query_temp_atributos.png", "Redução de Atributos - Projeções aplicadas precocemente")
-                        ]
-                        
-                        for tab, (grafo_file, descricao) in zip(tabs, grafos):
-                            with tab:
-                                grafo_path = os.path.join(grafos_dir, grafo_file)
-                                if os.path.exists(grafo_path):
-                                    st.markdown(f"**{descricao}**")
-                                    st.image(grafo_path, use_container_width=True)
-                                else:
-                                    st.warning(f"Grafo não encontrado: {grafo_file}")
-                    
-                    # Voltar para o diretório original
-                    os.chdir(old_dir)
+                tabs = st.tabs(["🔷 Grafo Literal", "🔸 Redução de Tuplas", "🔹 Redução de Atributos",
+                                "🔬 Explain analyze"])
+                descricoes = [
+                    "Grafo Literal - Ordem exata da query SQL",
+                    "Redução de Tuplas - Seleções aplicadas precocemente",
+                    "Redução de Atributos - Projeções aplicadas precocemente",
+                ]
+                inicio = time.perf_counter()
+                svgs, perfil_grafos = grafos_svg(sql)
+                tempo_grafos = time.perf_counter() - inicio
+                for tab, descricao, svg in zip(tabs, descricoes, svgs):
+                    with tab:
+                        st.markdown(f"**{descricao}**")
+                        st.image(svg, use_container_width=True)
+                with tabs[3]:
+                    if not arquivos_enviados:
+                        st.info("Envie as tabelas da consulta em \"Dados para o Explain analyze\" "
+                                "para executá-la e comparar as linhas reais com as estimadas.")
+                    else:
+                        arquivos = tuple((a.name, a.getvalue()) for a in arquivos_enviados)
+                        explicacao = explicar_consulta(sql, arquivos, coletar_estatisticas)
+                        if 'erro' in explicacao:
+                            st.error(f"❌ Não foi possível executar a consulta: {explicacao['erro']}")
+                        else:
+                            st.markdown(
+                                f"**{explicacao['linhas_resultado']:,} linhas no resultado** – plano "
+                                f"otimizado {explicacao['aceleracao']:.2f}x mais rápido que o literal. "
+                                f"⚠️ marca os operadores cuja estimativa errou por {FATOR_DESVIO}x ou mais.")
+                            _mostrar_operadores("Plano otimizado", explicacao['otimizado'])
+                            _mostrar_operadores("Plano literal", explicacao['literal'])
+                            st.image(explicacao['svg'], use_container_width=True)
+            
+            # Tempo de cada etapa (perfis gravados junto com o resultado em cache)
+            with st.expander("⏱️ Explain timing – tempo por etapa"):
+                st.caption(
+                    f"Nesta execução: análise {tempo_analise * 1e3:.2f} ms, grafos {tempo_grafos * 1e3:.2f} ms. "
+                    "Os perfis abaixo são da primeira vez que a consulta foi processada; "
+                    "depois disso o resultado vem do cache."
+                )
+                _mostrar_perfil("Análise (parse, álgebra, otimização)", analise['perfil'])
+                _mostrar_perfil("Grafos (construção e desenho SVG)", perfil_grafos)
             
             # Explicação das otimizações
             with st.expander("ℹ️ Sobre as Heurísticas de Otimização"):
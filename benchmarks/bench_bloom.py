@@ -0,0 +1,54 @@
+"""
+Benchmark das semijunções por filtro de Bloom (ver `classes.bloom`): a mesma
+consulta estrela de `bench_paralelo`, com dimensões filtradas, executada com
+e sem os filtros, e as linhas que cada filtro eliminou da tabela de fatos.
+
+Uso:
+    python -m benchmarks.bench_bloom [linhas_vendas] [repeticoes]
+"""
+import sys
+
+from classes import ParserSQL
+from classes.estatisticas import CatalogoEstatisticas, EstimadorEstatisticas
+from classes.executor import executar
+
+from .bench_paralelo import banco_estrela
+
+CONSULTAS = [
+    "SELECT v.idVenda, c.Nome FROM Vendas v "
+    "INNER JOIN Cliente c ON v.Cliente_idCliente = c.idCliente "
+    "WHERE c.Nome = 'Joao'",
+
+    "SELECT v.idVenda, c.Nome, l.cidade FROM Vendas v "
+    "INNER JOIN Cliente c ON v.Cliente_idCliente = c.idCliente "
+    "INNER JOIN Produto p ON v.Produto_idProduto = p.idProduto "
+    "INNER JOIN Loja l ON v.Loja_idLoja = l.idLoja "
+    "INNER JOIN Data d ON v.Data_idData = d.idData "
+    "WHERE c.Nome = 'Joao' AND l.cidade = 'Recife' AND d.ano >= 2023",
+]
+
+
+def _melhor(plano, banco, estimador, bloom, repeticoes):
+    # workers=1: só os filtros mudam entre as duas medidas
+    return min((executar(plano, banco, estimador, workers=1, bloom=bloom) for _ in range(repeticoes)),
+               key=lambda r: r.tempo_total)
+
+
+def main(linhas=1_000_000, repeticoes=3):
+    banco = banco_estrela(linhas)
+    catalogo = CatalogoEstatisticas.de_banco(banco, amostra=100_000)
+    for sql in CONSULTAS:
+        plano = ParserSQL(sql).usar_estatisticas(catalogo).plano_otimizado()
+        estimador = EstimadorEstatisticas(catalogo)
+        com = _melhor(plano, banco, estimador, True, repeticoes)
+        sem = _melhor(plano, banco, estimador, False, repeticoes)
+        print(f"\n{sql}")
+        print(f"  sem filtros {sem.tempo_total * 1e3:9.1f} ms   com filtros {com.tempo_total * 1e3:9.1f} ms"
+              f"   {sem.tempo_total / com.tempo_total:5.2f}x   ({len(com.linhas):,} linhas)")
+        for f in com.filtros:
+            print(f"    {f.filtro:<44} {f.eliminadas:>11,} de {f.testadas:>11,} eliminadas"
+                  f"  ({f.bytes:,} B, {f.tempo * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,50 @@
+"""
+Benchmark do formato colunar: as tabelas do bench_execucao em CSV e
+convertidas para o formato colunar, com as consultas executadas várias
+vezes sobre cada um.
+
+Uso:
+    python -m benchmarks.bench_colunar [n_pedidos] [repeticoes]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from classes import ParserSQL
+from classes.colunar import csv_para_colunar
+from classes.executor import BancoDados
+from benchmarks.bench_execucao import CONSULTAS, banco_sintetico
+from benchmarks.bench_varredura import gravar
+
+
+def main(n_pedidos=200000, repeticoes=5):
+    banco = banco_sintetico(n_pedidos)
+    with tempfile.TemporaryDirectory() as pasta:
+        em_csv = gravar(banco, pasta, 'csv')
+
+        inicio = time.perf_counter()
+        colunar = BancoDados()
+        for nome in banco.tabelas:
+            destino = os.path.join(pasta, nome)
+            csv_para_colunar(os.path.join(pasta, f"{nome}.csv"), destino)
+            colunar.registrar_colunar(nome, destino)
+        print(f"conversão CSV -> colunar: {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+        for sql in CONSULTAS:
+            parser = ParserSQL(sql)
+            esperado = sorted(parser.executar(banco).linhas)
+            print(f"\n{sql}")
+            for nome, fonte in (("memória", banco), ("csv", em_csv), ("colunar", colunar)):
+                tempos = []
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    resultado = parser.executar(fonte)
+                    tempos.append(time.perf_counter() - inicio)
+                if sorted(resultado.linhas) != esperado:
+                    raise AssertionError(f"Resultado diferente do executor em memória ({nome}): {sql}")
+                print(f"  {nome:<8} melhor {min(tempos) * 1e3:8.1f} ms   média {sum(tempos) / len(tempos) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,159 @@
+"""
+Benchmark por etapa sobre um corpus gerado (benchmarks.gerador): cada
+consulta passa por parse, to_rel_algebra, otimizar_algebra_relacional,
+construção e desenho dos grafos, e cada etapa é cronometrada à parte. As
+inválidas só passam pelo parse (o caminho de rejeição).
+
+O resultado sai em JSON, com vazão e percentis de latência por etapa; com
+--comparar, cada etapa é comparada com um JSON gravado antes (de outro
+commit, por exemplo) usando a mesma semente.
+
+Uso:
+    python -m benchmarks.bench_etapas [--consultas N] [--invalidas N] [--semente S]
+                                      [--juncoes MIN MAX] [--condicoes MIN MAX]
+                                      [--formato svg|dot|png] [--saida arq.json]
+                                      [--comparar base.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from classes import ParserSQL
+from classes.grafos import FORMATOS, construir_grafos, renderizar_grafos
+from benchmarks.gerador import PADRAO, gerar_corpus
+
+ETAPAS = ('parse', 'algebra', 'otimizacao', 'grafos', 'desenho', 'parse_invalida')
+PERCENTIS = (50, 90, 95, 99)
+
+
+def _percentil(ordenados, p):
+    """Percentil pelo posto mais próximo de uma lista já ordenada."""
+    k = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[k]
+
+
+def resumir(tempos) -> dict:
+    """Vazão e latências (em µs) de uma lista de tempos em segundos."""
+    if not tempos:
+        return {'n': 0}
+    ordenados = sorted(tempos)
+    total = sum(ordenados)
+    resumo = {
+        'n': len(ordenados),
+        'total_s': round(total, 6),
+        'vazao_por_s': round(len(ordenados) / total, 1) if total else None,
+        'media_us': round(total / len(ordenados) * 1e6, 2),
+    }
+    for p in PERCENTIS:
+        resumo[f'p{p}_us'] = round(_percentil(ordenados, p) * 1e6, 2)
+    resumo['max_us'] = round(ordenados[-1] * 1e6, 2)
+    return resumo
+
+
+def medir(validas, invalidas, formato='svg'):
+    """Tempos (s) de cada etapa, uma entrada por consulta."""
+    tempos = {etapa: [] for etapa in ETAPAS}
+    relogio = time.perf_counter
+    for sql in validas:
+        # Cada etapa reaproveita o que a anterior deixou no parser, então
+        # o tempo medido é só o trabalho novo dela
+        inicio = relogio()
+        parser = ParserSQL(sql)
+        if not parser.parse():
+            raise AssertionError(f"O gerador produziu uma consulta inválida: {sql}")
+        t1 = relogio()
+        parser.to_rel_algebra()
+        t2 = relogio()
+        parser.otimizar_algebra_relacional()
+        t3 = relogio()
+        grafos = construir_grafos(parser)
+        t4 = relogio()
+        renderizar_grafos(grafos, formato)
+        t5 = relogio()
+        tempos['parse'].append(t1 - inicio)
+        tempos['algebra'].append(t2 - t1)
+        tempos['otimizacao'].append(t3 - t2)
+        tempos['grafos'].append(t4 - t3)
+        tempos['desenho'].append(t5 - t4)
+
+    for sql in invalidas:
+        inicio = relogio()
+        valida = ParserSQL(sql).parse()
+        tempos['parse_invalida'].append(relogio() - inicio)
+        if valida:
+            raise AssertionError(f"O gerador produziu uma inválida que o parser aceita: {sql}")
+    return tempos
+
+
+def _commit():
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, base):
+    """Razão da latência p50/p99 e da vazão de cada etapa contra um resultado anterior."""
+    linhas = []
+    for etapa in ETAPAS:
+        a, b = atual['etapas'].get(etapa, {}), base['etapas'].get(etapa, {})
+        if not a.get('n') or not b.get('n'):
+            continue
+        linhas.append(
+            f"{etapa:<15} p50 {a['p50_us'] / b['p50_us']:6.2f}x   p99 {a['p99_us'] / b['p99_us']:6.2f}x   "
+            f"vazão {a['vazao_por_s'] / b['vazao_por_s']:6.2f}x"
+        )
+    return '\n'.join(linhas)
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--consultas', type=int, default=2000)
+    args.add_argument('--invalidas', type=int, default=500)
+    args.add_argument('--semente', type=int, default=42)
+    args.add_argument('--juncoes', type=int, nargs=2, default=PADRAO.juncoes, metavar=('MIN', 'MAX'))
+    args.add_argument('--condicoes', type=int, nargs=2, default=PADRAO.condicoes, metavar=('MIN', 'MAX'))
+    args.add_argument('--colunas', type=int, nargs=2, default=PADRAO.colunas, metavar=('MIN', 'MAX'))
+    args.add_argument('--prob-alias', type=float, default=PADRAO.prob_alias)
+    args.add_argument('--formato', choices=FORMATOS, default='svg')
+    args.add_argument('--aquecimento', type=int, default=50, help="consultas rodadas antes de medir")
+    args.add_argument('--saida', help="grava o JSON neste arquivo (padrão: só imprime)")
+    args.add_argument('--comparar', help="JSON de uma medição anterior")
+    args = args.parse_args(argv)
+
+    parametros = PADRAO._replace(
+        juncoes=tuple(args.juncoes), condicoes=tuple(args.condicoes),
+        colunas=tuple(args.colunas), prob_alias=args.prob_alias,
+    )
+    validas, invalidas = gerar_corpus(args.consultas, args.semente, parametros, args.invalidas)
+    medir(validas[:args.aquecimento], invalidas[:args.aquecimento], args.formato)
+    tempos = medir(validas, invalidas, args.formato)
+
+    resultado = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'semente': args.semente,
+        'parametros': parametros._asdict(),
+        'formato': args.formato,
+        'etapas': {etapa: resumir(t) for etapa, t in tempos.items()},
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('semente') != resultado['semente'] or base.get('parametros') != json.loads(json.dumps(resultado['parametros'])):
+            print("aviso: corpus diferente do da medição base", file=sys.stderr)
+        print(comparar(resultado, base), file=sys.stderr)
+    return resultado
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark do executor: plano literal x plano otimizado sobre dados sintéticos
+no esquema de exemplo (Pedido, Cliente, Status).
+
+Uso:
+    python -m benchmarks.bench_execucao [n_pedidos] [repeticoes]
+"""
+import random
+import sys
+
+from classes import ParserSQL
+from classes.executor import BancoDados
+
+NOMES = ['Joao', 'Maria', 'Ana', 'Pedro', 'Lucas', 'Julia', 'Carla', 'Bruno']
+
+CONSULTAS = [
+    "SELECT p.idPedido, c.Nome FROM Pedido p "
+    "INNER JOIN Cliente c ON p.Cliente_idCliente = c.idCliente "
+    "INNER JOIN Status s ON p.Status_idStatus = s.idStatus "
+    "WHERE c.Nome = 'Joao' AND s.idStatus >= 2",
+
+    "SELECT p.idPedido, p.valor FROM Pedido p "
+    "INNER JOIN Cliente c ON p.Cliente_idCliente = c.idCliente "
+    "WHERE p.valor > 900 AND c.idade < 30",
+
+    "SELECT c.Nome, s.descricao FROM Cliente c "
+    "INNER JOIN Pedido p ON p.Cliente_idCliente = c.idCliente "
+    "INNER JOIN Status s ON p.Status_idStatus = s.idStatus "
+    "WHERE s.descricao = 'entregue'",
+]
+
+
+def banco_sintetico(n_pedidos, semente=42):
+    rnd = random.Random(semente)
+    n_clientes = max(1, n_pedidos // 10)
+    banco = BancoDados()
+    banco.registrar('Cliente', {
+        'idCliente': list(range(n_clientes)),
+        'Nome': [rnd.choice(NOMES) for _ in range(n_clientes)],
+        'idade': [rnd.randint(18, 80) for _ in range(n_clientes)],
+    })
+    banco.registrar('Status', {
+        'idStatus': [0, 1, 2, 3, 4],
+        'descricao': ['novo', 'pago', 'enviado', 'entregue', 'cancelado'],
+    })
+    banco.registrar('Pedido', {
+        'idPedido': list(range(n_pedidos)),
+        'Cliente_idCliente': [rnd.randrange(n_clientes) for _ in range(n_pedidos)],
+        'Status_idStatus': [rnd.randrange(5) for _ in range(n_pedidos)],
+        'valor': [rnd.randint(1, 1000) for _ in range(n_pedidos)],
+    })
+    return banco
+
+
+def _melhor(parser, banco, otimizado, repeticoes):
+    return min((parser.executar(banco, otimizado) for _ in range(repeticoes)),
+               key=lambda r: r.tempo_total)
+
+
+def _imprimir_operadores(resultado):
+    for op in resultado.operadores:
+        print(f"    {'  ' * op.profundidade}{op.operador:<50.50} {op.linhas:>9,} linhas  {op.tempo * 1e3:8.2f} ms")
+
+
+def main(n_pedidos=200000, repeticoes=3):
+    banco = banco_sintetico(n_pedidos)
+    for sql in CONSULTAS:
+        parser = ParserSQL(sql)
+        literal = _melhor(parser, banco, False, repeticoes)
+        otimizado = _melhor(parser, banco, True, repeticoes)
+        if sorted(literal.linhas) != sorted(otimizado.linhas):
+            raise AssertionError(f"Resultados diferentes para: {sql}")
+
+        print(f"\n{sql}")
+        print(f"  {len(otimizado.linhas):,} linhas no resultado")
+        print(f"  literal:   {literal.tempo_total * 1e3:8.2f} ms")
+        _imprimir_operadores(literal)
+        print(f"  otimizado: {otimizado.tempo_total * 1e3:8.2f} ms  "
+              f"({literal.tempo_total / otimizado.tempo_total:.2f}x)")
+        _imprimir_operadores(otimizado)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,33 @@
+"""
+Benchmark do desenho dos grafos: os três grafos de uma consulta com 6
+junções em SVG, DOT e PNG (matplotlib).
+
+Uso:
+    python -m benchmarks.bench_grafos [repeticoes]
+"""
+import sys
+import time
+
+from classes.grafos import construir_grafos, renderizar
+
+CONSULTA = (
+    "SELECT a.x, g.y FROM A a INNER JOIN B b ON a.id = b.a_id INNER JOIN C c ON b.id = c.b_id "
+    "INNER JOIN D d ON c.id = d.c_id INNER JOIN E e ON d.id = e.d_id INNER JOIN F f ON e.id = f.e_id "
+    "INNER JOIN G g ON f.id = g.f_id WHERE a.x > 3 AND g.y = 'k' AND c.z <> 2"
+)
+
+
+def main(repeticoes=20):
+    for formato in ('svg', 'dot', 'png'):
+        n = repeticoes if formato != 'png' else max(1, repeticoes // 10)
+        tempos = []
+        for _ in range(n):
+            inicio = time.perf_counter()
+            for _, titulo, G in construir_grafos(CONSULTA):
+                renderizar(G, titulo, formato)
+            tempos.append(time.perf_counter() - inicio)
+        print(f"{formato:<4} melhor {min(tempos) * 1e3:8.1f} ms   média {sum(tempos) / len(tempos) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
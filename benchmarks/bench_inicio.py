@@ -0,0 +1,67 @@
+"""
+Benchmark do tempo de subida: processos novos rodando a CLI
+(`python -m classes`) para validar, otimizar e desenhar uma consulta,
+comparados com um interpretador vazio. Também confere que validar e
+otimizar não importam networkx, matplotlib nem NumPy.
+
+Uso:
+    python -m benchmarks.bench_inicio [repeticoes]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CONSULTA = ("SELECT p.idPedido, c.Nome FROM Pedido p INNER JOIN Cliente c ON p.Cliente_idCliente = c.idCliente "
+            "WHERE c.Nome = 'Joao' AND p.valor > 100")
+
+PESADOS = ('numpy', 'networkx', 'matplotlib')
+
+
+def _cronometrar(comando, repeticoes, ambiente):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(comando, check=True, stdout=subprocess.DEVNULL, env=ambiente)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _modulos_pesados(comando, ambiente):
+    """Módulos pesados carregados ao rodar o comando da CLI no processo filho."""
+    codigo = (
+        "import sys, contextlib, io\n"
+        "from classes.cli import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    main({comando!r})\n"
+        f"print(' '.join(m for m in {PESADOS!r} if m in sys.modules))\n"
+    )
+    saida = subprocess.run([sys.executable, '-c', codigo], check=True, capture_output=True, text=True, env=ambiente)
+    return saida.stdout.split()
+
+
+def main(repeticoes=10):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, PYTHONPATH=raiz + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    cli = [sys.executable, '-m', 'classes']
+
+    for comando in (['validar', CONSULTA], ['otimizar', CONSULTA]):
+        pesados = _modulos_pesados(comando, ambiente)
+        if pesados:
+            raise AssertionError(f"'{comando[0]}' importou {', '.join(pesados)}")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, comando in (
+            ("python vazio", [sys.executable, '-c', 'pass']),
+            ("validar", cli + ['validar', CONSULTA]),
+            ("otimizar", cli + ['otimizar', CONSULTA]),
+            ("grafo svg", cli + ['grafo', '--pasta', pasta, CONSULTA]),
+        ):
+            tempos = _cronometrar(comando, repeticoes, ambiente)
+            print(f"{nome:<14} melhor {min(tempos) * 1e3:8.1f} ms   mediana {statistics.median(tempos) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
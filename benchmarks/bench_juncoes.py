@@ -0,0 +1,81 @@
+"""
+Benchmark dos algoritmos de junção (ver `classes.fisico`): o mesmo ⨝ por
+hash join, sort-merge join e block nested loop, com entradas em ordem pela
+chave ou embaralhadas, e um ⨝ sem igualdade (a.x < b.y), que só o nested
+loop resolve. Mostra também o algoritmo que o plano escolheria.
+
+Uso:
+    python -m benchmarks.bench_juncoes [linhas]
+"""
+import random
+import sys
+import time
+
+from classes.executor import RelacaoMemoria, _como_coluna, _juntar
+from classes.fisico import HASH_JOIN, MERGE_JOIN, NESTED_LOOP, ORDEM_TABELA, JuncaoFisica, escolher_juncoes
+from classes.plano import Coluna, Juncao, Relacao, Renomear, predicado_de_texto
+
+CHAVE = (Coluna('a', 'id'), Coluna('b', 'aid'))
+
+
+def relacao(alias, colunas):
+    n = len(next(iter(colunas.values())))
+    return RelacaoMemoria({(alias, c): _como_coluna(v) for c, v in colunas.items()}, {alias: alias.upper()}, n)
+
+
+def medir(esq, dir_, predicado, algoritmo, repeticoes=3):
+    fisica = JuncaoFisica(algoritmo, 0, None, CHAVE, (ORDEM_TABELA, ORDEM_TABELA))
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        rel = _juntar(esq, dir_, predicado, fisica)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return rel.n, melhor
+
+
+def escolhido(sql_predicado, ordenadas, n_esq, n_dir):
+    """O algoritmo que `escolher_juncoes` põe no ⨝, com as linhas dadas e a ordem das colunas."""
+    class Estimador:
+        def linhas(self, tabela):
+            return n_esq if tabela == 'A' else n_dir
+
+        def seletividade(self, termo, alias_para_tabela):
+            return 1 / max(n_esq, n_dir)
+
+    no = Juncao(Renomear(Relacao('A'), 'a'), Renomear(Relacao('B'), 'b'), predicado_de_texto(sql_predicado))
+    ordem = (lambda tabela, coluna: ORDEM_TABELA) if ordenadas else None
+    return escolher_juncoes(no, Estimador(), ordem)[no]
+
+
+def main(linhas=200000):
+    rnd = random.Random(42)
+    n_esq = max(1, linhas // 10)
+    ids = list(range(n_esq))
+    aids = [rnd.randrange(n_esq) for _ in range(linhas)]
+    igualdade = predicado_de_texto("a.id = b.aid")
+
+    cenarios = [
+        ("igualdade, entradas em ordem", sorted(ids), sorted(aids), True),
+        ("igualdade, entradas embaralhadas", rnd.sample(ids, len(ids)), aids, False),
+    ]
+    for titulo, chaves_esq, chaves_dir, ordenadas in cenarios:
+        esq = relacao('a', {'id': chaves_esq})
+        dir_ = relacao('b', {'aid': chaves_dir, 'y': list(range(linhas))})
+        print(f"\n{titulo} ({n_esq:,} x {linhas:,}); plano: {escolhido('a.id = b.aid', ordenadas, n_esq, linhas)}")
+        for algoritmo in (HASH_JOIN, MERGE_JOIN):
+            n, tempo = medir(esq, dir_, igualdade, algoritmo)
+            print(f"  {algoritmo:<18} {n:>10,} linhas  {tempo * 1e3:9.2f} ms")
+
+    # Sem igualdade: o nested loop compara todos os pares; amostra menor
+    n_desigual = min(linhas, 2000)
+    esq = relacao('a', {'x': [rnd.randint(0, 1000) for _ in range(n_desigual)]})
+    dir_ = relacao('b', {'y': [rnd.randint(0, 1000) for _ in range(n_desigual)]})
+    desigualdade = predicado_de_texto("a.x < b.y")
+    plano = escolhido('a.x < b.y', False, n_desigual, n_desigual)
+    print(f"\ndesigualdade a.x < b.y ({n_desigual:,} x {n_desigual:,}); plano: {plano}")
+    n, tempo = medir(esq, dir_, desigualdade, NESTED_LOOP)
+    print(f"  {NESTED_LOOP:<18} {n:>10,} linhas  {tempo * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,53 @@
+"""
+Benchmark da análise em lote (optimize_many) variando o número de processos.
+
+Uso:
+    python -m benchmarks.bench_lote [n_consultas] [max_workers]
+"""
+import os
+import random
+import sys
+import time
+
+from classes.lote import optimize_many
+
+NOMES = ['Joao', 'Maria', 'Ana', 'Pedro', 'Lucas', 'Julia']
+
+
+def corpus_sintetico(n, semente=42):
+    """Consultas no formato aceito pelo parser, com 0 a 5 JOINs e literais variados."""
+    rnd = random.Random(semente)
+    consultas = []
+    for _ in range(n):
+        n_joins = rnd.randint(0, 5)
+        partes = ["SELECT t0.id, t0.nome FROM Tabela0 t0"]
+        for i in range(1, n_joins + 1):
+            partes.append(f"INNER JOIN Tabela{i} t{i} ON t{i - 1}.fk{i} = t{i}.id")
+        conds = [f"t0.nome = '{rnd.choice(NOMES)}'", f"t0.idade > {rnd.randint(1, 90)}"]
+        if n_joins:
+            conds.append(f"t{n_joins}.valor <= {rnd.randint(1, 1000)}")
+        partes.append("WHERE " + " AND ".join(conds))
+        consultas.append(" ".join(partes))
+    return consultas
+
+
+def main(n_consultas=20000, max_workers=None):
+    consultas = corpus_sintetico(n_consultas)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    workers = 1
+    base = None
+    while workers <= max_workers:
+        inicio = time.perf_counter()
+        total = sum(1 for _ in optimize_many(consultas, workers=workers))
+        dt = time.perf_counter() - inicio
+        vazao = total / dt
+        base = base or vazao
+        print(f"workers={workers:>3}  {dt:7.3f}s  {vazao:>10,.0f} consultas/s  escala={vazao / base:5.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    w = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    main(n, w)
@@ -0,0 +1,140 @@
+"""
+Benchmark do hash join paralelo (ver `classes.paralelo`) num esquema estrela
+sintético: a tabela de fatos Vendas com chaves para Cliente, Produto, Loja e
+Data. Mede a junção Vendas ⨝ Cliente sozinha, no hash join serial e
+particionada em 1, 2, 4, ... processos, e a consulta estrela inteira pelo
+ParserSQL (com estatísticas, para o plano saber o tamanho das tabelas).
+
+A aceleração depende dos núcleos livres: acima de `os.cpu_count()` os
+processos dividem os mesmos núcleos e só sobra o custo de particionar.
+
+Uso:
+    python -m benchmarks.bench_paralelo [linhas_vendas] [processos ...]
+    python -m benchmarks.bench_paralelo 4000000 1 8 16 32
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from classes import ParserSQL
+from classes.estatisticas import CatalogoEstatisticas, EstimadorEstatisticas
+from classes.executor import BancoDados, RelacaoMemoria, _juntar
+from classes.fisico import HASH_JOIN, HASH_PARALELO, JuncaoFisica, escolher_juncoes
+from classes.paralelo import encerrar
+from classes.plano import predicado_de_texto
+
+PROCESSOS = (1, 2, 4, 8, 16, 32)
+
+CONSULTA = (
+    "SELECT v.idVenda, c.Nome, p.descricao, l.cidade FROM Vendas v "
+    "INNER JOIN Cliente c ON v.Cliente_idCliente = c.idCliente "
+    "INNER JOIN Produto p ON v.Produto_idProduto = p.idProduto "
+    "INNER JOIN Loja l ON v.Loja_idLoja = l.idLoja "
+    "INNER JOIN Data d ON v.Data_idData = d.idData "
+    "WHERE d.ano >= 2020"
+)
+
+NOMES = np.array(['Joao', 'Maria', 'Ana', 'Pedro', 'Lucas', 'Julia', 'Carla', 'Bruno'])
+CIDADES = np.array(['Recife', 'Natal', 'Salvador', 'Fortaleza', 'Maceio'])
+
+
+def banco_estrela(linhas, semente=42):
+    rng = np.random.default_rng(semente)
+    n_clientes = max(1, linhas // 4)
+    n_produtos = max(1, linhas // 50)
+    n_lojas = 200
+    n_datas = 3650
+    banco = BancoDados()
+    banco.registrar('Cliente', {
+        'idCliente': np.arange(n_clientes),
+        'Nome': NOMES[rng.integers(0, len(NOMES), n_clientes)],
+    })
+    banco.registrar('Produto', {
+        'idProduto': np.arange(n_produtos),
+        'descricao': np.char.add('produto ', np.arange(n_produtos).astype(str)),
+    })
+    banco.registrar('Loja', {
+        'idLoja': np.arange(n_lojas),
+        'cidade': CIDADES[rng.integers(0, len(CIDADES), n_lojas)],
+    })
+    banco.registrar('Data', {
+        'idData': np.arange(n_datas),
+        'ano': 2015 + np.arange(n_datas) // 365,
+    })
+    banco.registrar('Vendas', {
+        'idVenda': np.arange(linhas),
+        'Cliente_idCliente': rng.integers(0, n_clientes, linhas),
+        'Produto_idProduto': rng.integers(0, n_produtos, linhas),
+        'Loja_idLoja': rng.integers(0, n_lojas, linhas),
+        'Data_idData': rng.integers(0, n_datas, linhas),
+        'valor': rng.integers(1, 1000, linhas),
+    })
+    return banco
+
+
+def _relacao(banco, tabela, alias, colunas):
+    dados = banco.tabela(tabela)
+    return RelacaoMemoria({(alias, c): dados[c] for c in colunas}, {alias: tabela}, len(dados[colunas[0]]))
+
+
+def _medir(funcao, repeticoes):
+    melhor, resultado = float('inf'), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, melhor
+
+
+def medir_juncao(banco, processos, repeticoes=3):
+    """Vendas ⨝ Cliente: o hash join serial e o paralelo com cada número de processos."""
+    vendas = _relacao(banco, 'Vendas', 'v', ['idVenda', 'Cliente_idCliente'])
+    clientes = _relacao(banco, 'Cliente', 'c', ['idCliente', 'Nome'])
+    predicado = predicado_de_texto("v.Cliente_idCliente = c.idCliente")
+    print(f"\nVendas ⨝ Cliente ({vendas.n:,} x {clientes.n:,})")
+
+    rel, serial = _medir(lambda: _juntar(vendas, clientes, predicado,
+                                         JuncaoFisica(HASH_JOIN, 0, None, None, None)), repeticoes)
+    print(f"  {'hash join serial':<24} {rel.n:>11,} linhas  {serial * 1e3:9.1f} ms")
+    for p in processos:
+        fisica = JuncaoFisica(HASH_PARALELO, 0, None, None, None, p)
+        _juntar(vendas, clientes, predicado, fisica)   # sobe o pool fora da medida
+        rel, tempo = _medir(lambda: _juntar(vendas, clientes, predicado, fisica), repeticoes)
+        print(f"  {f'paralelo, {p} processos':<24} {rel.n:>11,} linhas  {tempo * 1e3:9.1f} ms"
+              f"  {serial / tempo:5.2f}x")
+
+
+def medir_consulta(banco, processos, repeticoes=3):
+    """A consulta estrela inteira, do plano à execução, com cada número de processos."""
+    catalogo = CatalogoEstatisticas.de_banco(banco, amostra=100_000)
+    parser = ParserSQL(CONSULTA).usar_estatisticas(catalogo)
+    print(f"\n{CONSULTA}")
+    resultado, serial = _medir(lambda: parser.executar(banco, workers=1), repeticoes)
+    print(f"  {'serial':<24} {len(resultado.linhas):>11,} linhas  {serial * 1e3:9.1f} ms")
+    for p in processos:
+        parser.executar(banco, workers=p)
+        resultado, tempo = _medir(lambda: parser.executar(banco, workers=p), repeticoes)
+        print(f"  {f'{p} processos':<24} {len(resultado.linhas):>11,} linhas  {tempo * 1e3:9.1f} ms"
+              f"  {serial / tempo:5.2f}x")
+    print(f"\nJunções do plano com {processos[-1]} processos:")
+    escolhas = escolher_juncoes(parser.plano_otimizado(), EstimadorEstatisticas(catalogo), banco.ordem,
+                                workers=processos[-1])
+    for fisica in escolhas.values():
+        print(f"  {fisica}")
+
+
+def main(linhas=2_000_000, *processos):
+    processos = processos or PROCESSOS
+    print(f"{os.cpu_count()} núcleos; Vendas com {linhas:,} linhas")
+    banco = banco_estrela(linhas)
+    try:
+        medir_juncao(banco, processos)
+        medir_consulta(banco, processos)
+    finally:
+        encerrar()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
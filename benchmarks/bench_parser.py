@@ -0,0 +1,163 @@
+"""
+Benchmark do parser: lexer + descida recursiva vs. a cascata de regex antiga.
+
+Uso:
+    python -m benchmarks.bench_parser [repeticoes]
+"""
+import re
+import sys
+import timeit
+
+from classes import ParserSQL
+
+
+class ParserSQLRegex(ParserSQL):
+    """Implementação anterior do parse (regex), mantida só como referência de desempenho."""
+
+    def parse(self):
+        try:
+            head_pat = r"""
+                ^\s*SELECT\s+(?P<select>.+?)\s+
+                FROM\s+(?P<from>\w+(?:\s+(?:AS\s+)?\w+)?)
+                (?=\s+(?:INNER\s+JOIN|WHERE|$))
+                \s*(?P<rest>.*)$
+                """
+
+            m = re.search(head_pat, self.sql_query, re.IGNORECASE | re.VERBOSE | re.DOTALL)
+            if not m:
+                self.valid = False
+                return False
+
+            self.components['select'] = m.group('select').strip()
+            self.components['from'] = m.group('from').strip()
+
+            rest = m.group('rest') or ''
+            joins = []
+
+            join_pat = re.compile(r"""
+                ^\s*INNER\s+JOIN\s+
+                (?P<table>\w+(?:\s+\w+)?)\s+
+                ON\s+(?P<cond>.+?)
+                (?=\s*(?:INNER\s+JOIN|WHERE|$))
+            """, re.IGNORECASE | re.VERBOSE | re.DOTALL)
+
+            while True:
+                mjoin = join_pat.search(rest)
+                if not mjoin or mjoin.start() != 0:
+                    break
+
+                table = mjoin.group('table').strip()
+                cond = mjoin.group('cond').strip()
+
+                if not self._validar_condicao(cond):
+                    self.valid = False
+                    return False
+
+                joins.append({'table': table, 'on': cond})
+                rest = rest[mjoin.end():]
+
+            mwhere = re.match(r"^\s*(?:WHERE\s+(?P<where>.+))?\s*$", rest, re.IGNORECASE | re.DOTALL)
+            if not mwhere:
+                self.valid = False
+                return False
+
+            where = (mwhere.group('where') or '').strip()
+            if where:
+                if not self._validar_condicao(where):
+                    self.valid = False
+                    return False
+                self.components['where'] = where
+
+            self.components['joins'] = joins
+            self.valid = True
+            self.parsed = True
+            return True
+
+        except Exception:
+            self.valid = False
+            return False
+
+    def _validar_condicao(self, cond):
+        proibidos = [r'\bOR\b', r'\bNOT\b', r'~~', r'~', r'\bLIKE\b', r'\bIS\b', r'\bNULL\b']
+        for padrao in proibidos:
+            if re.search(padrao, cond, re.IGNORECASE):
+                return False
+
+        valid_pattern = r"""
+            ^(?:\s*
+                (?:[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?
+                |'[^']*'
+                |\d+(?:\.\d+)?
+                |<=|>=|<>|=|<|>
+                |\(|\)
+                |AND
+                )
+            \s*)+$"""
+        if not re.match(valid_pattern, cond, re.IGNORECASE | re.VERBOSE):
+            return False
+        count = 0
+        for ch in cond:
+            if ch == '(':
+                count += 1
+            elif ch == ')':
+                count -= 1
+                if count < 0:
+                    return False
+        return count == 0
+
+
+def _consulta_com_joins(n_joins):
+    partes = ["SELECT t0.id, t0.nome FROM Tabela0 t0"]
+    for i in range(1, n_joins + 1):
+        partes.append(f"INNER JOIN Tabela{i} t{i} ON t{i - 1}.fk{i} = t{i}.id")
+    partes.append("WHERE t0.nome = 'Joao' AND t1.valor >= 10 AND (t0.idade > 18 AND t0.idade < 65)")
+    return " ".join(partes)
+
+
+CORPUS = [
+    "SELECT nome, idade FROM clientes WHERE idade > 25",
+    "SELECT * FROM pedidos INNER JOIN clientes ON pedidos.cliente_id = clientes.id",
+    "SELECT produto, preco FROM estoque WHERE preco <= 100 AND quantidade > 0",
+    "SELECT a.nome, b.data FROM tabela_a a INNER JOIN tabela_b b ON a.id = b.id WHERE a.status = 'ativo'",
+    "SELECT p.idPedido, c.Nome FROM Pedido p "
+    "INNER JOIN Cliente c ON p.Cliente_idCliente = c.idCliente "
+    "INNER JOIN Status s ON p.Status_idStatus = s.idStatus "
+    "WHERE c.Nome = 'Joao' AND s.idStatus >= 2",
+    _consulta_com_joins(3),
+    _consulta_com_joins(6),
+    "SELECT * FROM tabela WHERE coluna ~ 'regex'",
+    "SELECT * FROM tabela WHERE (coluna1 > 10 OR coluna2 < 5)",
+    "DELETE FROM tabela",
+]
+
+
+def _parse_todas(classe):
+    for q in CORPUS:
+        classe(q).parse()
+
+
+def _conferir_equivalencia():
+    """Os dois caminhos precisam produzir os mesmos componentes no corpus."""
+    for q in CORPUS:
+        novo, antigo = ParserSQL(q), ParserSQLRegex(q)
+        if novo.eh_valido() != antigo.eh_valido():
+            raise AssertionError(f"Validade diverge para: {q}")
+        if novo.eh_valido() and novo.components != antigo.components:
+            raise AssertionError(f"Componentes divergem para: {q}")
+
+
+def main(repeticoes=2000):
+    _conferir_equivalencia()
+
+    t_regex = min(timeit.repeat(lambda: _parse_todas(ParserSQLRegex), number=repeticoes, repeat=3))
+    t_lexer = min(timeit.repeat(lambda: _parse_todas(ParserSQL), number=repeticoes, repeat=3))
+
+    total = repeticoes * len(CORPUS)
+    print(f"Consultas por rodada: {len(CORPUS)} x {repeticoes} = {total}")
+    print(f"  regex (antigo):         {t_regex:.3f}s  ({total / t_regex:,.0f} consultas/s)")
+    print(f"  lexer + descida rec.:   {t_lexer:.3f}s  ({total / t_lexer:,.0f} consultas/s)")
+    print(f"  speedup:                {t_regex / t_lexer:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,75 @@
+"""
+Benchmark da leitura de tabelas em arquivo: plano literal x otimizado, com
+as tabelas do bench_execucao gravadas em CSV e JSON lines. Mostra tempo e
+pico de memória (tracemalloc) de cada execução.
+
+Uso:
+    python -m benchmarks.bench_varredura [n_pedidos] [tamanho_lote]
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from classes import ParserSQL
+from classes.executor import BancoDados
+from benchmarks.bench_execucao import CONSULTAS, banco_sintetico
+
+
+def gravar(banco, pasta, formato):
+    """Grava as tabelas do banco em `pasta` e devolve um BancoDados que lê os arquivos."""
+    em_arquivo = BancoDados()
+    for nome, colunas in banco.tabelas.items():
+        nomes = list(colunas)
+        linhas = zip(*(colunas[c].tolist() if hasattr(colunas[c], 'tolist') else colunas[c] for c in nomes))
+        caminho = os.path.join(pasta, f"{nome}.{formato}")
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            if formato == 'csv':
+                escritor = csv.writer(f)
+                escritor.writerow(nomes)
+                escritor.writerows(linhas)
+            else:
+                for linha in linhas:
+                    f.write(json.dumps(dict(zip(nomes, linha))) + '\n')
+        em_arquivo.registrar_arquivo(nome, caminho)
+    return em_arquivo
+
+
+def _medir(parser, banco, otimizado):
+    # Tempo e memória em execuções separadas: o tracemalloc deixa tudo mais lento
+    inicio = time.perf_counter()
+    resultado = parser.executar(banco, otimizado)
+    dt = time.perf_counter() - inicio
+    tracemalloc.start()
+    parser.executar(banco, otimizado)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, dt, pico
+
+
+def main(n_pedidos=200000, tamanho_lote=None):
+    banco = banco_sintetico(n_pedidos)
+    with tempfile.TemporaryDirectory() as pasta:
+        for formato in ('csv', 'jsonl'):
+            em_arquivo = gravar(banco, pasta, formato)
+            if tamanho_lote:
+                for fonte in em_arquivo.tabelas.values():
+                    fonte.tamanho_lote = tamanho_lote
+            print(f"\n=== {formato} ===")
+            for sql in CONSULTAS:
+                parser = ParserSQL(sql)
+                esperado = sorted(parser.executar(banco).linhas)
+                print(f"\n{sql}")
+                for otimizado in (False, True):
+                    resultado, dt, pico = _medir(parser, em_arquivo, otimizado)
+                    if sorted(resultado.linhas) != esperado:
+                        raise AssertionError(f"Resultado diferente do executor em memória: {sql}")
+                    nome = "otimizado" if otimizado else "literal"
+                    print(f"  {nome:<10} {dt * 1e3:9.1f} ms   pico {pico / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
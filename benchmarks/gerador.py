@@ -0,0 +1,126 @@
+"""
+Gerador de consultas sintéticas para os benchmarks.
+
+As consultas válidas seguem a gramática do ParserSQL:
+    SELECT lista FROM tabela [alias] (INNER JOIN tabela [alias] ON cond)* [WHERE cond]
+e o formato de cada uma é controlado por `ParametrosConsulta`. O gerador é
+determinístico para uma mesma semente, então dois commits medidos com a
+mesma semente processam exatamente as mesmas consultas.
+
+As inválidas são consultas válidas com um único defeito (OR, LIKE, IS NULL,
+parêntese sobrando, ON faltando...), para medir também o caminho de rejeição.
+"""
+import random
+from collections import namedtuple
+
+NOMES = ['Joao', 'Maria', 'Ana', 'Pedro', 'Lucas', 'Julia', 'Carla', 'Bruno']
+OPERADORES = ['=', '<>', '<', '<=', '>', '>=']
+
+NUMERO = 'numero'
+DECIMAL = 'decimal'
+TEXTO = 'texto'
+TIPOS_LITERAIS = (NUMERO, DECIMAL, TEXTO)
+
+ParametrosConsulta = namedtuple('ParametrosConsulta', [
+    'juncoes',          # (mín, máx) de INNER JOINs
+    'condicoes',        # (mín, máx) de conjunções no WHERE (0 = sem WHERE)
+    'tipos_literais',   # tipos sorteados para os literais do WHERE
+    'prob_alias',       # chance de cada tabela ganhar um alias
+    'colunas',          # (mín, máx) de colunas na lista do SELECT (o tamanho da consulta)
+])
+
+PADRAO = ParametrosConsulta(
+    juncoes=(0, 6),
+    condicoes=(0, 4),
+    tipos_literais=TIPOS_LITERAIS,
+    prob_alias=0.7,
+    colunas=(1, 6),
+)
+
+
+def _literal(rnd, tipo):
+    if tipo == NUMERO:
+        return str(rnd.randint(0, 1000))
+    if tipo == DECIMAL:
+        return f"{rnd.uniform(0, 1000):.2f}"
+    return f"'{rnd.choice(NOMES)}'"
+
+
+def gerar_consulta(rnd, parametros=PADRAO) -> str:
+    """Uma consulta válida sorteada com `rnd` (random.Random)."""
+    n_juncoes = rnd.randint(*parametros.juncoes)
+    tabelas = [f"Tabela{i}" for i in range(n_juncoes + 1)]
+    nomes = [f"t{i}" if rnd.random() < parametros.prob_alias else tabela
+             for i, tabela in enumerate(tabelas)]
+
+    def origem(i):
+        return tabelas[i] if nomes[i] == tabelas[i] else f"{tabelas[i]} {nomes[i]}"
+
+    def coluna():
+        return f"{rnd.choice(nomes)}.c{rnd.randint(0, 9)}"
+
+    colunas = [coluna() for _ in range(rnd.randint(*parametros.colunas))]
+    partes = [f"SELECT {', '.join(colunas)} FROM {origem(0)}"]
+    for i in range(1, n_juncoes + 1):
+        # Encadeia cada tabela a uma anterior qualquer: árvores de junção variadas
+        pai = nomes[rnd.randrange(i)]
+        partes.append(f"INNER JOIN {origem(i)} ON {pai}.fk{i} = {nomes[i]}.id")
+
+    condicoes = [
+        f"{coluna()} {rnd.choice(OPERADORES)} {_literal(rnd, rnd.choice(parametros.tipos_literais))}"
+        for _ in range(rnd.randint(*parametros.condicoes))
+    ]
+    if condicoes:
+        partes.append("WHERE " + " AND ".join(condicoes))
+    return " ".join(partes)
+
+
+# Cada defeito recebe uma consulta válida e a estraga de um jeito que o parser deve rejeitar
+def _com_or(rnd, sql):
+    return sql + (" OR " if " WHERE " in sql else " WHERE x = 0 OR ") + f"x = {rnd.randint(0, 9)}"
+
+
+def _com_like(rnd, sql):
+    return sql + (" AND " if " WHERE " in sql else " WHERE ") + f"x LIKE '{rnd.choice(NOMES)}%'"
+
+
+def _com_is_null(rnd, sql):
+    return sql + (" AND " if " WHERE " in sql else " WHERE ") + "x IS NULL"
+
+
+def _com_til(rnd, sql):
+    return sql + (" AND " if " WHERE " in sql else " WHERE ") + "x ~ 'a'"
+
+
+def _parentese_aberto(rnd, sql):
+    return sql + (" AND " if " WHERE " in sql else " WHERE ") + "(x = 1"
+
+
+def _sem_from(rnd, sql):
+    return sql.replace(" FROM ", " ", 1)
+
+
+def _sem_on(rnd, sql):
+    if " ON " not in sql:
+        return sql.replace("SELECT", "SELEC", 1)
+    return sql.replace(" ON ", " ", 1)
+
+
+def _outro_comando(rnd, sql):
+    return "DELETE" + sql[len("SELECT"):]
+
+
+DEFEITOS = (_com_or, _com_like, _com_is_null, _com_til, _parentese_aberto, _sem_from, _sem_on, _outro_comando)
+
+
+def gerar_invalida(rnd, parametros=PADRAO) -> str:
+    """Uma consulta válida com um defeito sorteado."""
+    return rnd.choice(DEFEITOS)(rnd, gerar_consulta(rnd, parametros))
+
+
+def gerar_corpus(n, semente=42, parametros=PADRAO, n_invalidas=0):
+    """(válidas, inválidas): listas de consultas geradas a partir de `semente`."""
+    rnd = random.Random(semente)
+    validas = [gerar_consulta(rnd, parametros) for _ in range(n)]
+    invalidas = [gerar_invalida(rnd, parametros) for _ in range(n_invalidas)]
+    return validas, invalidas
@@ -1,2 +1,2 @@
 from .sqlparser import ParserSQL
-
+from .cache import CachePlanos, cache_planos
@@ -0,0 +1,122 @@
+"""
+Tabelas em arquivo (CSV com cabeçalho e JSON lines) lidas em lotes.
+
+    banco.registrar_arquivo('Pedido', 'dados/pedido.csv')
+
+O executor não carrega o arquivo inteiro: a leitura gera lotes de linhas
+brutas e só as colunas pedidas são decodificadas (ver `executor._varrer_arquivo`).
+No CSV, decodificar é converter o texto do campo (int/float/str); no JSON
+lines a linha inteira já sai decodificada do `json.loads`, então ali o ganho
+está em não guardar as colunas e linhas descartadas.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+TAMANHO_LOTE = 16384
+
+# Linhas usadas para inferir o tipo de cada coluna do CSV
+_AMOSTRA_TIPOS = 100
+
+
+def _inferir_tipo(valores):
+    """int, float ou str: o tipo mais restrito em que todos os valores de exemplo cabem."""
+    exemplos = [v for v in valores if v != ''][:_AMOSTRA_TIPOS]
+    if not exemplos:
+        return str
+    for tipo in (int, float):
+        try:
+            for v in exemplos:
+                tipo(v)
+            return tipo
+        except ValueError:
+            continue
+    return str
+
+
+def _conversor(tipo):
+    if tipo is str:
+        return None
+
+    def converter(valor):
+        try:
+            return tipo(valor)
+        except ValueError:
+            return valor    # fora do tipo inferido: fica como texto
+    return converter
+
+
+class TabelaArquivo:
+    """
+    Tabela guardada num arquivo CSV (primeira linha = nomes das colunas) ou
+    JSON lines (um objeto por linha). `tipos` força o tipo de colunas do CSV
+    (dict nome -> int/float/str); as demais têm o tipo inferido do primeiro lote.
+    """
+
+    def __init__(self, caminho, formato=None, tipos=None, tamanho_lote=TAMANHO_LOTE, delimitador=','):
+        if formato is None:
+            formato = 'jsonl' if os.path.splitext(caminho)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+        if formato not in ('csv', 'jsonl'):
+            raise ValueError(f"Formato de arquivo não suportado: {formato}")
+        if tamanho_lote < 1:
+            raise ValueError("tamanho_lote precisa ser pelo menos 1")
+        self.caminho = caminho
+        self.formato = formato
+        self.tipos = dict(tipos or {})
+        self.tamanho_lote = tamanho_lote
+        self.delimitador = delimitador
+        self._nomes = None
+        self._conversores = None
+
+    @property
+    def nomes(self) -> list:
+        """Nomes das colunas, na ordem do arquivo."""
+        if self._nomes is None:
+            with open(self.caminho, newline='', encoding='utf-8') as f:
+                if self.formato == 'csv':
+                    self._nomes = next(csv.reader(f, delimiter=self.delimitador), [])
+                else:
+                    linha = next((l for l in f if l.strip()), None)
+                    self._nomes = list(json.loads(linha)) if linha else []
+        return self._nomes
+
+    def lotes(self):
+        """Gera lotes de linhas brutas (listas de texto no CSV, dicts no JSON lines)."""
+        with open(self.caminho, newline='', encoding='utf-8') as f:
+            if self.formato == 'csv':
+                leitor = csv.reader(f, delimiter=self.delimitador)
+                self._nomes = next(leitor, [])
+            else:
+                leitor = (json.loads(l) for l in f if l.strip())
+            while True:
+                lote = list(islice(leitor, self.tamanho_lote))
+                if not lote:
+                    return
+                if self.formato == 'csv' and self._conversores is None:
+                    self._preparar_conversores(lote)
+                yield lote
+
+    def _preparar_conversores(self, lote):
+        self._conversores = {}
+        for i, nome in enumerate(self._nomes):
+            tipo = self.tipos.get(nome) or _inferir_tipo([linha[i] for linha in lote])
+            self._conversores[nome] = (i, _conversor(tipo))
+
+    def decodificar(self, lote, coluna, indices=None) -> list:
+        """Valores de `coluna` no lote (só nas linhas `indices`, se dadas)."""
+        linhas = lote if indices is None else [lote[i] for i in indices]
+        if self.formato == 'jsonl':
+            return [linha.get(coluna) for linha in linhas]
+        i, converter = self._conversores[coluna]
+        if converter is None:
+            return [linha[i] for linha in linhas]
+        return [converter(linha[i]) for linha in linhas]
+
+    def carregar(self) -> dict:
+        """Todas as colunas em memória (dict nome -> lista), como no BancoDados."""
+        colunas = {nome: [] for nome in self.nomes}
+        for lote in self.lotes():
+            for nome, valores in colunas.items():
+                valores.extend(self.decodificar(lote, nome))
+        return colunas
@@ -0,0 +1,102 @@
+"""
+Filtros de Bloom das semijunções (ver `classes.fisico`).
+
+Num hash join em que o lado que constrói a tabela de hash foi filtrado
+(c.Nome = 'Joao'), as chaves que sobraram nele viram um filtro de Bloom, e a
+varredura da relação do outro lado descarta logo as linhas cuja chave não
+está no filtro, antes de elas passarem pelas junções do caminho:
+
+    filtro = FiltroBloom.montar(chaves_clientes)
+    mascara = filtro.contem(chaves_vendas)     # False: a chave certamente não casa
+
+O filtro guarda pelo menos BITS_POR_CHAVE bits por chave (o total é
+arredondado para uma potência de 2) e marca FUNCOES_HASH bits por valor; uma
+chave que não está no conjunto passa mesmo assim com probabilidade
+≈ (1 - e^(-k/b))^k, no máximo uns 3% com 8 bits e 3 funções. Os falsos
+positivos só deixam linhas a mais para a junção descartar; uma chave que
+está no conjunto nunca é descartada.
+
+Chaves numéricas em arrays NumPy são espalhadas pelo valor como float64
+(assim 1 e 1.0 caem no mesmo bit, como no `==` da junção); as demais pelo
+`hash` do Python, que também dá o mesmo hash a números iguais.
+"""
+import numpy as np
+
+BITS_POR_CHAVE = 8
+FUNCOES_HASH = 3
+
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+
+
+def _numerica(valores) -> bool:
+    return isinstance(valores, np.ndarray) and valores.dtype.kind in 'biuf'
+
+
+def _misturar(x):
+    """Finalizador do splitmix64: espalha os bits de cada valor de 64 bits."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _M1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _M2
+    return x ^ (x >> np.uint64(31))
+
+
+def _hashes(valores, numerico):
+    """Hash de 64 bits de cada valor, ou None se os valores não servem para o filtro."""
+    if numerico:
+        if not _numerica(valores):
+            return None
+        # + 0.0 troca -0.0 por 0.0, que são iguais mas têm bits diferentes
+        bits = (valores.astype(np.float64) + 0.0).view(np.uint64)
+    else:
+        lista = valores.tolist() if isinstance(valores, np.ndarray) else valores
+        bits = np.fromiter((hash(v) for v in lista), dtype=np.int64, count=len(lista)).view(np.uint64)
+    return _misturar(bits)
+
+
+class FiltroBloom:
+    """Conjunto aproximado de chaves: `contem` pode dar falso positivo, nunca falso negativo."""
+    __slots__ = ('bits', 'mascara', 'numerico', 'chaves')
+
+    def __init__(self, bits, numerico, chaves):
+        self.bits = bits                            # uint8, 8 bits por byte (little-endian)
+        self.mascara = np.uint64(len(bits) * 8 - 1)
+        self.numerico = numerico
+        self.chaves = chaves
+
+    @classmethod
+    def montar(cls, valores):
+        """Filtro com as chaves dadas (lista ou array)."""
+        numerico = _numerica(valores)
+        n = len(valores)
+        total_bits = 64
+        while total_bits < n * BITS_POR_CHAVE:
+            total_bits *= 2
+        marcados = np.zeros(total_bits, dtype=bool)
+        mascara = np.uint64(total_bits - 1)
+        for posicoes in cls._posicoes(_hashes(valores, numerico), mascara):
+            marcados[posicoes] = True
+        return cls(np.packbits(marcados, bitorder='little'), numerico, n)
+
+    @staticmethod
+    def _posicoes(hashes, mascara):
+        # Hash duplo: h1 + i·h2, com h2 ímpar para percorrer todas as posições
+        passo = (hashes >> np.uint64(32)) | np.uint64(1)
+        for i in range(FUNCOES_HASH):
+            yield (hashes + np.uint64(i) * passo) & mascara
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def contem(self, valores):
+        """Máscara booleana das chaves que podem estar no conjunto, ou None se o tipo não combina."""
+        hashes = _hashes(valores, self.numerico)
+        if hashes is None:
+            return None
+        resultado = np.ones(len(hashes), dtype=bool)
+        for posicoes in self._posicoes(hashes, self.mascara):
+            bytes_ = self.bits[posicoes >> np.uint64(3)]
+            resultado &= ((bytes_ >> (posicoes & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+        return resultado
@@ -0,0 +1,326 @@
+"""
+Cache de planos por impressão digital (fingerprint) normalizada da consulta.
+
+Consultas que só diferem em literais, espaços, caixa das palavras reservadas
+ou nomes de alias caem na mesma entrada, por exemplo:
+
+    ... WHERE c.Nome = 'Joao'      e      ... where cl.Nome = 'Maria'
+
+A entrada guarda os intervalos de tokens dos componentes e os planos (literal
+e otimizado) como modelos, com os literais trocados por `Parametro`. Num
+acerto, os componentes são recortados da nova query e os literais/aliases
+religados nos modelos, sem passar pelo parser nem pelo otimizador.
+"""
+import threading
+from collections import OrderedDict
+
+from .lexer import IDENT, NUMERO, STRING, PALAVRAS_RESERVADAS, tokenizar, texto_proibido
+from .otimizador import analisar as analisar_plano, avisos_de_juncao, otimizar
+from .plano import (
+    No, CondicaoBruta, Coluna, Literal, Parametro, Projecao, Renomear,
+    atributos_do_select, contem, literal_de_token, mapear, relacoes,
+)
+from .simplificacao import simplificar
+from .sqlparser import ParserSQL
+from . import perfil
+
+# Palavras cuja separação por espaços o parser exige; coladas a um vizinho
+# mudam a validade, então a impressão digital preserva essa adjacência.
+_SENSIVEIS_A_ESPACO = frozenset({'SELECT', 'FROM', 'ON', 'WHERE'})
+
+
+def _aliases_declarados(tokens):
+    """Pares (tabela, alias) declarados após FROM / JOIN, na ordem da consulta."""
+    declarados = []
+    n = len(tokens)
+    for k, (tipo, _, _) in enumerate(tokens):
+        if (tipo == 'FROM' or tipo == 'JOIN') and k + 1 < n and tokens[k + 1][0] is IDENT:
+            j = k + 2
+            if tipo == 'FROM' and j + 1 < n and tokens[j][0] == 'AS':
+                j += 1
+            if j < n and tokens[j][0] is IDENT and '.' not in tokens[j][1]:
+                declarados.append((tokens[k + 1][1], tokens[j][1]))
+    return declarados
+
+
+def impressao_digital(tokens):
+    """
+    Chave normalizada da consulta: literais viram '?', palavras reservadas
+    ficam em maiúsculas, espaços viram um único separador e aliases
+    declarados viram $0, $1, ... Devolve (chave, aliases, literais), ou None
+    se a consulta não deve passar pelo cache.
+    """
+    declarados = _aliases_declarados(tokens)
+    aliases = [alias for _, alias in declarados]
+    tabelas = {tabela for tabela, _ in declarados}
+    # Alias repetido ou igual a um nome de tabela muda a resolução de colunas
+    if len(set(aliases)) != len(aliases) or tabelas.intersection(aliases):
+        return None
+    canonico = {alias: f"${i}" for i, alias in enumerate(aliases)}
+
+    partes = []
+    literais = []
+    fim_anterior = -1
+    tipo_anterior = None
+    for tok in tokens:
+        tipo, valor, inicio = tok
+        if tipo is NUMERO or tipo is STRING:
+            if tipo is STRING and texto_proibido(valor):
+                return None     # a validade depende do conteúdo da string
+            literais.append(tok)
+            parte = '?'
+        elif tipo is IDENT:
+            if valor in canonico:
+                parte = canonico[valor]
+            else:
+                prefixo, ponto, coluna = valor.partition('.')
+                parte = f"{canonico[prefixo]}.{coluna}" if ponto and prefixo in canonico else valor
+        else:
+            parte = tipo if tipo in PALAVRAS_RESERVADAS else valor
+
+        if (partes and inicio == fim_anterior
+                and (tipo in _SENSIVEIS_A_ESPACO or tipo_anterior in _SENSIVEIS_A_ESPACO)):
+            partes[-1] += parte
+        else:
+            partes.append(parte)
+        fim_anterior = inicio + len(valor)
+        tipo_anterior = tipo
+
+    return ' '.join(partes), aliases, literais
+
+
+class _Modelo:
+    __slots__ = ('intervalos', 'aliases', 'n_literais', 'plano', 'plano_otimizado', 'componentes')
+
+    def __init__(self, intervalos, aliases, n_literais, plano, plano_otimizado, componentes):
+        self.intervalos = intervalos
+        self.aliases = aliases
+        self.n_literais = n_literais
+        self.plano = _Religador(plano)
+        self.plano_otimizado = _Religador(plano_otimizado)
+        self.componentes = componentes  # do grafo de junções, só de forma (ver `ParserSQL.avisos`)
+
+
+def _parametrizar(plano):
+    """Troca os literais do plano por Parametro(0..n-1), na ordem do texto."""
+    contador = [0]
+
+    def trocar(no):
+        if isinstance(no, Literal):
+            no = Parametro(contador[0])
+            contador[0] += 1
+        return no
+
+    return mapear(plano, trocar), contador[0]
+
+
+def _constante(valor):
+    return lambda literais, renomear: valor
+
+
+def _compilar(no, com_aliases):
+    """
+    Compila o modelo em uma função (literais, renomear) -> nó. Subárvores que
+    não dependem dos parâmetros (nem dos aliases, se `com_aliases`) devolvem
+    None e são reaproveitadas como estão, sem alocar nós novos.
+    """
+    if isinstance(no, Parametro):
+        indice = no.indice
+        return lambda literais, renomear: literais[indice]
+
+    if isinstance(no, tuple):
+        partes = [_compilar(v, com_aliases) for v in no]
+        if all(p is None for p in partes):
+            return None
+        funcoes = [p or _constante(v) for p, v in zip(partes, no)]
+        return lambda literais, renomear: tuple(f(literais, renomear) for f in funcoes)
+
+    if not isinstance(no, No):
+        return None
+
+    if com_aliases and isinstance(no, Coluna) and no.alias is not None:
+        alias, nome = no.alias, no.nome
+        return lambda literais, renomear: Coluna(renomear.get(alias, alias), nome)
+
+    valores = no._valores()
+    partes = [_compilar(v, com_aliases) for v in valores]
+    renomeia = com_aliases and (isinstance(no, Renomear) or (
+        isinstance(no, Projecao) and any(a.endswith('.*') for a in no.atributos)))
+    if not renomeia and all(p is None for p in partes):
+        return None
+
+    funcoes = [p or _constante(v) for p, v in zip(partes, valores)]
+    classe = type(no)
+    if renomeia and isinstance(no, Renomear):
+        alias = no.alias
+        funcoes[1] = lambda literais, renomear: renomear.get(alias, alias)
+    elif renomeia:
+        # π "alias.*" do SELECT * com junções reordenadas
+        atributos = [a[:-2] for a in no.atributos]
+        funcoes[1] = lambda literais, renomear: tuple(f"{renomear.get(a, a)}.*" for a in atributos)
+    return lambda literais, renomear: classe(*[f(literais, renomear) for f in funcoes])
+
+
+class _Religador:
+    """Modelo de plano compilado: um caminho só com literais e outro com aliases."""
+    __slots__ = ('_so_literais', '_completo', '_modelo')
+
+    def __init__(self, modelo):
+        self._modelo = modelo
+        self._so_literais = _compilar(modelo, False) or _constante(modelo)
+        self._completo = _compilar(modelo, True) or _constante(modelo)
+
+    def __call__(self, literais, renomear, atributos_finais):
+        if renomear:
+            plano = self._completo(literais, renomear)
+        else:
+            plano = self._so_literais(literais, renomear)
+        # A projeção final vem do texto do SELECT, que pode citar aliases
+        if isinstance(plano, Projecao) and atributos_finais and plano.atributos != atributos_finais:
+            plano = Projecao(plano.filho, atributos_finais)
+        return plano
+
+
+class _ParserDoCache(ParserSQL):
+    """ParserSQL preenchido a partir de um modelo; os planos são religados sob demanda."""
+
+    def __init__(self, sql_query, modelo, literais, renomear):
+        super().__init__(sql_query)
+        self._modelo = modelo
+        self._literais = literais
+        self._renomear = renomear
+
+    def plano_logico(self):
+        if self._plano is None:
+            self._plano = self._modelo.plano(self._literais, self._renomear, self._atributos_finais())
+        return self._plano
+
+    def plano_otimizado(self):
+        if self.estatisticas is not None:
+            # Com estatísticas a escolha depende dos valores dos literais: o
+            # modelo não serve, otimiza o plano religado
+            return super().plano_otimizado()
+        if self._plano_otimizado is None:
+            plano = self._modelo.plano_otimizado(self._literais, self._renomear, self._atributos_finais())
+            # A simplificação depende dos valores: roda sobre o plano já religado
+            with perfil.etapa('simplificacao'):
+                self._plano_otimizado = simplificar(plano)
+        return self._plano_otimizado
+
+    def avisos(self):
+        if self._analise is not None:
+            return super().avisos()
+        # Sem refazer a análise: as componentes vêm do modelo, os aliases do plano religado
+        return avisos_de_juncao(self._modelo.componentes, relacoes(self.plano_logico()))
+
+    def _atributos_finais(self):
+        return atributos_do_select(self.components['select'])
+
+
+class CachePlanos:
+    """Cache LRU de tamanho limitado, seguro para uso entre threads."""
+
+    def __init__(self, capacidade: int = 1024):
+        if capacidade < 1:
+            raise ValueError("A capacidade do cache precisa ser pelo menos 1")
+        self.capacidade = capacidade
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def analisar(self, sql_query: str) -> ParserSQL:
+        """
+        Devolve um ParserSQL já analisado e com os planos prontos. Num acerto,
+        nem o parse nem o otimizador são executados.
+        """
+        with perfil.etapa('cache'):
+            return self._analisar(sql_query)
+
+    def _analisar(self, sql_query):
+        parser = ParserSQL(sql_query)
+        tokens = tokenizar(parser.sql_query)
+        digital = impressao_digital(tokens)
+        if digital is None:
+            with self._lock:
+                self.faltas += 1
+            if perfil.ATIVO:
+                perfil.contar('cache.faltas')
+            parser._parse_tokens(tokens)
+            return parser
+
+        chave, aliases, literais = digital
+        with self._lock:
+            modelo = self._entradas.get(chave)
+            if modelo is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+            else:
+                self.faltas += 1
+        if perfil.ATIVO:
+            perfil.contar('cache.acertos' if modelo is not None else 'cache.faltas')
+
+        if modelo is not None:
+            return self._aplicar_modelo(parser.sql_query, tokens, modelo, aliases, literais)
+
+        if parser._parse_tokens(tokens):
+            modelo = self._criar_modelo(parser, aliases, literais)
+            if modelo is not None:
+                with self._lock:
+                    self._entradas[chave] = modelo
+                    self._entradas.move_to_end(chave)
+                    while len(self._entradas) > self.capacidade:
+                        self._entradas.popitem(last=False)
+                        self.despejos += 1
+        return parser
+
+    @staticmethod
+    def _criar_modelo(parser, aliases, literais):
+        plano = parser.plano_logico()
+        if contem(plano, CondicaoBruta):
+            return None     # texto livre não dá para religar com segurança
+        modelo_plano, n_literais = _parametrizar(plano)
+        # Os literais do plano são os das condições, que vêm depois do SELECT
+        if n_literais > len(literais):
+            return None
+        # O otimizador não depende dos valores dos literais, então roda uma
+        # vez sobre o modelo e serve para toda consulta com a mesma forma
+        analise = analisar_plano(modelo_plano)
+        return _Modelo(parser._intervalos, aliases, n_literais,
+                       modelo_plano, otimizar(modelo_plano, analise=analise), analise.componentes)
+
+    @staticmethod
+    def _aplicar_modelo(sql_query, tokens, modelo, aliases, literais):
+        valores = [literal_de_token(tok) for tok in literais[len(literais) - modelo.n_literais:]]
+        renomear = {antigo: novo for antigo, novo in zip(modelo.aliases, aliases) if antigo != novo}
+        parser = _ParserDoCache(sql_query, modelo, valores, renomear)
+        parser._preencher_componentes(tokens, modelo.intervalos)
+        parser.valid = parser.parsed = True
+        return parser
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'despejos': self.despejos,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'tamanho': len(self._entradas),
+                'capacidade': self.capacidade,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.acertos = self.faltas = self.despejos = 0
+
+
+# Cache compartilhado pelo processo
+cache_planos = CachePlanos()
+
+
+def analisar(sql_query: str) -> ParserSQL:
+    """Atalho para `cache_planos.analisar`."""
+    return cache_planos.analisar(sql_query)
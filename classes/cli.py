@@ -0,0 +1,250 @@
+"""
+Linha de comando: `python -m classes <comando> [consultas...]`.
+
+    validar   diz se cada consulta é válida (código de saída 1 se alguma não for)
+    algebra   álgebra relacional na ordem literal
+    otimizar  álgebra relacional otimizada (avisos, como produto cartesiano, na saída de erro)
+    grafo     grava os três grafos de cada consulta (SVG, DOT ou PNG)
+    explicar  EXPLAIN ANALYZE: executa os dois planos sobre os dados (--dados,
+              --tabela) e mostra linhas reais x estimadas de cada operador
+    lote      lê comandos separados por `;` de arquivos (ou da entrada padrão)
+              e escreve um JSON por linha com a análise de cada um
+
+Sem consultas nos argumentos, os cinco primeiros leem uma por linha da
+entrada padrão. Os comandos também aceitam os nomes em inglês (validate,
+algebra, optimize, graph, explain, batch).
+
+Importar este módulo não traz o networkx, o matplotlib nem o NumPy: só o
+comando grafo os carrega, então validar uma consulta sobe em poucas dezenas
+de milissegundos (ver benchmarks/bench_inicio.py).
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+from itertools import chain
+
+from .sqlparser import ParserSQL
+from .explicacao import FATOR_DESVIO
+from .perfil import perfilar
+
+
+def _consultas(args):
+    if args.consultas and args.consultas != ['-']:
+        return args.consultas
+    return [linha.strip() for linha in sys.stdin if linha.strip()]
+
+
+def _validar(parser, args, i):
+    valida = parser.eh_valido()
+    print(f"{'válida' if valida else 'inválida'}\t{parser.sql_query}")
+    return valida
+
+
+def _algebra(parser, args, i):
+    algebra = parser.to_rel_algebra()
+    print(algebra if algebra is not None else f"inválida\t{parser.sql_query}")
+    return algebra is not None
+
+
+def _otimizar(parser, args, i):
+    algebra = parser.otimizar_algebra_relacional()
+    print(algebra if algebra is not None else f"inválida\t{parser.sql_query}")
+    _avisar(parser)
+    return algebra is not None
+
+
+def _avisar(parser):
+    # Na saída de erro, para não misturar com a álgebra de quem lê a saída padrão
+    for aviso in parser.avisos():
+        print(f"aviso: {aviso}", file=sys.stderr)
+
+
+def _grafo(parser, args, i):
+    from .grafos import construir_grafos, renderizar_grafos
+
+    grafos = construir_grafos(parser)
+    if grafos is None:
+        print(f"inválida\t{parser.sql_query}")
+        return False
+    _gravar(grafos, renderizar_grafos(grafos, args.formato), _base(args, i), args)
+    _avisar(parser)
+    return True
+
+
+def _gravar(grafos, conteudos, base, args):
+    os.makedirs(args.pasta, exist_ok=True)
+    for (sufixo, _, _), conteudo in zip(grafos, conteudos):
+        caminho = os.path.join(args.pasta, f"{base}_{sufixo}.{args.formato}")
+        modo, codificacao = ("wb", None) if isinstance(conteudo, bytes) else ("w", "utf-8")
+        with open(caminho, modo, encoding=codificacao) as f:
+            f.write(conteudo)
+        print(caminho)
+
+
+def _nome_e_caminho(texto):
+    nome, igual, caminho = texto.partition('=')
+    if not (nome and igual and caminho):
+        raise argparse.ArgumentTypeError(f"esperado NOME=CAMINHO: {texto}")
+    return nome, caminho
+
+
+def _banco(args):
+    """BancoDados (e catálogo de estatísticas) das opções, montado uma vez para todas as consultas."""
+    if args.banco is None:
+        from .executor import BancoDados
+        from .estatisticas import CatalogoEstatisticas
+
+        args.banco = BancoDados()
+        for pasta in args.dados:
+            args.banco.registrar_pasta(pasta)
+        for nome, caminho in args.tabela:
+            if os.path.isdir(caminho):
+                args.banco.registrar_colunar(nome, caminho)
+            else:
+                args.banco.registrar_arquivo(nome, caminho)
+        if args.estatisticas:
+            args.catalogo = CatalogoEstatisticas.carregar(args.estatisticas)
+        elif args.coletar_estatisticas:
+            args.catalogo = CatalogoEstatisticas.de_banco(args.banco)
+    return args.banco
+
+
+def _explicar(parser, args, i):
+    from .executor import ErroExecucao
+
+    banco = _banco(args)
+    if args.catalogo is not None:
+        parser.usar_estatisticas(args.catalogo)
+    try:
+        explicacao = parser.explicar(banco, args.limiar)
+    except ErroExecucao as erro:
+        print(f"erro\t{parser.sql_query}\t{erro}")
+        return False
+    if explicacao is None:
+        print(f"inválida\t{parser.sql_query}")
+        return False
+    print(parser.sql_query)
+    print(explicacao.tabela())
+    print()
+    if args.grafos:
+        from .grafos import construir_grafos, renderizar_grafos
+
+        grafos = construir_grafos(parser, banco=banco, explicacao=explicacao)
+        args.pasta = args.grafos
+        _gravar(grafos, renderizar_grafos(grafos, args.formato), _base(args, i), args)
+    _avisar(parser)
+    return True
+
+
+def _base(args, i):
+    return args.nome if args.total == 1 else f"{args.nome}_{i}"
+
+
+def _fluxos(arquivos):
+    """Os arquivos abertos um de cada vez ('-' ou nenhum = entrada padrão)."""
+    for caminho in arquivos or ['-']:
+        if caminho == '-':
+            yield sys.stdin
+        else:
+            with open(caminho, encoding='utf-8') as f:
+                yield f
+
+
+def _lote(args):
+    # Importado aqui: o pool de processos não é necessário aos outros comandos
+    from .lote import dividir_comandos, optimize_many, parse_many
+
+    comandos = chain.from_iterable(dividir_comandos(f) for f in _fluxos(args.arquivos))
+    opcoes = dict(workers=args.workers, tamanho_lote=args.tamanho_lote,
+                  lotes_em_voo=args.lotes_em_voo, ordenado=not args.desordenado)
+    if args.so_validar:
+        registros = parse_many(comandos, **opcoes)
+    else:
+        registros = optimize_many(comandos, grafos=args.grafos, formato=args.formato, **opcoes)
+
+    saida = open(args.saida, 'w', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        escrever = saida.write
+        for registro in registros:
+            registro = registro._asdict()
+            registro['tempos'] = {etapa: round(ms, 4) for etapa, ms in registro['tempos'].items()}
+            escrever(json.dumps(registro, ensure_ascii=False))
+            escrever('\n')
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    return 0
+
+
+def criar_argumentos():
+    argumentos = argparse.ArgumentParser(prog="python -m classes",
+                                         description="Valida, otimiza e desenha consultas SQL.")
+    argumentos.add_argument('--profile', action='store_true',
+                            help="mostra o tempo de cada etapa na saída de erro")
+    comandos = argumentos.add_subparsers(dest='comando', required=True)
+    for nome, ingles, funcao, ajuda in (
+        ('validar', 'validate', _validar, "diz se cada consulta é válida"),
+        ('algebra', 'algebra', _algebra, "álgebra relacional literal"),
+        ('otimizar', 'optimize', _otimizar, "álgebra relacional otimizada"),
+        ('grafo', 'graph', _grafo, "grava os grafos de otimização"),
+        ('explicar', 'explain', _explicar, "EXPLAIN ANALYZE: executa a consulta sobre os dados"),
+    ):
+        comando = comandos.add_parser(nome, aliases=[ingles] if ingles != nome else [], help=ajuda)
+        comando.add_argument('consultas', nargs='*', help="consultas SQL (sem nenhuma, lê da entrada padrão)")
+        comando.set_defaults(funcao=funcao)
+        if funcao is _grafo:
+            comando.add_argument('--formato', choices=('svg', 'dot', 'png'), default='svg')
+            comando.add_argument('--pasta', default='grafos')
+            comando.add_argument('--nome', default='query', help="prefixo dos arquivos")
+        if funcao is _explicar:
+            comando.add_argument('--dados', metavar='PASTA', action='append', default=[],
+                                 help="registra os .csv / .jsonl e as tabelas colunares da pasta")
+            comando.add_argument('--tabela', metavar='NOME=CAMINHO', type=_nome_e_caminho,
+                                 action='append', default=[],
+                                 help="registra um arquivo CSV / JSON lines (ou pasta colunar) como NOME")
+            comando.add_argument('--estatisticas', metavar='ARQUIVO', help="catálogo de estatísticas (JSON)")
+            comando.add_argument('--coletar-estatisticas', action='store_true',
+                                 help="coleta as estatísticas dos próprios dados para ter as estimativas")
+            comando.add_argument('--limiar', type=float, default=FATOR_DESVIO,
+                                 help="erro (em vezes) a partir do qual a estimativa é destacada")
+            comando.add_argument('--grafos', metavar='PASTA', help="grava os grafos anotados nesta pasta")
+            comando.add_argument('--formato', choices=('svg', 'dot', 'png'), default='svg')
+            comando.add_argument('--nome', default='query', help="prefixo dos arquivos")
+            comando.set_defaults(banco=None, catalogo=None)
+
+    lote = comandos.add_parser('lote', aliases=['batch'], help="analisa arquivos de comandos separados por ';'")
+    lote.add_argument('arquivos', nargs='*', help="arquivos SQL (sem nenhum ou '-', lê da entrada padrão)")
+    lote.add_argument('--workers', type=int, default=None, help="processos (padrão: um por núcleo; 1 = sem pool)")
+    lote.add_argument('--tamanho-lote', type=int, default=256, help="consultas por tarefa enviada a um processo")
+    lote.add_argument('--lotes-em-voo', type=int, default=None,
+                      help="lotes lidos antes de esperar o mais antigo (padrão: 2 por processo)")
+    lote.add_argument('--desordenado', action='store_true',
+                      help="escreve cada lote assim que termina, fora da ordem de entrada (use o campo indice)")
+    lote.add_argument('--so-validar', action='store_true', help="só valida e extrai os componentes")
+    lote.add_argument('--grafos', metavar='PASTA', help="grava os grafos de cada consulta válida nesta pasta")
+    lote.add_argument('--formato', choices=('svg', 'dot', 'png'), default='svg')
+    lote.add_argument('--saida', help="arquivo JSON Lines (padrão: saída padrão)")
+    lote.set_defaults(funcao=None)
+    return argumentos
+
+
+def main(argv=None) -> int:
+    args = criar_argumentos().parse_args(argv)
+    if args.funcao is None:
+        with perfilar() if args.profile else nullcontext() as perfil:
+            codigo = _lote(args)
+        if perfil is not None:
+            print(perfil.tabela(), file=sys.stderr)
+        return codigo
+
+    consultas = _consultas(args)
+    args.total = len(consultas)
+    todas_validas = True
+    with perfilar() if args.profile else nullcontext() as perfil:
+        for i, sql in enumerate(consultas, 1):
+            todas_validas &= args.funcao(ParserSQL(sql), args, i)
+    if perfil is not None:
+        print(perfil.tabela(), file=sys.stderr)
+    return 0 if todas_validas else 1
@@ -0,0 +1,260 @@
+"""
+Formato colunar binário em disco, lido por mmap.
+
+Uma tabela é uma pasta com:
+
+    cabecalho.json        esquema, número de linhas e estatísticas
+    coluna_0.bin          valores de largura fixa (int64 / float64 little-endian)
+    coluna_1.bin          códigos int32 de uma coluna de texto...
+    coluna_1.dic.json     ...e o dicionário ordenado (código i -> i-ésimo texto)
+    indice_0_hash.npz     índices criados sobre as colunas (ver `classes.indices`)
+
+Os arquivos .bin são mapeados com `mmap` e expostos como arrays NumPy sem
+cópia, então ler uma coluna não custa nada além das páginas tocadas; colunas
+que a projeção não usa nem chegam a ser mapeadas. Como o dicionário é
+ordenado, a ordem dos códigos é a ordem dos textos.
+
+    csv_para_colunar('dados/pedido.csv', 'dados/pedido')
+    banco.registrar_colunar('Pedido', 'dados/pedido')
+"""
+import json
+import mmap
+import os
+
+import numpy as np
+
+from .arquivos import TabelaArquivo
+from .estatisticas import EstatisticasColuna, EstatisticasTabela
+from .indices import carregar_indice, construir_indice
+
+CABECALHO = 'cabecalho.json'
+VERSAO = 1
+
+INTEIRO = 'int64'
+REAL = 'float64'
+TEXTO = 'texto'
+
+_DTYPES = {INTEIRO: np.dtype('<i8'), REAL: np.dtype('<f8'), TEXTO: np.dtype('<i4')}
+
+# Linhas sorteadas para as estatísticas gravadas no cabeçalho
+AMOSTRA_ESTATISTICAS = 100000
+
+
+def _tipo_de_valores(valores):
+    tipos = {type(v) for v in valores}
+    if tipos <= {int, bool}:
+        return INTEIRO
+    if tipos <= {int, float, bool}:
+        return REAL
+    if tipos <= {str}:
+        return TEXTO
+    raise ValueError(f"Coluna com tipos misturados não cabe no formato colunar: {sorted(t.__name__ for t in tipos)}")
+
+
+class _Gravador:
+    """Grava uma tabela coluna a coluna, em lotes."""
+
+    def __init__(self, pasta, tipos):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.tipos = tipos      # lista de (nome, tipo)
+        self.linhas = 0
+        self._arquivos = [open(os.path.join(pasta, f"coluna_{i}.bin"), 'wb') for i in range(len(tipos))]
+        self._dicionarios = [{} if tipo == TEXTO else None for _, tipo in tipos]
+
+    def acrescentar(self, lote):
+        """`lote` é uma lista de colunas (listas de valores), na ordem de `tipos`."""
+        for i, ((nome, tipo), valores) in enumerate(zip(self.tipos, lote)):
+            if tipo == TEXTO:
+                if any(not isinstance(v, str) for v in valores):
+                    raise ValueError(f"Valor não textual na coluna de texto {nome}")
+                dicionario = self._dicionarios[i]
+                codigos = [dicionario.setdefault(v, len(dicionario)) for v in valores]
+                dados = np.asarray(codigos, dtype=_DTYPES[TEXTO])
+            else:
+                try:
+                    dados = np.asarray(valores, dtype=_DTYPES[tipo])
+                except (TypeError, ValueError):
+                    raise ValueError(
+                        f"Valor fora do tipo {tipo} na coluna {nome}; informe o tipo da coluna (tipos=...)"
+                    ) from None
+            dados.tofile(self._arquivos[i])
+        self.linhas += len(lote[0]) if lote else 0
+
+    def fechar(self, amostra_estatisticas=AMOSTRA_ESTATISTICAS):
+        for f in self._arquivos:
+            f.close()
+        colunas = []
+        for i, (nome, tipo) in enumerate(self.tipos):
+            colunas.append({'nome': nome, 'tipo': tipo})
+            if tipo == TEXTO:
+                self._ordenar_dicionario(i)
+        cabecalho = {'versao': VERSAO, 'linhas': self.linhas, 'colunas': colunas}
+        _escrever_json(os.path.join(self.pasta, CABECALHO), cabecalho)
+
+        # Estatísticas lidas de volta pelo próprio leitor (amostra de linhas)
+        tabela = TabelaColunar(self.pasta)
+        cabecalho['estatisticas'] = {
+            nome: e.para_dict() for nome, e in tabela.coletar_estatisticas(amostra_estatisticas).colunas.items()
+        }
+        tabela.fechar()
+        _escrever_json(os.path.join(self.pasta, CABECALHO), cabecalho)
+
+    def _ordenar_dicionario(self, i):
+        # Reescreve os códigos para que a ordem dos códigos seja a dos textos
+        dicionario = self._dicionarios[i]
+        textos = sorted(dicionario)
+        novo_codigo = np.empty(len(textos), dtype=_DTYPES[TEXTO])
+        for codigo, texto in enumerate(textos):
+            novo_codigo[dicionario[texto]] = codigo
+        caminho = os.path.join(self.pasta, f"coluna_{i}.bin")
+        codigos = np.fromfile(caminho, dtype=_DTYPES[TEXTO])
+        if len(codigos):
+            novo_codigo[codigos].tofile(caminho)
+        _escrever_json(os.path.join(self.pasta, f"coluna_{i}.dic.json"), textos)
+
+
+def _escrever_json(caminho, dados):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+
+
+def gravar_colunar(pasta, colunas: dict, amostra_estatisticas=AMOSTRA_ESTATISTICAS):
+    """Grava colunas em memória (dict nome -> lista ou array) no formato colunar."""
+    listas = {c: v.tolist() if hasattr(v, 'tolist') else list(v) for c, v in colunas.items()}
+    gravador = _Gravador(pasta, [(c, _tipo_de_valores(v)) for c, v in listas.items()])
+    gravador.acrescentar(list(listas.values()))
+    gravador.fechar(amostra_estatisticas)
+
+
+def csv_para_colunar(caminho_csv, pasta, tipos=None, tamanho_lote=None,
+                     amostra_estatisticas=AMOSTRA_ESTATISTICAS):
+    """
+    Converte um CSV com cabeçalho (ou JSON lines) para o formato colunar,
+    lendo em lotes. Os tipos são inferidos do primeiro lote, como em
+    `arquivos.TabelaArquivo`, ou forçados por `tipos` (dict nome -> int/float/str).
+    """
+    opcoes = {'tamanho_lote': tamanho_lote} if tamanho_lote else {}
+    fonte = TabelaArquivo(caminho_csv, tipos=tipos, **opcoes)
+    gravador = None
+    for lote in fonte.lotes():
+        colunas = [fonte.decodificar(lote, nome) for nome in fonte.nomes]
+        if gravador is None:
+            tipos_colunas = []
+            for nome, valores in zip(fonte.nomes, colunas):
+                forcado = (tipos or {}).get(nome)
+                tipo = {int: INTEIRO, float: REAL, str: TEXTO}.get(forcado) or _tipo_de_valores(valores)
+                tipos_colunas.append((nome, tipo))
+            gravador = _Gravador(pasta, tipos_colunas)
+        gravador.acrescentar(colunas)
+    if gravador is None:
+        gravador = _Gravador(pasta, [(nome, TEXTO) for nome in fonte.nomes])
+    gravador.fechar(amostra_estatisticas)
+
+
+class TabelaColunar:
+    """Leitura de uma tabela no formato colunar; as colunas são mapeadas sob demanda."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        with open(os.path.join(pasta, CABECALHO), encoding='utf-8') as f:
+            self.cabecalho = json.load(f)
+        if self.cabecalho.get('versao') != VERSAO:
+            raise ValueError(f"Versão do formato colunar não suportada: {self.cabecalho.get('versao')}")
+        self.linhas = self.cabecalho['linhas']
+        self._posicao = {c['nome']: i for i, c in enumerate(self.cabecalho['colunas'])}
+        self._mapas = {}
+        self._dicionarios = {}
+
+    @property
+    def nomes(self) -> list:
+        return [c['nome'] for c in self.cabecalho['colunas']]
+
+    def tipo(self, nome) -> str:
+        return self.cabecalho['colunas'][self._posicao[nome]]['tipo']
+
+    def dados(self, nome):
+        """Array sem cópia sobre o arquivo da coluna (códigos, para colunas de texto)."""
+        if nome not in self._mapas:
+            i = self._posicao[nome]
+            dtype = _DTYPES[self.tipo(nome)]
+            if self.linhas == 0:
+                self._mapas[nome] = (None, np.empty(0, dtype=dtype))
+            else:
+                with open(os.path.join(self.pasta, f"coluna_{i}.bin"), 'rb') as f:
+                    mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapas[nome] = (mapa, np.frombuffer(mapa, dtype=dtype, count=self.linhas))
+        return self._mapas[nome][1]
+
+    def dicionario(self, nome):
+        """Textos de uma coluna de texto, ordenados (array NumPy)."""
+        if nome not in self._dicionarios:
+            i = self._posicao[nome]
+            with open(os.path.join(self.pasta, f"coluna_{i}.dic.json"), encoding='utf-8') as f:
+                textos = json.load(f)
+            self._dicionarios[nome] = np.array(textos, dtype=str) if textos else np.empty(0, dtype=str)
+        return self._dicionarios[nome]
+
+    def valores(self, nome, indices=None):
+        """
+        Valores da coluna (só nas linhas `indices`, se dadas). Números saem
+        como visões do mmap; textos são decodificados pelo dicionário.
+        """
+        dados = self.dados(nome)
+        if indices is not None:
+            dados = dados[indices]
+        if self.tipo(nome) == TEXTO:
+            return self.dicionario(nome)[dados]
+        return dados
+
+    def estatisticas(self):
+        """Estatísticas gravadas no cabeçalho (EstatisticasTabela), ou None."""
+        colunas = self.cabecalho.get('estatisticas')
+        if colunas is None:
+            return None
+        return EstatisticasTabela(self.linhas, {c: EstatisticasColuna.de_dict(e) for c, e in colunas.items()})
+
+    def coletar_estatisticas(self, amostra=AMOSTRA_ESTATISTICAS, semente=0):
+        indices = None
+        if amostra is not None and amostra < self.linhas:
+            indices = np.sort(np.random.default_rng(semente).choice(self.linhas, amostra, replace=False))
+        colunas = {}
+        for nome in self.nomes:
+            valores = self.valores(nome, indices).tolist()
+            colunas[nome] = EstatisticasColuna.coletar(valores, self.linhas if indices is not None else None)
+        return EstatisticasTabela(self.linhas, colunas)
+
+    def _caminho_indice(self, nome, tipo):
+        return os.path.join(self.pasta, f"indice_{self._posicao[nome]}_{tipo}.npz")
+
+    def criar_indice(self, nome, tipo):
+        """Constrói o índice `tipo` sobre a coluna e o grava na pasta da tabela."""
+        indice = construir_indice(self.valores(nome), tipo)
+        indice.salvar(self._caminho_indice(nome, tipo))
+        registro = {'coluna': nome, 'tipo': tipo}
+        indices = self.cabecalho.setdefault('indices', [])
+        if registro not in indices:
+            indices.append(registro)
+            _escrever_json(os.path.join(self.pasta, CABECALHO), self.cabecalho)
+        return indice
+
+    def indices(self) -> list:
+        """Índices gravados na pasta: lista de (coluna, tipo, Indice)."""
+        return [
+            (r['coluna'], r['tipo'], carregar_indice(self._caminho_indice(r['coluna'], r['tipo'])))
+            for r in self.cabecalho.get('indices', [])
+        ]
+
+    def carregar(self) -> dict:
+        """Todas as colunas (dict nome -> array), como no BancoDados."""
+        return {nome: self.valores(nome) for nome in self.nomes}
+
+    def fechar(self):
+        mapas = self._mapas
+        self._mapas = {}
+        for mapa, _ in mapas.values():
+            if mapa is not None:
+                try:
+                    mapa.close()
+                except BufferError:
+                    pass    # ainda há arrays apontando para o mapa; o GC fecha depois
@@ -0,0 +1,160 @@
+"""
+Desenho dos grafos de plano sem matplotlib: layout em camadas e saída em
+SVG ou Graphviz DOT, montadas como texto em memória.
+
+Os grafos de `classes.grafos` são árvores com as arestas do filho para o pai
+(a raiz é o nó SELECT). O layout põe a raiz no topo e cada nível abaixo
+dela; cada subárvore ocupa uma faixa horizontal da largura dos seus nós e o
+pai fica centrado sobre a faixa dos filhos. É uma passada pelos nós, sem
+iterações, então o mesmo grafo sai sempre com o mesmo desenho.
+"""
+from html import escape
+
+# Medidas em px (fonte monoespaçada de 12px)
+LARGURA_CARACTERE = 7.2
+ALTURA_LINHA = 15
+PREENCHIMENTO = 8       # entre o texto e a borda do nó
+ESPACO_HORIZONTAL = 24  # entre subárvores vizinhas
+ESPACO_VERTICAL = 44    # entre níveis
+MARGEM = 16
+ALTURA_TITULO = 28
+
+COR_NO = "#A3C4BC"
+COR_DESTAQUE = "#F4A6A6"    # nós com o atributo destaque (estimativa muito errada, no EXPLAIN ANALYZE)
+COR_ARESTA = "gray"
+
+
+def tamanho_do_no(rotulo) -> tuple:
+    """(largura, altura) da caixa de um nó; rótulos podem ter várias linhas."""
+    linhas = str(rotulo).split('\n')
+    return (max(len(l) for l in linhas) * LARGURA_CARACTERE + 2 * PREENCHIMENTO,
+            len(linhas) * ALTURA_LINHA + 2 * PREENCHIMENTO)
+
+
+def _arvore(G):
+    """Filhos de cada nó (na ordem de inserção) e as raízes (nós sem pai)."""
+    filhos = {n: [] for n in G}
+    raizes = []
+    for n in G:
+        pais = list(G.successors(n))
+        if pais:
+            filhos[pais[0]].append(n)
+        else:
+            raizes.append(n)
+    return filhos, raizes
+
+
+def layout_em_camadas(G) -> dict:
+    """
+    Centro (x, y) de cada nó, em px, com y crescendo para baixo: a raiz no
+    nível de cima e as folhas embaixo.
+    """
+    tamanhos = {n: tamanho_do_no(n) for n in G}
+    filhos, raizes = _arvore(G)
+    largura = {}
+    nivel = {}
+    x = {}
+
+    def medir(n):
+        largura_filhos = sum(medir(f) for f in filhos[n]) + ESPACO_HORIZONTAL * max(len(filhos[n]) - 1, 0)
+        largura[n] = max(tamanhos[n][0], largura_filhos)
+        return largura[n]
+
+    def posicionar(n, esquerda, profundidade):
+        nivel[n] = profundidade
+        x[n] = esquerda + largura[n] / 2
+        ocupada = sum(largura[f] for f in filhos[n]) + ESPACO_HORIZONTAL * max(len(filhos[n]) - 1, 0)
+        esquerda += (largura[n] - ocupada) / 2
+        for f in filhos[n]:
+            posicionar(f, esquerda, profundidade + 1)
+            esquerda += largura[f] + ESPACO_HORIZONTAL
+
+    esquerda = MARGEM
+    for raiz in raizes:
+        medir(raiz)
+        posicionar(raiz, esquerda, 0)
+        esquerda += largura[raiz] + ESPACO_HORIZONTAL
+
+    # Cada nível tem a altura do seu nó mais alto
+    alturas = {}
+    for n, p in nivel.items():
+        alturas[p] = max(alturas.get(p, 0), tamanhos[n][1])
+    centros = {}
+    topo = MARGEM
+    for p in sorted(alturas):
+        centros[p] = topo + alturas[p] / 2
+        topo += alturas[p] + ESPACO_VERTICAL
+    return {n: (x[n], centros[nivel[n]]) for n in G}
+
+
+def para_svg(G, titulo='') -> str:
+    """O grafo desenhado como um documento SVG (texto)."""
+    pos = layout_em_camadas(G)
+    tamanhos = {n: tamanho_do_no(n) for n in G}
+    deslocamento = ALTURA_TITULO if titulo else 0
+    largura = max((pos[n][0] + tamanhos[n][0] / 2 for n in G), default=0) + MARGEM
+    altura = max((pos[n][1] + tamanhos[n][1] / 2 for n in G), default=0) + MARGEM + deslocamento
+
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura:.0f}" height="{altura:.0f}" '
+        f'viewBox="0 0 {largura:.0f} {altura:.0f}" font-family="DejaVu Sans Mono, Menlo, Consolas, monospace" '
+        f'font-size="12">',
+        f'<defs><marker id="seta" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" markerHeight="7" '
+        f'orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="{COR_ARESTA}"/></marker></defs>',
+        f'<rect width="100%" height="100%" fill="white"/>',
+    ]
+    if titulo:
+        partes.append(f'<text x="{largura / 2:.1f}" y="{MARGEM + 4}" text-anchor="middle" '
+                      f'font-size="14" font-weight="bold">{escape(titulo)}</text>')
+
+    # Arestas do filho (embaixo) para o pai (em cima)
+    for u, v, dados in G.edges(data=True):
+        x1, y1 = pos[u][0], pos[u][1] - tamanhos[u][1] / 2 + deslocamento
+        x2, y2 = pos[v][0], pos[v][1] + tamanhos[v][1] / 2 + deslocamento
+        partes.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+                      f'stroke="{COR_ARESTA}" marker-end="url(#seta)"/>')
+        if dados.get('label'):
+            partes.append(f'<text x="{(x1 + x2) / 2 + 6:.1f}" y="{(y1 + y2) / 2 + 4:.1f}" font-size="10" '
+                          f'fill="#444">{escape(str(dados["label"]))}</text>')
+
+    for n, dados in G.nodes(data=True):
+        (cx, cy), (w, h) = pos[n], tamanhos[n]
+        cy += deslocamento
+        cor = COR_DESTAQUE if dados.get('destaque') else COR_NO
+        partes.append(f'<rect x="{cx - w / 2:.1f}" y="{cy - h / 2:.1f}" width="{w:.1f}" height="{h:.1f}" '
+                      f'rx="6" fill="{cor}" stroke="#6b8f86"/>')
+        linhas = str(n).split('\n')
+        primeira = cy - (len(linhas) - 1) * ALTURA_LINHA / 2 + 4
+        tspans = ''.join(
+            f'<tspan x="{cx:.1f}" y="{primeira + i * ALTURA_LINHA:.1f}">{escape(l)}</tspan>'
+            for i, l in enumerate(linhas)
+        )
+        partes.append(f'<text text-anchor="middle">{tspans}</text>')
+
+    partes.append('</svg>')
+    return '\n'.join(partes)
+
+
+def _texto_dot(texto) -> str:
+    return str(texto).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def para_dot(G, titulo='') -> str:
+    """O grafo em Graphviz DOT (texto), com a raiz no topo como no SVG."""
+    ids = {n: f"n{i}" for i, n in enumerate(G)}
+    linhas = [
+        'digraph plano {',
+        '  rankdir=BT;',
+        f'  node [shape=box, style="rounded,filled", fillcolor="{COR_NO}", fontname="monospace", fontsize=10];',
+        f'  edge [color="{COR_ARESTA}", fontsize=9];',
+    ]
+    if titulo:
+        linhas.append(f'  labelloc=t; label="{_texto_dot(titulo)}";')
+    for n, i in ids.items():
+        cor = f', fillcolor="{COR_DESTAQUE}"' if G.nodes[n].get('destaque') else ''
+        linhas.append(f'  {i} [label="{_texto_dot(n)}"{cor}];')
+    for u, v, dados in G.edges(data=True):
+        rotulo = f' [label="{_texto_dot(dados["label"])}"]' if dados.get('label') else ''
+        linhas.append(f'  {ids[u]} -> {ids[v]}{rotulo};')
+    linhas.append('}')
+    return '\n'.join(linhas)
@@ -0,0 +1,100 @@
+"""
+Classes de equivalência de colunas e os predicados que elas implicam.
+
+Numa junção interna, `p.Status_idStatus = s.idStatus` (no ON ou no WHERE)
+diz que as duas colunas têm o mesmo valor em toda tupla do resultado. As
+igualdades entre colunas formam classes (a = b e b = c põem a, b e c na
+mesma), e uma comparação com constante sobre um membro vale para todos:
+
+    ON p.Status_idStatus = s.idStatus WHERE s.idStatus >= 2
+        => p.Status_idStatus >= 2
+
+O predicado inferido cita uma relação só e pode descer até ela, filtrando
+antes da junção. A inferência olha só a forma dos termos (quem é coluna e
+quem é constante), nunca os valores, então vale igual para planos-modelo
+com Parametro no lugar dos literais (ver `classes.cache`).
+"""
+from .plano import Coluna, Comparacao, Literal, Parametro, termos_planos
+
+_CONSTANTES = (Literal, Parametro)
+
+
+class ClassesEquivalencia:
+    """União-busca sobre colunas identificadas por (alias, nome)."""
+
+    def __init__(self):
+        self._pai = {}
+        self._coluna = {}   # chave -> a primeira Coluna vista com ela, como foi escrita
+
+    def _raiz(self, chave):
+        pai = self._pai
+        while pai[chave] != chave:
+            pai[chave] = pai[pai[chave]]
+            chave = pai[chave]
+        return chave
+
+    def adicionar(self, chave, coluna):
+        if chave not in self._pai:
+            self._pai[chave] = chave
+            self._coluna[chave] = coluna
+
+    def unir(self, a, b):
+        ra, rb = self._raiz(a), self._raiz(b)
+        if ra != rb:
+            self._pai[rb] = ra
+
+    def membros(self, chave):
+        """As outras colunas da classe de `chave`, na ordem em que apareceram."""
+        if chave not in self._pai:
+            return []
+        raiz = self._raiz(chave)
+        return [(c, self._coluna[c]) for c in self._pai if c != chave and self._raiz(c) == raiz]
+
+
+def inferir_predicados(predicados, resolver) -> list:
+    """
+    (alias, termo) para cada comparação com constante implicada pelas
+    igualdades entre colunas dos `predicados` (WHERE e ON de uma consulta só
+    com junções internas) e que ainda não está neles. `resolver(coluna)`
+    devolve o alias dono da coluna, ou None.
+    Só entram termos sobre relações diferentes da coluna original: numa
+    relação só, o filtro original já é aplicado no mesmo lugar.
+    """
+    termos = [t for predicado in predicados for t in termos_planos(predicado)]
+    classes = ClassesEquivalencia()
+    constantes = []     # (chave da coluna, termo, a coluna está à esquerda?)
+
+    for termo in termos:
+        if not isinstance(termo, Comparacao):
+            continue
+        esq, dir_ = termo.esq, termo.dir
+        if isinstance(esq, Coluna) and isinstance(dir_, Coluna):
+            if termo.op != '=':
+                continue
+            chaves = [(resolver(c), c.nome) for c in (esq, dir_)]
+            if any(alias is None for alias, _ in chaves):
+                continue
+            for chave, coluna in zip(chaves, (esq, dir_)):
+                classes.adicionar(chave, coluna)
+            classes.unir(*chaves)
+        elif isinstance(esq, Coluna) and isinstance(dir_, _CONSTANTES):
+            constantes.append(((resolver(esq), esq.nome), termo, True))
+        elif isinstance(dir_, Coluna) and isinstance(esq, _CONSTANTES):
+            constantes.append(((resolver(dir_), dir_.nome), termo, False))
+
+    existentes = set(termos)
+    inferidos = []
+    for chave, termo, coluna_a_esquerda in constantes:
+        if chave[0] is None:
+            continue
+        for (alias, _), coluna in classes.membros(chave):
+            if alias == chave[0]:
+                continue
+            if coluna_a_esquerda:
+                novo = Comparacao(coluna, termo.op, termo.dir)
+            else:
+                novo = Comparacao(termo.esq, termo.op, coluna)
+            if novo not in existentes:
+                existentes.add(novo)
+                inferidos.append((alias, novo))
+    return inferidos
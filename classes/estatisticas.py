@@ -0,0 +1,321 @@
+"""
+Catálogo de estatísticas das tabelas e estimativa de seletividade.
+
+Por tabela: número de linhas. Por coluna: valores distintos, mínimo/máximo,
+histograma equi-depth (cada faixa com a mesma fração das linhas) e os
+valores mais comuns (MCV) com suas frequências. O catálogo pode ser montado
+a partir dos dados (inteiros ou por amostra) ou lido de um arquivo JSON:
+
+    {"tabelas": {"Pedido": {"linhas": 100000, "colunas": {
+        "valor": {"distintos": 1000, "minimo": 1, "maximo": 1000,
+                  "histograma": [1, 51, 101, ..., 1000],
+                  "mcv": [[500, 0.002], ...]}}}}}
+
+`EstimadorEstatisticas` usa o catálogo para responder às mesmas perguntas do
+`juncoes.EstimadorPadrao` (linhas por tabela e seletividade de cada termo),
+caindo nos valores padrão quando falta estatística.
+"""
+import json
+import math
+import random
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from .juncoes import EstimadorPadrao
+from .plano import (
+    Coluna, Comparacao, Juncao, Literal, Projecao, Relacao, Renomear, Selecao, Vazia, relacoes, termos,
+)
+
+N_FAIXAS = 20
+N_MCV = 10
+
+# a op b  <=>  b op' a
+_INVERTIDO = {'=': '=', '<>': '<>', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+class EstatisticasColuna:
+    """Estatísticas de uma coluna; `mcv` é uma lista de (valor, fração das linhas)."""
+    __slots__ = ('distintos', 'minimo', 'maximo', 'histograma', 'mcv')
+
+    def __init__(self, distintos, minimo=None, maximo=None, histograma=None, mcv=None):
+        self.distintos = distintos
+        self.minimo = minimo
+        self.maximo = maximo
+        self.histograma = list(histograma or [])
+        self.mcv = [tuple(par) for par in (mcv or [])]
+
+    @classmethod
+    def coletar(cls, valores, total=None):
+        """
+        Estatísticas de uma lista de valores. Se `valores` for uma amostra de
+        uma coluna com `total` linhas, o número de distintos é extrapolado.
+        """
+        n = len(valores)
+        contagem = Counter(valores)
+        distintos = len(contagem)
+        if total is not None and total > n > 0:
+            distintos = _extrapolar_distintos(contagem, n, total)
+
+        mcv = [(v, c / n) for v, c in contagem.most_common(N_MCV) if c > 1]
+        try:
+            ordenados = sorted(valores)
+        except TypeError:   # tipos misturados: sem ordem, sem histograma
+            return cls(distintos, mcv=mcv)
+        if not ordenados:
+            return cls(distintos)
+        faixas = min(N_FAIXAS, n)
+        histograma = [ordenados[min(n - 1, i * n // faixas)] for i in range(faixas)] + [ordenados[-1]]
+        return cls(distintos, ordenados[0], ordenados[-1], histograma, mcv)
+
+    def para_dict(self) -> dict:
+        return {
+            'distintos': self.distintos,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'histograma': self.histograma,
+            'mcv': [list(par) for par in self.mcv],
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados['distintos'], dados.get('minimo'), dados.get('maximo'),
+                   dados.get('histograma'), dados.get('mcv'))
+
+    # Seletividades (fração das linhas que satisfazem `coluna op valor`)
+
+    def igual(self, valor) -> float:
+        for v, frequencia in self.mcv:
+            if v == valor:
+                return frequencia
+        try:
+            if self.minimo is not None and (valor < self.minimo or valor > self.maximo):
+                return 0.0
+        except TypeError:
+            return 0.0      # tipo diferente do da coluna: nenhuma linha é igual
+        restante = 1.0 - sum(f for _, f in self.mcv)
+        outros = self.distintos - len(self.mcv)
+        return max(restante, 0.0) / outros if outros > 0 else 0.0
+
+    def menor(self, valor, inclusivo) -> float:
+        """Fração com coluna < valor (<= se `inclusivo`). None se não der para estimar."""
+        try:
+            if self.histograma:
+                fracao = self._fracao_histograma(valor)
+            elif self.minimo is not None:
+                fracao = _interpolar(self.minimo, self.maximo, valor)
+            else:
+                return None
+        except TypeError:
+            return None
+        if inclusivo:
+            fracao += self.igual(valor)
+        return min(max(fracao, 0.0), 1.0)
+
+    def _fracao_histograma(self, valor) -> float:
+        limites = self.histograma
+        faixas = len(limites) - 1
+        if faixas < 1 or valor <= limites[0]:
+            return 0.0
+        if valor > limites[-1]:
+            return 1.0
+        # faixa i vai de limites[i] a limites[i + 1]
+        i = min(bisect_left(limites, valor) - 1, faixas - 1)
+        dentro = _interpolar(limites[i], limites[i + 1], valor)
+        # valores repetidos em vários limites: conta as faixas inteiras que eles cobrem
+        j = bisect_right(limites, valor) - 1
+        if j > i + 1:
+            return min(j, faixas) / faixas
+        return (i + dentro) / faixas
+
+
+def _interpolar(inicio, fim, valor) -> float:
+    """Posição de `valor` entre `inicio` e `fim` (0 a 1); meio da faixa para texto."""
+    if isinstance(valor, (int, float)) and isinstance(inicio, (int, float)) and isinstance(fim, (int, float)):
+        if fim <= inicio:
+            return 0.5
+        return min(max((valor - inicio) / (fim - inicio), 0.0), 1.0)
+    if valor <= inicio:
+        return 0.0
+    if valor > fim:
+        return 1.0
+    return 0.5
+
+
+def _extrapolar_distintos(contagem, n, total) -> int:
+    """Estimador GEE: sqrt(N/n) * f1 + (distintos vistos mais de uma vez)."""
+    unicos = sum(1 for c in contagem.values() if c == 1)
+    if unicos == n:
+        return total    # nada se repetiu na amostra: trata como chave
+    repetidos = len(contagem) - unicos
+    return max(1, min(total, round(math.sqrt(total / n) * unicos + repetidos)))
+
+
+def _como_lista(valores):
+    # arrays NumPy viram listas de valores Python (int/str), como os literais da consulta
+    return valores.tolist() if hasattr(valores, 'tolist') else list(valores)
+
+
+class EstatisticasTabela:
+    __slots__ = ('linhas', 'colunas')
+
+    def __init__(self, linhas, colunas=None):
+        self.linhas = linhas
+        self.colunas = dict(colunas or {})
+
+
+class CatalogoEstatisticas:
+    """Estatísticas por tabela, preenchidas a partir dos dados ou de um JSON."""
+
+    def __init__(self):
+        self.tabelas = {}
+
+    def coletar(self, nome: str, colunas: dict, amostra: int = None, semente: int = 0):
+        """
+        Calcula as estatísticas da tabela `nome` a partir das colunas (dict
+        nome -> lista ou array). Com `amostra`, usa só esse número de linhas
+        sorteadas e extrapola os distintos.
+        """
+        total = len(next(iter(colunas.values()))) if colunas else 0
+        indices = None
+        if amostra is not None and amostra < total:
+            indices = sorted(random.Random(semente).sample(range(total), amostra))
+        colunas_estat = {}
+        for c, valores in colunas.items():
+            if indices is None:
+                colunas_estat[c] = EstatisticasColuna.coletar(_como_lista(valores))
+            else:
+                amostrados = valores[indices] if hasattr(valores, 'tolist') else [valores[i] for i in indices]
+                colunas_estat[c] = EstatisticasColuna.coletar(_como_lista(amostrados), total)
+        self.tabelas[nome] = EstatisticasTabela(total, colunas_estat)
+        return self
+
+    @classmethod
+    def de_banco(cls, banco, amostra: int = None, semente: int = 0):
+        """Catálogo com todas as tabelas de um executor.BancoDados."""
+        catalogo = cls()
+        for nome, colunas in banco.tabelas.items():
+            gravadas = colunas.estatisticas() if hasattr(colunas, 'estatisticas') else None
+            if gravadas is not None:        # formato colunar: já vêm no cabeçalho
+                catalogo.tabelas[nome] = gravadas
+                continue
+            if hasattr(colunas, 'carregar'):    # tabela em arquivo
+                colunas = colunas.carregar()
+            catalogo.coletar(nome, colunas, amostra, semente)
+        return catalogo
+
+    def para_dict(self) -> dict:
+        return {'tabelas': {
+            nome: {'linhas': t.linhas,
+                   'colunas': {c: e.para_dict() for c, e in t.colunas.items()}}
+            for nome, t in self.tabelas.items()
+        }}
+
+    @classmethod
+    def de_dict(cls, dados):
+        catalogo = cls()
+        for nome, t in dados.get('tabelas', {}).items():
+            catalogo.tabelas[nome] = EstatisticasTabela(
+                t['linhas'],
+                {c: EstatisticasColuna.de_dict(e) for c, e in t.get('colunas', {}).items()},
+            )
+        return catalogo
+
+    def salvar(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.para_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with open(caminho, encoding='utf-8') as f:
+            return cls.de_dict(json.load(f))
+
+    def coluna(self, tabela, nome):
+        t = self.tabelas.get(tabela)
+        return t.colunas.get(nome) if t is not None else None
+
+
+class EstimadorEstatisticas(EstimadorPadrao):
+    """Estimador do otimizador baseado num CatalogoEstatisticas."""
+
+    def __init__(self, catalogo: CatalogoEstatisticas):
+        self.catalogo = catalogo
+
+    def linhas(self, tabela) -> float:
+        t = self.catalogo.tabelas.get(tabela)
+        return float(t.linhas) if t is not None else super().linhas(tabela)
+
+    def _estatisticas(self, coluna, alias_para_tabela):
+        if coluna.alias is None:
+            if len(alias_para_tabela) != 1:
+                return None
+            tabela = next(iter(alias_para_tabela.values()))
+        else:
+            tabela = alias_para_tabela.get(coluna.alias, coluna.alias)
+        return self.catalogo.coluna(tabela, coluna.nome)
+
+    def seletividade(self, termo, alias_para_tabela) -> float:
+        if not isinstance(termo, Comparacao):
+            return super().seletividade(termo, alias_para_tabela)
+        esq, op, dir_ = termo.esq, termo.op, termo.dir
+        if isinstance(esq, Literal) and isinstance(dir_, Coluna):
+            esq, op, dir_ = dir_, _INVERTIDO[op], esq
+
+        if isinstance(esq, Coluna) and isinstance(dir_, Literal):
+            estat = self._estatisticas(esq, alias_para_tabela)
+            if estat is not None:
+                resultado = _seletividade_constante(estat, op, dir_.valor)
+                if resultado is not None:
+                    return resultado
+
+        elif isinstance(esq, Coluna) and isinstance(dir_, Coluna) and op in ('=', '<>'):
+            e1 = self._estatisticas(esq, alias_para_tabela)
+            e2 = self._estatisticas(dir_, alias_para_tabela)
+            if e1 is not None and e2 is not None:
+                igual = 1 / max(e1.distintos, e2.distintos, 1)
+                return igual if op == '=' else 1 - igual
+
+        return super().seletividade(termo, alias_para_tabela)
+
+
+def _seletividade_constante(estat, op, valor):
+    if op == '=':
+        return estat.igual(valor)
+    if op == '<>':
+        return 1 - estat.igual(valor)
+    if op in ('<', '<='):
+        return estat.menor(valor, op == '<=')
+    menor_ou_igual = estat.menor(valor, op == '>')
+    return None if menor_ou_igual is None else 1 - menor_ou_igual
+
+
+def estimar_linhas(plano, estimador=None) -> dict:
+    """
+    Linhas estimadas na saída de cada nó do plano (dict nó -> linhas), com a
+    mesma conta usada para escolher a ordem das junções.
+    """
+    estimador = estimador or EstimadorPadrao()
+    alias_para_tabela = {alias: tabela for tabela, alias in relacoes(plano)}
+    estimativas = {}
+
+    def visitar(no):
+        if isinstance(no, Relacao):
+            linhas = estimador.linhas(no.tabela)
+        elif isinstance(no, Juncao):
+            linhas = visitar(no.esq) * visitar(no.dir)
+            for termo in termos(no.predicado):
+                linhas *= estimador.seletividade(termo, alias_para_tabela)
+        elif isinstance(no, Selecao):
+            linhas = visitar(no.filho)
+            for termo in termos(no.predicado):
+                linhas *= estimador.seletividade(termo, alias_para_tabela)
+        elif isinstance(no, (Renomear, Projecao)):
+            linhas = visitar(no.filho)
+        elif isinstance(no, Vazia):
+            linhas = 0
+        else:
+            raise TypeError(f"Nó de plano desconhecido: {type(no).__name__}")
+        estimativas[no] = linhas
+        return linhas
+
+    visitar(plano)
+    return estimativas
@@ -0,0 +1,974 @@
+"""
+Executor em memória para os planos lógicos (ver `classes.plano`).
+
+As tabelas são registradas como colunas (dict nome -> lista ou array NumPy)
+num `BancoDados`. Cada operador do plano vira um passo sobre colunas:
+
+    Relacao   -> scan (as colunas da tabela, sem cópia)
+    Renomear  -> troca o nome da relação (alias) das colunas
+    Selecao   -> máscara do predicado (ver `classes.predicados`) + recorte das linhas
+    Projecao  -> escolha das colunas
+    Juncao    -> hash join (serial ou em processos), sort-merge join ou block
+                 nested loop (ver `classes.fisico`)
+    Vazia     -> relação sem linhas, só com as colunas do esquema (as tabelas não são lidas)
+
+Tabelas em arquivo (`BancoDados.registrar_arquivo`) são lidas em lotes: a
+cadeia π(σ(ρ(tabela))) que o otimizador põe sobre cada relação é aplicada
+durante a leitura, decodificando só as colunas usadas e descartando as
+linhas filtradas lote a lote. No formato colunar (`registrar_colunar`) a
+mesma cadeia só mapeia as colunas que usa.
+
+Com índices (`BancoDados.criar_indice`, ver `classes.indices`), σ e ⨝ podem
+ser resolvidos por busca no índice em vez da varredura / do hash join.
+
+Os hash joins com filtros de Bloom (ver `classes.fisico`) executam primeiro o
+lado que constrói a tabela de hash, montam os filtros com as chaves dele e os
+aplicam na saída das varreduras do outro lado; `ResultadoExecucao.filtros`
+conta as linhas que cada filtro eliminou.
+
+A semântica é de multiconjunto (como no SQL): π não elimina duplicatas, então
+o plano literal e o otimizado devolvem as mesmas linhas.
+"""
+import os
+import time
+from collections import namedtuple
+from itertools import chain, islice
+
+from .plano import (
+    Coluna, Comparacao, Conjuncao, Juncao, Projecao, Relacao, Renomear, Selecao, Vazia,
+    cadeia_de_varredura, colunas as colunas_do_predicado, conjuncao, para_algebra, termos,
+)
+from .arquivos import TabelaArquivo
+from .fisico import (
+    HASH_JOIN, HASH_PARALELO, LIMITE_PARALELO, MERGE_JOIN, NESTED_LOOP, ORDEM_INDICE, ORDEM_TABELA,
+    escolher_juncoes,
+)
+from .predicados import ErroPredicado, compilar_predicado
+
+try:
+    import numpy as np
+    from .colunar import CABECALHO, TabelaColunar
+    from .indices import HASH, ORDENADO, construir_indice, escolher_acessos, expandir_faixas
+    from .paralelo import juntar_em_paralelo
+    from .bloom import FiltroBloom
+except ImportError:     # NumPy é opcional; listas funcionam sem ele
+    np = None
+    TabelaColunar = CABECALHO = None
+    HASH, ORDENADO = 'hash', 'ordenado'
+    escolher_acessos = juntar_em_paralelo = FiltroBloom = None
+
+
+class ErroExecucao(Exception):
+    """Plano que não pode ser executado (tabela/coluna inexistente, expressão não suportada...)."""
+
+
+# Estatística de um operador: rótulo, linhas produzidas, tempo próprio (s), profundidade
+# no plano, o nó do plano e a largura média das linhas produzidas, em bytes
+EstatisticaOperador = namedtuple('EstatisticaOperador', 'operador linhas tempo profundidade no largura',
+                                 defaults=(None, None))
+
+# Um filtro de Bloom aplicado: o texto dele, as linhas testadas na varredura,
+# as eliminadas, o tempo (s) de montar e aplicar e o tamanho do filtro em bytes
+EstatisticaFiltro = namedtuple('EstatisticaFiltro', 'filtro testadas eliminadas tempo bytes')
+
+# `filtros`: uma EstatisticaFiltro por filtro de Bloom aplicado
+ResultadoExecucao = namedtuple('ResultadoExecucao', 'colunas linhas operadores tempo_total filtros',
+                               defaults=((),))
+
+class BancoDados:
+    """Tabelas em memória, armazenadas por coluna."""
+
+    def __init__(self):
+        self.tabelas = {}
+        self.indices = {}   # tabela -> coluna -> tipo -> Indice
+        self._ordenadas = {}    # tabela -> coluna -> os valores estão em ordem? (ver `ordem`)
+
+    def registrar(self, nome: str, colunas: dict):
+        """Registra `nome` com as colunas dadas (todas do mesmo tamanho)."""
+        tamanhos = {len(valores) for valores in colunas.values()}
+        if len(tamanhos) > 1:
+            raise ValueError(f"Colunas de tamanhos diferentes na tabela {nome}: {sorted(tamanhos)}")
+        self.tabelas[nome] = {c: _como_coluna(v) for c, v in colunas.items()}
+        self.indices.pop(nome, None)
+        self._ordenadas.pop(nome, None)
+
+    def registrar_arquivo(self, nome: str, caminho, formato=None, tipos=None, **opcoes):
+        """
+        Registra `nome` como uma tabela em arquivo CSV ou JSON lines (ver
+        `arquivos.TabelaArquivo`), lida em lotes a cada execução.
+        """
+        self.tabelas[nome] = TabelaArquivo(caminho, formato, tipos, **opcoes)
+        self.indices.pop(nome, None)
+        self._ordenadas.pop(nome, None)
+
+    def registrar_colunar(self, nome: str, pasta):
+        """Registra `nome` como uma tabela no formato colunar (ver `classes.colunar`)."""
+        if TabelaColunar is None:
+            raise ErroExecucao("O formato colunar precisa do NumPy")
+        fonte = TabelaColunar(pasta)
+        self.tabelas[nome] = fonte
+        self.indices.pop(nome, None)
+        self._ordenadas.pop(nome, None)
+        # Índices gravados na pasta da tabela
+        for coluna, tipo, indice in fonte.indices():
+            self.indices.setdefault(nome, {}).setdefault(coluna, {})[tipo] = indice
+
+    def registrar_pasta(self, pasta):
+        """
+        Registra cada arquivo .csv / .jsonl / .ndjson de `pasta` (e cada subpasta no
+        formato colunar) com o nome do arquivo sem a extensão. Devolve os nomes.
+        """
+        nomes = []
+        for entrada in sorted(os.listdir(pasta)):
+            caminho = os.path.join(pasta, entrada)
+            nome, extensao = os.path.splitext(entrada)
+            if os.path.isdir(caminho):
+                if CABECALHO is None or not os.path.exists(os.path.join(caminho, CABECALHO)):
+                    continue
+                self.registrar_colunar(entrada, caminho)
+                nomes.append(entrada)
+            elif extensao.lower() in ('.csv', '.jsonl', '.ndjson'):
+                self.registrar_arquivo(nome, caminho)
+                nomes.append(nome)
+        return nomes
+
+    def criar_indice(self, tabela: str, coluna: str, tipo=HASH):
+        """
+        Cria um índice `tipo` ('hash' para '=', 'ordenado' também para
+        '<', '<=', '>', '>=') sobre tabela.coluna. Em tabelas do formato
+        colunar o índice é gravado na pasta da tabela.
+        """
+        if escolher_acessos is None:
+            raise ErroExecucao("Índices precisam do NumPy")
+        fonte = self.tabela(tabela)
+        if isinstance(fonte, TabelaArquivo):
+            raise ErroExecucao(f"Tabela em arquivo não aceita índice: {tabela} (converta para o formato colunar)")
+        if coluna not in (fonte.nomes if isinstance(fonte, TabelaColunar) else fonte):
+            raise ErroExecucao(f"Coluna inexistente: {tabela}.{coluna}")
+        try:
+            if isinstance(fonte, TabelaColunar):
+                indice = fonte.criar_indice(coluna, tipo)
+            else:
+                indice = construir_indice(fonte[coluna], tipo)
+        except ValueError as e:
+            raise ErroExecucao(f"{tabela}.{coluna}: {e}") from None
+        self.indices.setdefault(tabela, {}).setdefault(coluna, {})[tipo] = indice
+        return indice
+
+    def ordem(self, tabela: str, coluna: str):
+        """
+        Se tabela.coluna pode ser lida em ordem crescente (ver `classes.fisico`):
+        ORDEM_TABELA se os valores já estão ordenados, ORDEM_INDICE se há um
+        índice ordenado sobre ela, None se não. Tabelas em arquivo não são
+        verificadas; as outras, uma vez por coluna.
+        """
+        ordenadas = self._ordenadas.setdefault(tabela, {})
+        if coluna not in ordenadas:
+            fonte = self.tabelas.get(tabela)
+            colunar = TabelaColunar is not None and isinstance(fonte, TabelaColunar)
+            if colunar and coluna in fonte.nomes:
+                ordenadas[coluna] = _ordenada(fonte.valores(coluna))
+            elif isinstance(fonte, dict) and coluna in fonte:
+                ordenadas[coluna] = _ordenada(fonte[coluna])
+            else:
+                ordenadas[coluna] = False
+        if ordenadas[coluna]:
+            return ORDEM_TABELA
+        if ORDENADO in self.indices.get(tabela, {}).get(coluna, {}):
+            return ORDEM_INDICE
+        return None
+
+    def tabela(self, nome: str):
+        try:
+            return self.tabelas[nome]
+        except KeyError:
+            raise ErroExecucao(f"Tabela não registrada: {nome}") from None
+
+
+def _como_coluna(valores):
+    """
+    Listas de um único tipo viram arrays NumPy, para os filtros vetorizados.
+    Com tipos misturados a lista fica como está (o NumPy converteria tudo
+    para texto) e os filtros sobre ela são avaliados linha a linha.
+    """
+    if np is None or isinstance(valores, np.ndarray):
+        return valores
+    tipos = {type(v) for v in valores}
+    if tipos and (len(tipos) == 1 or tipos == {int, float}) and tipos <= {int, float, str, bool}:
+        return np.asarray(valores)
+    return valores
+
+
+def _como_lista(valores):
+    return valores.tolist() if np is not None and isinstance(valores, np.ndarray) else valores
+
+
+def _ordenada(valores) -> bool:
+    """Os valores estão em ordem crescente? Valores que não se comparam (tipos misturados) não estão."""
+    if np is not None and isinstance(valores, np.ndarray):
+        return valores.dtype.kind in 'biufU' and bool(np.all(valores[1:] >= valores[:-1]))
+    try:
+        return all(a <= b for a, b in zip(valores, islice(valores, 1, None)))
+    except TypeError:
+        return False
+
+
+class RelacaoMemoria:
+    """
+    Resultado intermediário: colunas indexadas por (alias, nome), o mapa
+    alias -> tabela real (para colunas qualificadas pelo nome da tabela) e o
+    número de linhas.
+    """
+    __slots__ = ('colunas', 'tabelas', 'n')
+
+    def __init__(self, colunas, tabelas, n):
+        self.colunas = colunas
+        self.tabelas = tabelas
+        self.n = n
+
+    def chave(self, coluna) -> tuple:
+        """Resolve uma Coluna do predicado para a chave (alias, nome) desta relação."""
+        if coluna.alias is not None:
+            chave = (coluna.alias, coluna.nome)
+            if chave in self.colunas:
+                return chave
+            for alias, tabela in self.tabelas.items():
+                if tabela == coluna.alias and (alias, coluna.nome) in self.colunas:
+                    return alias, coluna.nome
+            raise ErroExecucao(f"Coluna inexistente: {coluna}")
+        candidatas = [c for c in self.colunas if c[1] == coluna.nome]
+        if len(candidatas) != 1:
+            motivo = "inexistente" if not candidatas else "ambígua"
+            raise ErroExecucao(f"Coluna {motivo}: {coluna}")
+        return candidatas[0]
+
+    def tem(self, coluna) -> bool:
+        try:
+            self.chave(coluna)
+            return True
+        except ErroExecucao:
+            return False
+
+    def valores(self, coluna):
+        return self.colunas[self.chave(coluna)]
+
+    def recortar(self, indices):
+        """Nova relação só com as linhas em `indices` (na ordem dada)."""
+        return RelacaoMemoria(
+            {c: _tomar(v, indices) for c, v in self.colunas.items()},
+            self.tabelas, len(indices),
+        )
+
+
+# Amostra usada para medir a largura das linhas (o começo de cada coluna)
+AMOSTRA_LARGURA = 64
+
+
+def _largura_valor(valor) -> int:
+    if isinstance(valor, str):
+        return len(valor.encode('utf-8'))
+    if isinstance(valor, (int, float)):
+        return 8
+    return len(str(valor).encode('utf-8'))
+
+
+def _largura(rel) -> int:
+    """
+    Bytes por linha da relação: o tamanho do item nas colunas numéricas do
+    NumPy e, nas demais, a média dos valores do começo da coluna (texto em
+    UTF-8, números com 8 bytes).
+    """
+    total = 0.0
+    for valores in rel.colunas.values():
+        if np is not None and isinstance(valores, np.ndarray) and valores.dtype.kind in 'biuf':
+            total += valores.dtype.itemsize
+            continue
+        amostra = valores[:AMOSTRA_LARGURA]
+        if len(amostra):
+            total += sum(_largura_valor(v) for v in _como_lista(amostra)) / len(amostra)
+    return round(total)
+
+
+def _tomar(valores, indices):
+    if np is not None and isinstance(valores, np.ndarray):
+        return valores[np.asarray(indices, dtype=np.intp)]
+    return [valores[i] for i in indices]
+
+
+# Seleção
+
+def _linhas_que_passam(rel, predicado):
+    try:
+        mascara = compilar_predicado(predicado)(rel)
+    except ErroPredicado as e:
+        raise ErroExecucao(str(e)) from None
+    if np is not None and isinstance(mascara, np.ndarray):
+        return np.flatnonzero(mascara)
+    return [i for i, m in enumerate(mascara) if m]
+
+
+def _filtrar(rel, predicado):
+    return rel.recortar(_linhas_que_passam(rel, predicado))
+
+
+# Junção
+
+def _chaves_de_juncao(predicado, esq, dir_):
+    """
+    Separa o predicado da junção em pares de colunas (esq, dir) para o hash
+    join e o restante, avaliado depois sobre as linhas combinadas.
+    """
+    pares = []
+    residuo = []
+    for termo in termos(predicado):
+        if (isinstance(termo, Comparacao) and termo.op == '='
+                and isinstance(termo.esq, Coluna) and isinstance(termo.dir, Coluna)):
+            if esq.tem(termo.esq) and dir_.tem(termo.dir):
+                pares.append((esq.chave(termo.esq), dir_.chave(termo.dir)))
+                continue
+            if esq.tem(termo.dir) and dir_.tem(termo.esq):
+                pares.append((esq.chave(termo.dir), dir_.chave(termo.esq)))
+                continue
+        residuo.append(termo)
+    return pares, residuo
+
+
+def _combinar(esq, dir_, indices_esq, indices_dir):
+    colunas = {c: _tomar(v, indices_esq) for c, v in esq.colunas.items()}
+    colunas.update({c: _tomar(v, indices_dir) for c, v in dir_.colunas.items()})
+    return RelacaoMemoria(colunas, {**esq.tabelas, **dir_.tabelas}, len(indices_esq))
+
+
+def _juntar(esq, dir_, predicado, fisica=None):
+    """
+    ⨝ pelo algoritmo escolhido (uma fisico.JuncaoFisica). Sem escolha, hash
+    join se houver igualdade entre os lados e block nested loop se não.
+    """
+    algoritmo = fisica.algoritmo if fisica is not None else HASH_JOIN
+    if algoritmo == MERGE_JOIN:
+        rel = _juntar_ordenado(esq, dir_, predicado, fisica.chave)
+        if rel is not None:
+            return rel
+    pares, residuo = _chaves_de_juncao(predicado, esq, dir_)
+    if pares and algoritmo == HASH_PARALELO:
+        rel = _juntar_em_processos(esq, dir_, pares, residuo, fisica.processos)
+        if rel is not None:
+            return rel
+    if pares and algoritmo != NESTED_LOOP:
+        return _juntar_hash(esq, dir_, pares, residuo)
+    return _juntar_em_blocos(esq, dir_, predicado)
+
+
+def _juntar_em_processos(esq, dir_, pares, residuo, processos):
+    """
+    Hash join com as partições em processos (ver `classes.paralelo`), pela
+    primeira igualdade; as outras filtram os pares achados. None (e o hash
+    join serial) se as entradas reais forem pequenas ou as chaves não forem
+    arrays de um tipo que o particionamento aceita.
+    """
+    # Como no lado da tabela de hash: o plano decidiu pelas estimativas, os
+    # tamanhos reais confirmam
+    if juntar_em_paralelo is None or esq.n + dir_.n < LIMITE_PARALELO:
+        return None
+    chaves = [(esq.colunas[a], dir_.colunas[b]) for a, b in pares]
+    if not all(isinstance(v, np.ndarray) for par in chaves for v in par):
+        return None
+    # As outras igualdades são comparadas com ==, que só vale elemento a elemento
+    # entre números ou entre textos
+    if not all({a.dtype.kind, b.dtype.kind} <= set('iufb') or a.dtype.kind == b.dtype.kind in 'US'
+               for a, b in chaves[1:]):
+        return None
+    posicoes = juntar_em_paralelo(*chaves[0], processos)
+    if posicoes is None:
+        return None
+    indices_esq, indices_dir = posicoes
+    for chave_esq, chave_dir in chaves[1:]:
+        iguais = chave_esq[indices_esq] == chave_dir[indices_dir]
+        indices_esq, indices_dir = indices_esq[iguais], indices_dir[iguais]
+
+    resultado = _combinar(esq, dir_, indices_esq, indices_dir)
+    if residuo:
+        resultado = _filtrar(resultado, Conjuncao(tuple(residuo)))
+    return resultado
+
+
+def _juntar_hash(esq, dir_, pares, residuo):
+    # A tabela de hash fica com o lado menor. O plano escolheu o lado pelas
+    # estimativas; aqui os tamanhos reais já são conhecidos e decidem.
+    construir_esq = esq.n < dir_.n
+    constroi, sonda = (esq, dir_) if construir_esq else (dir_, esq)
+    lado = 0 if construir_esq else 1
+    chaves_constroi = [_como_lista(constroi.colunas[par[lado]]) for par in pares]
+    chaves_sonda = [_como_lista(sonda.colunas[par[1 - lado]]) for par in pares]
+
+    indices_esq = []
+    indices_dir = []
+    tabela_hash = {}
+    for i, chave in enumerate(zip(*chaves_constroi)):
+        tabela_hash.setdefault(chave, []).append(i)
+    for j, chave in enumerate(zip(*chaves_sonda)):
+        for i in tabela_hash.get(chave, ()):
+            if construir_esq:
+                indices_esq.append(i)
+                indices_dir.append(j)
+            else:
+                indices_esq.append(j)
+                indices_dir.append(i)
+
+    resultado = _combinar(esq, dir_, indices_esq, indices_dir)
+    if residuo:
+        resultado = _filtrar(resultado, Conjuncao(tuple(residuo)))
+    return resultado
+
+
+def _em_ordem(rel, chave):
+    """A relação em ordem pela coluna `chave` (ela mesma, se já estiver); None se os valores não se comparam."""
+    valores = rel.colunas[chave]
+    if _ordenada(valores):
+        return rel
+    if np is not None and isinstance(valores, np.ndarray) and valores.dtype.kind in 'biufU':
+        return rel.recortar(np.argsort(valores, kind='stable'))
+    try:
+        return rel.recortar(sorted(range(rel.n), key=valores.__getitem__))
+    except TypeError:
+        return None
+
+
+def _casar_ordenadas(a, b):
+    """Pares (i, j) com a[i] == b[j] de duas listas em ordem crescente, numa passada."""
+    indices_a, indices_b = [], []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif b[j] < a[i]:
+            j += 1
+        elif a[i] == b[j]:
+            fim_a, fim_b = i + 1, j + 1
+            while fim_a < len(a) and a[fim_a] == a[i]:
+                fim_a += 1
+            while fim_b < len(b) and b[fim_b] == b[j]:
+                fim_b += 1
+            for k in range(i, fim_a):
+                indices_a.extend([k] * (fim_b - j))
+                indices_b.extend(range(j, fim_b))
+            i, j = fim_a, fim_b
+        else:       # não se comparam (NaN)
+            i += 1
+    return indices_a, indices_b
+
+
+def _juntar_ordenado(esq, dir_, predicado, chave):
+    """
+    Sort-merge join pela igualdade `chave` (Coluna da esquerda, da direita).
+    Os lados chegam em ordem pela chave (os que não chegarem são ordenados
+    aqui) e cada faixa de valores iguais de um lado é casada com a do outro;
+    os demais termos do predicado filtram o resultado, que sai na ordem da
+    chave. None se os valores não se comparam (tipos misturados).
+    """
+    chave_esq, chave_dir = esq.chave(chave[0]), dir_.chave(chave[1])
+    esq, dir_ = _em_ordem(esq, chave_esq), _em_ordem(dir_, chave_dir)
+    if esq is None or dir_ is None:
+        return None
+    a, b = esq.colunas[chave_esq], dir_.colunas[chave_dir]
+    if (np is not None and isinstance(a, np.ndarray) and isinstance(b, np.ndarray)
+            and (a.dtype.kind in 'biuf' and b.dtype.kind in 'biuf' or a.dtype.kind == b.dtype.kind == 'U')):
+        # Busca binária de cada valor da esquerda na direita: as faixas iguais saem juntas
+        inicios, fins = np.searchsorted(b, a, 'left'), np.searchsorted(b, a, 'right')
+        indices_esq, indices_dir = expandir_faixas(inicios, fins, np.arange(dir_.n))
+    else:
+        try:
+            indices_esq, indices_dir = _casar_ordenadas(_como_lista(a), _como_lista(b))
+        except TypeError:
+            return None
+
+    resultado = _combinar(esq, dir_, indices_esq, indices_dir)
+    igualdades = (Comparacao(chave[0], '=', chave[1]), Comparacao(chave[1], '=', chave[0]))
+    resto = conjuncao(t for t in termos(predicado) if t not in igualdades)
+    if resto is not None:
+        resultado = _filtrar(resultado, resto)
+    return resultado
+
+
+# Pares (esquerda × direita) avaliados de uma vez pelo block nested loop
+PARES_POR_BLOCO = 1 << 16
+
+
+def _todos_os_pares(inicio, fim, n):
+    """Índices de cada linha da esquerda em [inicio, fim) com cada uma das `n` da direita."""
+    if np is not None:
+        return np.repeat(np.arange(inicio, fim), n), np.tile(np.arange(n), fim - inicio)
+    return [i for i in range(inicio, fim) for _ in range(n)], list(range(n)) * (fim - inicio)
+
+
+def _concatenar(partes):
+    if np is not None:
+        return np.concatenate(partes) if partes else np.empty(0, dtype=np.intp)
+    return list(chain.from_iterable(partes))
+
+
+def _juntar_em_blocos(esq, dir_, predicado):
+    """
+    Block nested loop, para qualquer predicado (a.x < b.y, produto
+    cartesiano): um bloco de linhas da esquerda contra todas as da direita
+    por vez, com o predicado avaliado sobre o bloco inteiro e só as colunas
+    que ele cita. A memória fica limitada pelo bloco, não por esquerda × direita.
+    """
+    bloco = max(1, PARES_POR_BLOCO // max(dir_.n, 1))
+    if predicado is not None:
+        juntas = RelacaoMemoria({**esq.colunas, **dir_.colunas}, {**esq.tabelas, **dir_.tabelas}, 0)
+        usadas = {juntas.chave(c) for c in colunas_do_predicado(predicado)}
+        esq_usada = RelacaoMemoria({c: v for c, v in esq.colunas.items() if c in usadas}, esq.tabelas, esq.n)
+        dir_usada = RelacaoMemoria({c: v for c, v in dir_.colunas.items() if c in usadas}, dir_.tabelas, dir_.n)
+
+    partes_esq, partes_dir = [], []
+    for inicio in range(0, esq.n, bloco):
+        indices_esq, indices_dir = _todos_os_pares(inicio, min(inicio + bloco, esq.n), dir_.n)
+        if predicado is not None:
+            passam = _linhas_que_passam(_combinar(esq_usada, dir_usada, indices_esq, indices_dir), predicado)
+            indices_esq, indices_dir = _tomar(indices_esq, passam), _tomar(indices_dir, passam)
+        partes_esq.append(indices_esq)
+        partes_dir.append(indices_dir)
+    return _combinar(esq, dir_, _concatenar(partes_esq), _concatenar(partes_dir))
+
+
+# Projeção
+
+def _projetar(rel, atributos):
+    colunas = {}
+    for atributo in atributos:
+        if atributo.endswith('.*'):
+            # todas as colunas de uma relação (SELECT * com as junções reordenadas)
+            alias = atributo[:-2]
+            alias = alias if alias in rel.tabelas else next(
+                (a for a, t in rel.tabelas.items() if t == alias), alias)
+            chaves = [c for c in rel.colunas if c[0] == alias]
+            if not chaves:
+                raise ErroExecucao(f"Relação inexistente: {alias}")
+        elif '.' in atributo:
+            alias, _, nome = atributo.partition('.')
+            chaves = [rel.chave(Coluna(alias, nome))]
+        else:
+            # π precoce (nomes sem alias) ou coluna simples do SELECT
+            chaves = [c for c in rel.colunas if c[1] == atributo]
+            if not chaves:
+                raise ErroExecucao(f"Atributo não suportado na execução: {atributo}")
+        for chave in chaves:
+            colunas[chave] = rel.colunas[chave]
+    return RelacaoMemoria(colunas, rel.tabelas, rel.n)
+
+
+# Relação vazia
+
+def _relacao_vazia(no, banco):
+    """Relação sem linhas com as colunas que `no` devolveria, sem ler nenhuma linha."""
+    if isinstance(no, Relacao):
+        fonte = banco.tabela(no.tabela)
+        nomes = list(fonte) if isinstance(fonte, dict) else fonte.nomes
+        return RelacaoMemoria({(no.tabela, c): [] for c in nomes}, {no.tabela: no.tabela}, 0)
+    if isinstance(no, Juncao):
+        return _combinar(_relacao_vazia(no.esq, banco), _relacao_vazia(no.dir, banco), [], [])
+    filho = _relacao_vazia(no.filho, banco)
+    if isinstance(no, Renomear):
+        return RelacaoMemoria({(no.alias, c[1]): v for c, v in filho.colunas.items()},
+                              {no.alias: next(iter(filho.tabelas.values()))}, 0)
+    if isinstance(no, Projecao):
+        return _projetar(filho, no.atributos)
+    return filho
+
+
+# Leitura de arquivos
+
+def _nomes_necessarios(atributos, alias, tabela, nomes):
+    """Colunas do arquivo que a projeção usa (todas se não houver projeção)."""
+    if atributos is None:
+        return list(nomes)
+    necessarios = []
+    for atributo in atributos:
+        prefixo, ponto, nome = atributo.rpartition('.')
+        if ponto and prefixo not in (alias, tabela):
+            continue
+        candidatos = nomes if nome == '*' else [nome] if nome in nomes else []
+        necessarios.extend(n for n in candidatos if n not in necessarios)
+    return necessarios
+
+
+def _varrer_arquivo(fonte, tabela, alias, predicado, atributos):
+    """
+    Lê o arquivo em lotes aplicando σ e π: primeiro decodifica só as colunas
+    do predicado, depois as demais colunas só nas linhas que passaram.
+    Devolve (relação, linhas lidas).
+    """
+    nomes = fonte.nomes
+    saida = {nome: [] for nome in _nomes_necessarios(atributos, alias, tabela, nomes)}
+    filtro = None
+    do_predicado = []
+    if predicado is not None:
+        try:
+            filtro = compilar_predicado(predicado)
+        except ErroPredicado as e:
+            raise ErroExecucao(str(e)) from None
+        for c in colunas_do_predicado(predicado):
+            if c.nome not in nomes:
+                raise ErroExecucao(f"Coluna inexistente: {c}")
+            if c.nome not in do_predicado:
+                do_predicado.append(c.nome)
+
+    lidas = 0
+    for lote in fonte.lotes():
+        lidas += len(lote)
+        if filtro is None:
+            for nome, valores in saida.items():
+                valores.extend(fonte.decodificar(lote, nome))
+            continue
+
+        rel_lote = RelacaoMemoria(
+            {(alias, c): _como_coluna(fonte.decodificar(lote, c)) for c in do_predicado},
+            {alias: tabela}, len(lote))
+        try:
+            mascara = filtro(rel_lote)
+        except ErroPredicado as e:
+            raise ErroExecucao(str(e)) from None
+        if np is not None and isinstance(mascara, np.ndarray):
+            indices = np.flatnonzero(mascara).tolist()
+        else:
+            indices = [i for i, m in enumerate(mascara) if m]
+        if not indices:
+            continue
+        for nome, valores in saida.items():
+            if nome in do_predicado:
+                valores.extend(_como_lista(_tomar(rel_lote.colunas[(alias, nome)], indices)))
+            else:
+                valores.extend(fonte.decodificar(lote, nome, indices))
+
+    n = len(next(iter(saida.values()))) if saida else 0
+    rel = RelacaoMemoria({(alias, c): _como_coluna(v) for c, v in saida.items()}, {alias: tabela}, n)
+    if atributos is not None:
+        rel = _projetar(rel, atributos)
+    return rel, lidas
+
+
+def _varrer_colunar(fonte, tabela, alias, predicado, atributos):
+    """
+    Varredura no formato colunar: avalia o predicado sobre as colunas que ele
+    usa (visões do mmap) e decodifica as colunas projetadas só nas linhas que
+    passaram. Devolve (relação, linhas lidas).
+    """
+    nomes = fonte.nomes
+    necessarios = _nomes_necessarios(atributos, alias, tabela, nomes)
+    indices = None
+    if predicado is not None:
+        do_predicado = []
+        for c in colunas_do_predicado(predicado):
+            if c.nome not in nomes:
+                raise ErroExecucao(f"Coluna inexistente: {c}")
+            if c.nome not in do_predicado:
+                do_predicado.append(c.nome)
+        rel_predicado = RelacaoMemoria({(alias, c): fonte.valores(c) for c in do_predicado},
+                                       {alias: tabela}, fonte.linhas)
+        try:
+            indices = np.flatnonzero(compilar_predicado(predicado)(rel_predicado))
+        except ErroPredicado as e:
+            raise ErroExecucao(str(e)) from None
+
+    n = fonte.linhas if indices is None else len(indices)
+    rel = RelacaoMemoria({(alias, c): fonte.valores(c, indices) for c in necessarios}, {alias: tabela}, n)
+    if atributos is not None:
+        rel = _projetar(rel, atributos)
+    return rel, fonte.linhas
+
+
+# Acesso por índice
+
+def _nomes_da_fonte(fonte):
+    return fonte.nomes if isinstance(fonte, TabelaColunar) else list(fonte)
+
+
+def _ler_posicoes(fonte, nomes, posicoes):
+    """Colunas `nomes` da tabela (em memória ou colunar) só nas linhas `posicoes`."""
+    if isinstance(fonte, TabelaColunar):
+        return {c: fonte.valores(c, posicoes) for c in nomes}
+    return {c: _tomar(fonte[c], posicoes) for c in nomes}
+
+
+def _nomes_lidos(fonte, tabela, alias, predicado, atributos):
+    """Colunas que a cadeia π/σ usa: as projetadas e as do predicado."""
+    nomes = _nomes_da_fonte(fonte)
+    lidos = _nomes_necessarios(atributos, alias, tabela, nomes)
+    for c in colunas_do_predicado(predicado):
+        if c.nome not in nomes:
+            raise ErroExecucao(f"Coluna inexistente: {c}")
+        if c.nome not in lidos:
+            lidos.append(c.nome)
+    return lidos
+
+
+def _varrer_em_ordem(indice, fonte, tabela, alias, predicado, atributos):
+    """
+    A tabela inteira lida na ordem de um índice ordenado, para um lado do
+    sort-merge join; o σ e a π da cadeia são aplicados às linhas lidas.
+    """
+    posicoes = indice.posicoes
+    nomes = _nomes_lidos(fonte, tabela, alias, predicado, atributos)
+    rel = RelacaoMemoria({(alias, c): v for c, v in _ler_posicoes(fonte, nomes, posicoes).items()},
+                         {alias: tabela}, len(posicoes))
+    if predicado is not None:
+        rel = _filtrar(rel, predicado)
+    if atributos is not None:
+        rel = _projetar(rel, atributos)
+    return rel, len(posicoes)
+
+
+def _varrer_indice(acesso, indice, fonte, tabela, alias, predicado, atributos):
+    """
+    Index scan: as linhas vêm da busca no índice pelo termo escolhido e os
+    outros termos do σ filtram o resultado. Devolve (relação, linhas lidas).
+    """
+    posicoes = indice.buscar(acesso.op, acesso.valor)
+    nomes = _nomes_lidos(fonte, tabela, alias, predicado, atributos)
+    rel = RelacaoMemoria({(alias, c): v for c, v in _ler_posicoes(fonte, nomes, posicoes).items()},
+                         {alias: tabela}, len(posicoes))
+    resto = conjuncao(t for t in termos(predicado) if t != acesso.termo)
+    if resto is not None:
+        rel = _filtrar(rel, resto)
+    if atributos is not None:
+        rel = _projetar(rel, atributos)
+    return rel, len(posicoes)
+
+
+# Execução do plano
+
+def _rotulo(no) -> str:
+    if isinstance(no, Relacao):
+        return no.tabela
+    if isinstance(no, Renomear):
+        return f"ρ_{{{no.alias}}}"
+    if isinstance(no, Selecao):
+        return f"σ_{{{no.predicado}}}"
+    if isinstance(no, Projecao):
+        return f"π_{{{', '.join(no.atributos)}}}"
+    if isinstance(no, Juncao):
+        return f"⨝_{{{no.predicado}}}" if no.predicado is not None else "×"
+    return para_algebra(no)
+
+
+class Executor:
+    """
+    Executa um plano sobre um BancoDados, medindo cada operador. `workers` é
+    o número de processos dos hash joins grandes (None: um por núcleo; 1 só
+    junta no próprio processo); bloom=False desliga os filtros de Bloom.
+    """
+
+    def __init__(self, banco: BancoDados, estimador=None, workers=None, bloom=True):
+        self.banco = banco
+        self.estimador = estimador
+        self.workers = workers
+        self.bloom = bloom and FiltroBloom is not None
+        self.operadores = []
+        self.acessos = {}
+        self.fisico = {}
+        self.em_ordem = {}
+        self.filtros = {}       # varredura -> [(SemijuncaoBloom, FiltroBloom, tempo de montar)]
+        self.estatisticas_filtros = []
+
+    def executar(self, plano) -> ResultadoExecucao:
+        self.operadores = []
+        self.filtros = {}
+        self.estatisticas_filtros = []
+        self.acessos = escolher_acessos(plano, self.banco.indices, self.estimador) if self.banco.indices else {}
+        self.fisico = escolher_juncoes(plano, self.estimador, self.banco.ordem, self.acessos,
+                                       self.workers if juntar_em_paralelo is not None else 1, self.bloom)
+        # Lados de sort-merge lidos pelo índice ordenado: nó -> coluna
+        self.em_ordem = {
+            lado: coluna.nome
+            for no, fisica in self.fisico.items() if fisica.algoritmo == MERGE_JOIN
+            for lado, fonte, coluna in zip((no.esq, no.dir), fisica.ordem, fisica.chave) if fonte == ORDEM_INDICE
+        }
+        inicio = time.perf_counter()
+        rel = self._executar(plano, 0)
+        total = time.perf_counter() - inicio
+
+        chaves = list(rel.colunas)
+        nomes = [f"{alias}.{nome}" for alias, nome in chaves]
+        linhas = list(zip(*(_como_lista(rel.colunas[c]) for c in chaves))) if chaves else [()] * rel.n
+        return ResultadoExecucao(nomes, linhas, self.operadores, total, self.estatisticas_filtros)
+
+    def _executar(self, no, profundidade):
+        cadeia = cadeia_de_varredura(no)
+        if cadeia is not None:
+            fonte = self.banco.tabela(cadeia[1])
+            if no in self.em_ordem:
+                indice = self.banco.indices[cadeia[1]][self.em_ordem[no]][ORDENADO]
+                return self._varrer(cadeia, profundidade, lambda *args: _varrer_em_ordem(indice, *args))
+            acesso = next((self.acessos[n] for n in cadeia[0] if n in self.acessos), None)
+            if acesso is not None:
+                indice = self.banco.indices[acesso.tabela][acesso.coluna][acesso.tipo]
+                return self._varrer(cadeia, profundidade,
+                                    lambda *args: _varrer_indice(acesso, indice, *args))
+            if isinstance(fonte, TabelaArquivo):
+                return self._varrer(cadeia, profundidade, _varrer_arquivo)
+            if TabelaColunar is not None and isinstance(fonte, TabelaColunar):
+                return self._varrer(cadeia, profundidade, _varrer_colunar)
+
+        if isinstance(no, Juncao) and no in self.acessos:
+            return self._juntar_por_indice(no, self.acessos[no], profundidade)
+
+        # Reserva a posição do operador antes dos filhos (ordem de pré-ordem)
+        posicao = len(self.operadores)
+        self.operadores.append(None)
+        tempo_filhos = 0.0
+        inicio = time.perf_counter()
+
+        if isinstance(no, Relacao):
+            colunas = self.banco.tabela(no.tabela)
+            n = len(next(iter(colunas.values()))) if colunas else 0
+            rel = RelacaoMemoria({(no.tabela, c): v for c, v in colunas.items()},
+                                 {no.tabela: no.tabela}, n)
+        elif isinstance(no, Vazia):
+            # Predicado contraditório: o filho nem é executado
+            rel = _relacao_vazia(no.filho, self.banco)
+        elif isinstance(no, Juncao):
+            fisica = self.fisico.get(no)
+            if fisica is not None and fisica.filtros:
+                esq, dir_, tempo_filhos = self._lados_com_filtros(no, fisica, profundidade)
+            else:
+                esq, t1 = self._filho(no.esq, profundidade)
+                dir_, t2 = self._filho(no.dir, profundidade)
+                tempo_filhos = t1 + t2
+            rel = _juntar(esq, dir_, no.predicado, fisica)
+        else:
+            filho, tempo_filhos = self._filho(no.filho, profundidade)
+            if isinstance(no, Renomear):
+                rel = RelacaoMemoria({(no.alias, c[1]): v for c, v in filho.colunas.items()},
+                                     {no.alias: next(iter(filho.tabelas.values()))}, filho.n)
+            elif isinstance(no, Selecao):
+                rel = _filtrar(filho, no.predicado)
+            elif isinstance(no, Projecao):
+                rel = _projetar(filho, no.atributos)
+            else:
+                raise ErroExecucao(f"Operador não suportado: {type(no).__name__}")
+
+        tempo = time.perf_counter() - inicio - tempo_filhos
+        self.operadores[posicao] = EstatisticaOperador(_rotulo(no), rel.n, tempo, profundidade, no, _largura(rel))
+        return rel
+
+    def _varrer(self, cadeia, profundidade, varredura):
+        """Executa a cadeia π/σ/ρ sobre a tabela numa única leitura."""
+        nos, tabela, alias, predicado, atributos = cadeia
+        inicio = time.perf_counter()
+        rel, lidas = varredura(self.banco.tabela(tabela), tabela, alias, predicado, atributos)
+        tempo = time.perf_counter() - inicio
+        self._registrar_cadeia(len(self.operadores), nos, rel, lidas, tempo, profundidade)
+        return rel
+
+    def _registrar_cadeia(self, posicao, nos, rel, lidas, tempo, profundidade):
+        # Um registro por nó, como na execução em memória; o tempo fica no nó de cima.
+        # A leitura só decodifica as colunas que a cadeia usa, então todos os
+        # nós ficam com a largura das linhas que ela devolve.
+        largura = _largura(rel)
+        registros = [
+            EstatisticaOperador(_rotulo(no), rel.n if isinstance(no, (Projecao, Selecao)) else lidas,
+                                tempo if i == 0 else 0.0, profundidade + i, no, largura)
+            for i, no in enumerate(nos)
+        ]
+        self.operadores[posicao:posicao + len(nos)] = registros
+
+    def _juntar_por_indice(self, no, acesso, profundidade):
+        """
+        Index nested loop: executa o lado externo e, para cada linha dele,
+        busca no índice as linhas do lado interno (uma cadeia π/σ/ρ sobre a
+        tabela indexada), aplicando o σ e a π dessa cadeia às linhas achadas.
+        """
+        posicao = len(self.operadores)
+        self.operadores.append(None)
+        inicio = time.perf_counter()
+
+        interno_no, externo_no = (no.dir, no.esq) if acesso.lado == 'dir' else (no.esq, no.dir)
+        nos, tabela, alias, predicado, atributos = cadeia_de_varredura(interno_no)
+        # Pré-ordem: o lado esquerdo é registrado antes do direito
+        posicao_interno = len(self.operadores) if acesso.lado == 'esq' else None
+        if posicao_interno is not None:
+            self.operadores.extend([None] * len(nos))
+        externo, tempo_externo = self._filho(externo_no, profundidade)
+
+        inicio_interno = time.perf_counter()
+        fonte = self.banco.tabela(tabela)
+        indice = self.banco.indices[tabela][acesso.coluna][acesso.tipo]
+        externas, posicoes = indice.sondar(_como_lista(externo.valores(acesso.externa)))
+        nomes = _nomes_lidos(fonte, tabela, alias, predicado, atributos)
+        interno = RelacaoMemoria({(alias, c): v for c, v in _ler_posicoes(fonte, nomes, posicoes).items()},
+                                 {alias: tabela}, len(posicoes))
+        if predicado is not None:
+            passam = _linhas_que_passam(interno, predicado)
+            interno = interno.recortar(passam)
+            externas = externas[passam]
+        if atributos is not None:
+            interno = _projetar(interno, atributos)
+        tempo_interno = time.perf_counter() - inicio_interno
+        if posicao_interno is None:
+            posicao_interno = len(self.operadores)
+            self.operadores.extend([None] * len(nos))
+        self._registrar_cadeia(posicao_interno, nos, interno, len(posicoes), tempo_interno, profundidade + 1)
+
+        todas = np.arange(interno.n)
+        if acesso.lado == 'dir':
+            rel = _combinar(externo, interno, externas, todas)
+        else:
+            rel = _combinar(interno, externo, todas, externas)
+        resto = conjuncao(t for t in termos(no.predicado) if t != acesso.termo)
+        if resto is not None:
+            rel = _filtrar(rel, resto)
+
+        tempo = time.perf_counter() - inicio - tempo_externo - tempo_interno
+        self.operadores[posicao] = EstatisticaOperador(_rotulo(no), rel.n, tempo, profundidade, no, _largura(rel))
+        return rel
+
+    def _lados_com_filtros(self, no, fisica, profundidade):
+        """
+        Executa o lado que constrói, monta os filtros de Bloom com as chaves
+        dele e só então o outro lado, cujas varreduras os aplicam. O tempo
+        de montar fica com o filtro, não com a junção.
+        """
+        posicao = len(self.operadores)
+        primeiro, segundo = (no.esq, no.dir) if fisica.constroi == 'esq' else (no.dir, no.esq)
+        construido, tempo_construido = self._filho(primeiro, profundidade)
+        inicio = time.perf_counter()
+        for filtro in fisica.filtros:
+            inicio_filtro = time.perf_counter()
+            bloom = FiltroBloom.montar(construido.valores(filtro.construcao))
+            self.filtros.setdefault(filtro.destino, []).append(
+                (filtro, bloom, time.perf_counter() - inicio_filtro))
+        tempo_montagem = time.perf_counter() - inicio
+        meio = len(self.operadores)
+        outro, tempo_outro = self._filho(segundo, profundidade)
+        if fisica.constroi == 'esq':
+            return construido, outro, tempo_construido + tempo_montagem + tempo_outro
+        # Pré-ordem: os operadores do lado esquerdo vêm antes dos do direito
+        self.operadores[posicao:] = self.operadores[meio:] + self.operadores[posicao:meio]
+        return outro, construido, tempo_construido + tempo_montagem + tempo_outro
+
+    def _aplicar_filtros(self, no, rel):
+        """Descarta as linhas da varredura `no` cujas chaves não estão nos filtros de Bloom dela."""
+        for filtro, bloom, tempo in self.filtros.pop(no):
+            inicio = time.perf_counter()
+            passam = bloom.contem(rel.valores(filtro.sonda))
+            if passam is None:      # tipos que não combinam: a junção resolve
+                continue
+            testadas = rel.n
+            rel = rel.recortar(np.flatnonzero(passam))
+            self.estatisticas_filtros.append(EstatisticaFiltro(
+                str(filtro), testadas, testadas - rel.n,
+                tempo + time.perf_counter() - inicio, bloom.nbytes))
+        return rel
+
+    def _filho(self, no, profundidade):
+        inicio = time.perf_counter()
+        rel = self._executar(no, profundidade + 1)
+        if no in self.filtros:
+            rel = self._aplicar_filtros(no, rel)
+        return rel, time.perf_counter() - inicio
+
+
+def executar(plano, banco: BancoDados, estimador=None, workers=None, bloom=True) -> ResultadoExecucao:
+    """Atalho para `Executor(banco, estimador, workers, bloom).executar(plano)`."""
+    return Executor(banco, estimador, workers, bloom).executar(plano)
@@ -0,0 +1,165 @@
+"""
+EXPLAIN ANALYZE: executa o plano literal e o otimizado sobre os dados
+registrados e mostra, operador a operador, as linhas reais, a largura das
+linhas em bytes, o tempo próprio e, quando a consulta usa estatísticas (ver
+`ParserSQL.usar_estatisticas`), as linhas estimadas.
+
+    explicacao = ParserSQL(sql).usar_estatisticas(catalogo).explicar(banco)
+    print(explicacao.tabela())
+
+O erro de uma estimativa é o fator entre ela e o real, para mais ou para
+menos (q-error): 1 é exata, 10 errou por uma ordem de grandeza. Operadores
+com erro de pelo menos `limiar` vezes são destacados na tabela e nos grafos;
+é por eles que se começa a calibrar as estatísticas e as heurísticas.
+
+Os filtros de Bloom das semijunções (ver `classes.fisico`) aparecem depois
+dos operadores, com as linhas que cada um testou e eliminou na varredura.
+"""
+from collections import namedtuple
+
+from .plano import linhas_estimadas
+
+# A partir de quantas vezes de erro a estimativa é destacada
+FATOR_DESVIO = 10
+
+
+def fator_de_erro(estimadas, reais) -> float:
+    """Quantas vezes a estimativa errou (1 = exata); contagens abaixo de 1 valem 1."""
+    estimadas, reais = max(estimadas, 1.0), max(reais, 1.0)
+    return max(estimadas / reais, reais / estimadas)
+
+
+class PlanoExplicado:
+    """Um plano executado: as estatísticas de cada operador e as estimativas, por nó."""
+
+    def __init__(self, plano, resultado, estimativas=None, limiar=FATOR_DESVIO):
+        self.plano = plano
+        self.resultado = resultado
+        self.estimativas = estimativas
+        self.limiar = limiar
+        self._por_no = {op.no: op for op in resultado.operadores if op.no is not None}
+
+    @property
+    def tempo_total(self) -> float:
+        return self.resultado.tempo_total
+
+    def real(self, no):
+        """EstatisticaOperador do nó (linhas, tempo, largura), ou None se ele não rodou."""
+        return self._por_no.get(no)
+
+    def estimadas(self, no):
+        return self.estimativas.get(no) if self.estimativas else None
+
+    def erro(self, no):
+        """Fator de erro da estimativa do nó (None sem estimativa ou sem execução)."""
+        real, estimadas = self.real(no), self.estimadas(no)
+        if real is None or estimadas is None:
+            return None
+        return fator_de_erro(estimadas, real.linhas)
+
+    def discrepante(self, no) -> bool:
+        erro = self.erro(no)
+        return erro is not None and erro >= self.limiar
+
+    def anotacao(self, no) -> str:
+        """Texto do nó nos grafos: real, largura e tempo; estimativa e erro quando houver."""
+        real = self.real(no)
+        if real is None:
+            return ''
+        texto = f"\nreal {real.linhas:,} linhas × {real.largura} B, {real.tempo * 1e3:.2f} ms"
+        estimadas = self.estimadas(no)
+        if estimadas is not None:
+            texto += f"\nestimado {linhas_estimadas(estimadas)} (erro {self.erro(no):.1f}x)"
+            if self.discrepante(no):
+                texto += " ⚠"
+        return texto
+
+    def operadores(self) -> list:
+        """Um dict por operador, em pré-ordem (como `ResultadoExecucao.operadores`)."""
+        linhas = []
+        for op in self.resultado.operadores:
+            estimadas = self.estimadas(op.no)
+            erro = self.erro(op.no)
+            linhas.append({
+                'operador': op.operador,
+                'profundidade': op.profundidade,
+                'linhas': op.linhas,
+                'largura_bytes': op.largura,
+                'tempo_ms': op.tempo * 1e3,
+                'estimadas': estimadas,
+                'erro': erro,
+                'discrepante': erro is not None and erro >= self.limiar,
+            })
+        return linhas
+
+    def filtros(self) -> list:
+        """Um dict por filtro de Bloom aplicado, com as linhas testadas e eliminadas."""
+        return [{
+            'filtro': f.filtro,
+            'testadas': f.testadas,
+            'eliminadas': f.eliminadas,
+            'tempo_ms': f.tempo * 1e3,
+            'bytes': f.bytes,
+        } for f in self.resultado.filtros]
+
+    def tabela(self) -> str:
+        """Os operadores como texto, para o terminal; `!` marca os discrepantes."""
+        cabecalho = f"  {'operador':<56} {'linhas':>11} {'bytes':>6} {'ms':>9}"
+        if self.estimativas:
+            cabecalho += f" {'estimadas':>11} {'erro':>7}"
+        linhas = [cabecalho]
+        for op in self.operadores():
+            nome = '  ' * op['profundidade'] + op['operador']
+            linha = (f"{'!' if op['discrepante'] else ' '} {nome:<56.56} {op['linhas']:>11,} "
+                     f"{op['largura_bytes']:>6} {op['tempo_ms']:>9.3f}")
+            if op['estimadas'] is not None:
+                linha += f" {op['estimadas']:>11,.0f} {op['erro']:>6.1f}x"
+            linhas.append(linha)
+        for f in self.filtros():
+            linhas.append(f"  {f['filtro']:<56.56} {f['eliminadas']:>11,} de {f['testadas']:,} linhas eliminadas "
+                          f"({f['bytes']:,} B, {f['tempo_ms']:.3f} ms)")
+        return '\n'.join(linhas)
+
+
+class ExplicacaoConsulta(namedtuple('ExplicacaoConsulta', 'literal otimizado')):
+    """Os dois planos da consulta executados sobre os mesmos dados."""
+    __slots__ = ()
+
+    @property
+    def aceleracao(self) -> float:
+        """Quantas vezes o plano otimizado foi mais rápido que o literal."""
+        return self.literal.tempo_total / max(self.otimizado.tempo_total, 1e-9)
+
+    def tabela(self) -> str:
+        return '\n'.join([
+            f"Plano literal: {self.literal.tempo_total * 1e3:.2f} ms",
+            self.literal.tabela(),
+            f"Plano otimizado: {self.otimizado.tempo_total * 1e3:.2f} ms ({self.aceleracao:.2f}x)",
+            self.otimizado.tabela(),
+        ])
+
+    def para_dict(self) -> dict:
+        return {
+            'linhas_resultado': len(self.otimizado.resultado.linhas),
+            'aceleracao': self.aceleracao,
+            'literal': {'tempo_ms': self.literal.tempo_total * 1e3, 'operadores': self.literal.operadores(),
+                        'filtros': self.literal.filtros()},
+            'otimizado': {'tempo_ms': self.otimizado.tempo_total * 1e3, 'operadores': self.otimizado.operadores(),
+                          'filtros': self.otimizado.filtros()},
+        }
+
+
+def explicar(parser, banco, limiar=FATOR_DESVIO):
+    """
+    Executa os dois planos da consulta sobre `banco` (um executor.BancoDados)
+    e devolve a ExplicacaoConsulta, ou None se a consulta for inválida.
+    """
+    planos = []
+    for otimizado in (False, True):
+        resultado = parser.executar(banco, otimizado)
+        if resultado is None:
+            return None
+        estimativas = parser.estimativas(otimizado) if parser.estatisticas is not None else None
+        plano = parser.plano_otimizado() if otimizado else parser.plano_logico()
+        planos.append(PlanoExplicado(plano, resultado, estimativas, limiar))
+    return ExplicacaoConsulta(*planos)
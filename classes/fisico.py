@@ -0,0 +1,231 @@
+"""
+Operadores físicos das junções.
+
+Cada ⨝ do plano otimizado é abstrato; aqui ele ganha o algoritmo que o
+executor vai usar, escolhido pela forma do predicado e pelas linhas
+estimadas de cada lado:
+
+  - hash join: precisa de uma igualdade entre colunas dos dois lados; a
+    tabela de hash é montada sobre o lado menor. Custo ≈ 2 × menor + maior;
+  - hash join paralelo: o mesmo, com os dois lados particionados pela chave
+    e as partições juntadas em `workers` processos (ver `classes.paralelo`).
+    Só a partir de LIMITE_PARALELO linhas; custo ≈ o do hash join dividido
+    pelos processos, mais o de particionar as duas entradas;
+  - sort-merge join: também precisa de uma igualdade, e os dois lados já
+    precisam vir em ordem pela coluna dela: uma tabela cuja coluna está
+    ordenada, uma lida na ordem de um índice ordenado ou a saída de outro
+    sort-merge na mesma chave. Custo ≈ linhas lidas dos dois lados (a tabela
+    inteira, no lado lido pelo índice);
+  - block nested loop: serve para qualquer predicado (a.x < b.y, produto
+    cartesiano); compara blocos de linhas da esquerda com todas as da
+    direita. Custo ≈ esquerda × direita.
+
+Fica o de menor custo; nos empates, a ordem acima. As junções por índice
+(index nested loop, ver `classes.indices`) já vêm escolhidas e não mudam.
+
+Num hash join cujo lado que constrói a tabela de hash tem um σ (e é o menor),
+as chaves desse lado viram um filtro de Bloom (ver `classes.bloom`) aplicado
+na varredura da relação dona da chave do outro lado, por mais fundo que ela
+esteja na cadeia de junções: como as junções são internas, uma linha cuja
+chave não está no filtro não chega ao resultado. O lado que constrói passa a
+ser executado primeiro.
+"""
+import os
+from collections import namedtuple
+
+from .plano import Coluna, Comparacao, Juncao, Projecao, Selecao, Vazia, cadeia_de_varredura, relacoes, termos
+from .juncoes import EstimadorPadrao
+from .estatisticas import estimar_linhas
+
+HASH_JOIN = 'hash join'
+HASH_PARALELO = 'hash join paralelo'
+MERGE_JOIN = 'sort-merge join'
+NESTED_LOOP = 'block nested loop'
+
+# De onde vem a ordem de um lado do sort-merge
+ORDEM_TABELA = 'tabela'     # a coluna já está ordenada na tabela
+ORDEM_INDICE = 'índice'     # a tabela é lida na ordem de um índice ordenado
+ORDEM_JUNCAO = 'junção'     # saída de um sort-merge na mesma chave
+
+# Montar a tabela de hash custa o dobro de sondá-la, por linha
+CUSTO_CONSTRUCAO = 2
+
+# Linhas nas duas entradas juntas a partir das quais o hash join vai para os
+# processos, e o custo por linha de particioná-las e copiá-las para eles
+LIMITE_PARALELO = 500_000
+CUSTO_PARTICAO = 0.5
+
+
+class SemijuncaoBloom(namedtuple('SemijuncaoBloom', 'construcao sonda destino')):
+    """
+    Filtro de Bloom de um hash join: as chaves `construcao` (Coluna) do lado
+    que constrói a tabela de hash filtram a coluna `sonda` na varredura
+    `destino`, o nó de cima de uma cadeia π/σ/ρ do outro lado.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"bloom {self.construcao} → {self.sonda}"
+
+
+class JuncaoFisica(namedtuple('JuncaoFisica', 'algoritmo custo constroi chave ordem processos filtros',
+                              defaults=(None, ()))):
+    """
+    Algoritmo de um ⨝ e o custo estimado. No hash join, `constroi` é o lado
+    ('esq' ou 'dir') da tabela de hash (e `processos`, no paralelo, quantos
+    processos) e `filtros` as SemijuncaoBloom que ele manda para o outro
+    lado; no sort-merge, `chave` é o par de Colunas (esquerda, direita) da
+    igualdade e `ordem` de onde vem a ordem de cada lado (ORDEM_TABELA,
+    ORDEM_INDICE ou ORDEM_JUNCAO).
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.algoritmo == HASH_JOIN:
+            detalhe = f" (hash sobre a {'esquerda' if self.constroi == 'esq' else 'direita'})"
+        elif self.algoritmo == HASH_PARALELO:
+            detalhe = f" ({self.processos} processos)"
+        elif self.algoritmo == MERGE_JOIN:
+            detalhe = f" (ordem: {self.ordem[0]} × {self.ordem[1]})"
+        else:
+            detalhe = ''
+        filtros = ''.join(f", {filtro}" for filtro in self.filtros)
+        return f"{self.algoritmo}{detalhe}, custo ≈{self.custo:,.0f}{filtros}"
+
+
+def _nomes(no) -> set:
+    """Aliases e tabelas das relações da subárvore (colunas podem usar qualquer um dos dois)."""
+    return {nome for par in relacoes(no) for nome in par}
+
+
+def pares_de_igualdade(predicado, esq, dir_) -> list:
+    """(Coluna da esquerda, Coluna da direita) de cada igualdade do predicado entre os dois lados."""
+    nomes_esq, nomes_dir = _nomes(esq), _nomes(dir_)
+    pares = []
+    for termo in termos(predicado):
+        if not (isinstance(termo, Comparacao) and termo.op == '='
+                and isinstance(termo.esq, Coluna) and isinstance(termo.dir, Coluna)):
+            continue
+        for a, b in ((termo.esq, termo.dir), (termo.dir, termo.esq)):
+            if a.alias in nomes_esq and b.alias in nomes_dir:
+                pares.append((a, b))
+                break
+    return pares
+
+
+def _filtrado(no) -> bool:
+    """A subárvore tem algum σ (ou uma contradição)?"""
+    if isinstance(no, (Selecao, Vazia)):
+        return True
+    if isinstance(no, Juncao):
+        return _filtrado(no.esq) or _filtrado(no.dir)
+    return hasattr(no, 'filho') and _filtrado(no.filho)
+
+
+def _varredura_de(no, coluna, acessos):
+    """O nó de cima da cadeia π/σ/ρ que lê a relação da coluna, ou None se não há uma a filtrar."""
+    cadeia = cadeia_de_varredura(no)
+    if cadeia is not None:
+        _, tabela, alias, _, _ = cadeia
+        return no if coluna.alias in (alias, tabela) else None
+    if isinstance(no, (Selecao, Projecao)):
+        return _varredura_de(no.filho, coluna, acessos)
+    if not isinstance(no, Juncao):
+        return None
+    lado = no.esq if coluna.alias in _nomes(no.esq) else no.dir
+    acesso = acessos.get(no)
+    # O lado interno de um index nested loop é lido pelo índice, não varrido
+    if acesso is not None and lado is (no.dir if acesso.lado == 'dir' else no.esq):
+        return None
+    return _varredura_de(lado, coluna, acessos)
+
+
+def escolher_juncoes(plano, estimador=None, ordem=None, acessos=None, workers=None, bloom=True) -> dict:
+    """
+    Algoritmo de cada ⨝ do plano: dict nó -> JuncaoFisica. `ordem(tabela,
+    coluna)` diz se a coluna pode ser lida em ordem (ORDEM_TABELA,
+    ORDEM_INDICE ou None; ver `BancoDados.ordem`); sem ela, só hash join e
+    block nested loop. ⨝ em `acessos` (index nested loop) ficam de fora.
+    `workers` é o número de processos do hash join paralelo (None: um por
+    núcleo; 1 desliga); com bloom=False, nenhum hash join leva filtros.
+    """
+    if plano is None:
+        return {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    estimador = estimador or EstimadorPadrao()
+    acessos = acessos or {}
+    estimativas = estimar_linhas(plano, estimador)
+    escolhas = {}
+
+    def ordenado_por(no, coluna):
+        """De onde vem a ordem de `no` pela coluna, ou None se ela não for garantida."""
+        cadeia = cadeia_de_varredura(no)
+        if cadeia is not None:
+            nos, tabela, alias, _, _ = cadeia
+            if ordem is None or coluna.alias not in (alias, tabela):
+                return None
+            fonte = ordem(tabela, coluna.nome)
+            # Uma busca no índice do σ devolve as linhas na ordem da tabela, não na do índice
+            if fonte == ORDEM_INDICE and any(n in acessos for n in nos):
+                return None
+            return fonte
+        if isinstance(no, (Selecao, Projecao)):
+            return ordenado_por(no.filho, coluna)
+        escolha = escolhas.get(no) if isinstance(no, Juncao) else None
+        if escolha is not None and escolha.algoritmo == MERGE_JOIN and coluna in escolha.chave:
+            return ORDEM_JUNCAO
+        return None
+
+    def custo_da_leitura(no, fonte):
+        if fonte == ORDEM_INDICE:
+            return estimador.linhas(cadeia_de_varredura(no)[1])
+        return estimativas[no]
+
+    def escolher(no):
+        n_esq, n_dir = estimativas[no.esq], estimativas[no.dir]
+        opcoes = []
+        pares = pares_de_igualdade(no.predicado, no.esq, no.dir)
+        if pares:
+            constroi = 'esq' if n_esq < n_dir else 'dir'
+            custo_hash = CUSTO_CONSTRUCAO * min(n_esq, n_dir) + max(n_esq, n_dir)
+            opcoes.append(JuncaoFisica(HASH_JOIN, custo_hash, constroi, None, None))
+            if workers > 1 and n_esq + n_dir >= LIMITE_PARALELO:
+                custo = CUSTO_PARTICAO * (n_esq + n_dir) + custo_hash / workers
+                opcoes.append(JuncaoFisica(HASH_PARALELO, custo, constroi, None, None, workers))
+        for par in pares:
+            fontes = (ordenado_por(no.esq, par[0]), ordenado_por(no.dir, par[1]))
+            if None not in fontes:
+                custo = custo_da_leitura(no.esq, fontes[0]) + custo_da_leitura(no.dir, fontes[1])
+                opcoes.append(JuncaoFisica(MERGE_JOIN, custo, None, par, fontes))
+                break
+        opcoes.append(JuncaoFisica(NESTED_LOOP, n_esq * n_dir, None, None, None))
+        escolha = min(opcoes, key=lambda o: o.custo)
+        if bloom and escolha.algoritmo in (HASH_JOIN, HASH_PARALELO):
+            escolha = escolha._replace(filtros=semijuncoes(no, escolha.constroi, pares))
+        return escolha
+
+    def semijuncoes(no, constroi, pares):
+        """Filtros de Bloom do lado que constrói para as varreduras do outro."""
+        lado, outro = (no.esq, no.dir) if constroi == 'esq' else (no.dir, no.esq)
+        if not _filtrado(lado) or estimativas[lado] >= estimativas[outro]:
+            return ()
+        filtros = []
+        for par in pares:
+            construcao, sonda = par if constroi == 'esq' else par[::-1]
+            destino = _varredura_de(outro, sonda, acessos)
+            if destino is not None:
+                filtros.append(SemijuncaoBloom(construcao, sonda, destino))
+        return tuple(filtros)
+
+    def visitar(no):
+        if isinstance(no, Juncao):
+            visitar(no.esq)
+            visitar(no.dir)
+            if no not in acessos:
+                escolhas[no] = escolher(no)
+        elif hasattr(no, 'filho') and not isinstance(no, Vazia):
+            visitar(no.filho)
+
+    visitar(plano)
+    return escolhas
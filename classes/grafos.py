@@ -1,272 +1,285 @@
 import os
-import re
-import networkx as nx
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+
 from classes.sqlparser import ParserSQL
+from classes.plano import Juncao, Projecao, Selecao, Vazia, folha, linhas_estimadas
+from classes.desenho import COR_DESTAQUE, COR_NO, layout_em_camadas, para_dot, para_svg, tamanho_do_no
+from classes import perfil
+
+# Formatos de saída: SVG e DOT são texto montado em memória; PNG passa pelo matplotlib
+FORMATOS = ('svg', 'dot', 'png')
+
+
+def _texto_origem(no):
+    """'tabela alias' (ou só 'tabela') de uma folha do plano, como no FROM/JOIN."""
+    tabela, alias = folha(no)
+    return tabela if alias == tabela else f"{tabela} {alias}"
+
 
+def _tem_juncao(no):
+    if isinstance(no, Juncao):
+        return True
+    filho = getattr(no, 'filho', None)
+    return filho is not None and _tem_juncao(filho)
 
-def _construir_grafo_literal(comp, G):
+
+def _adicionar_plano(no, G, ocultar, estimativas=None, acessos=None, execucao=None):
+    """
+    Imprime a subárvore `no` no grafo (arestas do filho para o pai) e devolve
+    o nó que a representa. Nós para os quais `ocultar(no)` é verdadeiro não
+    aparecem: o filho passa direto para o pai. Com `estimativas`, σ e ⨝
+    mostram as linhas estimadas; com `acessos`, o índice usado; com
+    `execucao` (um explicacao.PlanoExplicado), todos os nós mostram o que
+    a execução mediu e os de estimativa muito errada ficam destacados.
+    """
+    def rec(filho):
+        return _adicionar_plano(filho, G, ocultar, estimativas, acessos, execucao)
+
+    f = folha(no)
+    if f is not None:
+        tabela, alias = f
+        rotulo = tabela if alias == tabela else f"ρ: {alias}←{tabela}"
+        return _adicionar_no(G, rotulo, no, execucao)
+
+    if isinstance(no, Juncao):
+        esq = rec(no.esq)
+        dir_ = rec(no.dir)
+        condicao = f"⨝: {no.predicado}" if no.predicado is not None else "×: produto cartesiano"
+        rotulo = _adicionar_no(G, condicao + _anotacao(no, estimativas, acessos), no, execucao)
+        G.add_edge(esq, rotulo)
+        G.add_edge(dir_, rotulo)
+        return rotulo
+
+    if isinstance(no, Vazia):
+        # Contradição: o plano abaixo dela não é executado nem desenhado
+        return _adicionar_no(G, f"∅: relação vazia\n{no.motivo}", no, execucao)
+
+    filho = rec(no.filho)
+    if ocultar(no):
+        return filho
+    if isinstance(no, Selecao):
+        rotulo = f"σ: {no.predicado}" + _anotacao(no, estimativas, acessos)
+    else:
+        rotulo = f"π: {', '.join(no.atributos)}"
+    rotulo = _adicionar_no(G, rotulo, no, execucao)
+    G.add_edge(filho, rotulo)
+    return rotulo
+
+
+def _adicionar_no(G, rotulo, no, execucao):
+    if execucao is None:
+        G.add_node(rotulo)
+        return rotulo
+    rotulo += execucao.anotacao(no)
+    G.add_node(rotulo, destaque=execucao.discrepante(no))
+    return rotulo
+
+
+def _anotacao(no, estimativas, acessos=None):
+    texto = ''
+    if estimativas and no in estimativas:
+        texto += f"\n{linhas_estimadas(estimativas[no])} linhas"
+    if acessos and no in acessos:
+        texto += f"\n{acessos[no]}"
+    return texto
+
+
+def _adicionar_select(parser, plano, G, ocultar, estimativas, acessos, execucao=None):
+    """A projeção final do plano é desenhada como o nó SELECT da consulta."""
+    final = plano
+    if isinstance(plano, Projecao):
+        plano = plano.filho
+    topo = _adicionar_plano(plano, G, ocultar, estimativas, acessos, execucao)
+    select_node = f"SELECT: {parser.components['select']}"
+    if execucao is not None and final is not plano:
+        select_node = _adicionar_no(G, select_node, final, execucao)
+    else:
+        G.add_node(select_node)
+    G.add_edge(topo, select_node)
+
+
+def _construir_grafo_literal(parser, G, estimativas, acessos, execucao=None):
     """Grafo 1: Literal – ordem exata da query SQL."""
-    from_node = f"FROM: {comp.get('from', '')}"
+    analise = parser.analise()
+    from_node = f"FROM: {_texto_origem(analise.folhas[0])}"
     G.add_node(from_node)
 
     current = from_node
-    for i, join in enumerate(comp.get("joins", []), 1):
-        jnode = f"JOIN{i}: {join.get('table', '')}"
+    for i, (no, predicado) in enumerate(zip(analise.folhas[1:], analise.predicados_juncao), 1):
+        jnode = f"JOIN{i}: {_texto_origem(no)}"
         G.add_node(jnode)
-        G.add_edge(current, jnode, label=f"ON {join.get('on', '')}")
+        G.add_edge(current, jnode, label=f"ON {predicado}")
         current = jnode
 
-    if comp.get("where"):
-        where_node = f"WHERE: {comp['where']}"
+    if analise.predicado_where is not None:
+        where_node = f"WHERE: {analise.predicado_where}"
         G.add_node(where_node)
         G.add_edge(current, where_node)
         current = where_node
 
-    select_node = f"SELECT: {comp.get('select', '*')}"
+    select_node = f"SELECT: {parser.components['select']}"
     G.add_node(select_node)
     G.add_edge(current, select_node)
 
 
-def _construir_grafo_reducao_tuplas(parser, G):
+def _construir_grafo_reducao_tuplas(parser, G, estimativas, acessos, execucao=None):
     """Grafo 2: Heurística – Redução de Tuplas (seleções precoces)."""
-    comp = parser.components
-    tabelas = []
-
-    # Extrair tabelas com alias
-    from_part = comp['from']
-    if ' ' in from_part:
-        tab, alias = from_part.split(' ', 1)
-        tabelas.append((tab, alias.strip()))
-    else:
-        tabelas.append((from_part, from_part))
+    # Foco em σ: as projeções precoces ficam de fora deste grafo
+    _adicionar_select(parser, parser.plano_otimizado(), G,
+                      lambda no: isinstance(no, Projecao), estimativas, acessos, execucao)
 
-    for j in comp['joins']:
-        jp = j['table']
-        if ' ' in jp:
-            t, a = jp.split(' ', 1)
-            tabelas.append((t, a.strip()))
-        else:
-            tabelas.append((jp, jp))
-
-    alias_para_tabela = {alias: nome for nome, alias in tabelas}
-
-    # Separar seleções por tabela
-    selecoes = {alias: [] for _, alias in tabelas}
-    multi = []
-    if comp['where']:
-        conds = parser._quebrar_and(comp['where'])
-        for c in conds:
-            tabs = parser._extrair_tabelas_da_condicao(c, alias_para_tabela)
-            if len(tabs) == 1:
-                selecoes[list(tabs)[0]].append(c)
-            else:
-                multi.append(c)
-
-    # Criar nós
-    nos_tabela = {}
-    for nome, alias in tabelas:
-        base = nome
-        if alias != nome:
-            base = f"ρ: {alias}←{nome}"
-        if selecoes[alias]:
-            sigma = f"σ: {' ∧ '.join(selecoes[alias])}"
-            G.add_node(base)
-            G.add_node(sigma)
-            G.add_edge(base, sigma)
-            nos_tabela[alias] = sigma
-        else:
-            G.add_node(base)
-            nos_tabela[alias] = base
-
-    # Junções
-    aliases = [alias for _, alias in tabelas]
-    current = nos_tabela[aliases[0]]
-
-    for i in range(1, len(aliases)):
-        alias_atual = aliases[i]
-        join_cond = comp['joins'][i - 1]['on']
-        join_node = f"⨝: {join_cond}"
-        G.add_node(join_node)
-        G.add_edge(current, join_node)
-        G.add_edge(nos_tabela[alias_atual], join_node)
-        current = join_node
-
-    # Condições multi-tabela
-    if multi:
-        sigma_multi = f"σ: {' ∧ '.join(multi)}"
-        G.add_node(sigma_multi)
-        G.add_edge(current, sigma_multi)
-        current = sigma_multi
-
-    # SELECT
-    select_node = f"SELECT: {comp['select']}"
-    G.add_node(select_node)
-    G.add_edge(current, select_node)
 
-
-def _construir_grafo_reducao_atributos(parser, G):
+def _construir_grafo_reducao_atributos(parser, G, estimativas, acessos, execucao=None):
     """Grafo 3: Heurística – Redução de Atributos (projeções precoces)."""
-    comp = parser.components
-    tabelas = []
-
-    from_part = comp['from']
-    if ' ' in from_part:
-        tab, alias = from_part.split(' ', 1)
-        tabelas.append((tab, alias.strip()))
-    else:
-        tabelas.append((from_part, from_part))
-
-    for j in comp['joins']:
-        jp = j['table']
-        if ' ' in jp:
-            t, a = jp.split(' ', 1)
-            tabelas.append((t, a.strip()))
-        else:
-            tabelas.append((jp, jp))
-
-    alias_para_tabela = {alias: nome for nome, alias in tabelas}
-
-    # Coletar atributos usados
-    atributos_usados = set()
-    if comp['select'] != '*':
-        for a in comp['select'].split(','):
-            atributos_usados.add(a.strip())
-
-    # Condições
-    conds = []
-    if comp['where']:
-        conds.extend(parser._quebrar_and(comp['where']))
-    for j in comp['joins']:
-        conds.append(j['on'])
-
-    for c in conds:
-        ids = re.findall(r'\b([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)\b', c)
-        for id_ in ids:
-            if '.' in id_:
-                atributos_usados.add(id_)
-
-    # Mapear atributos por alias
-    attrs_por_alias = {alias: set() for _, alias in tabelas}
-    for attr in atributos_usados:
-        if '.' in attr:
-            pre, col = attr.split('.', 1)
-            if pre in attrs_por_alias:
-                attrs_por_alias[pre].add(col)
-            else:
-                for al, nome in alias_para_tabela.items():
-                    if nome == pre:
-                        attrs_por_alias[al].add(col)
-                        break
-
-    # Criar nós com projeção
-    nos_tabela = {}
-    for nome, alias in tabelas:
-        base = nome
-        if alias != nome:
-            base = f"ρ: {alias}←{nome}"
-        G.add_node(base)
-
-        attrs = attrs_por_alias[alias]
-        if attrs:
-            pi = f"π: {', '.join(sorted(attrs))}"
-            G.add_node(pi)
-            G.add_edge(base, pi)
-            nos_tabela[alias] = pi
-        else:
-            nos_tabela[alias] = base
-
-    # Junções
-    aliases = [alias for _, alias in tabelas]
-    current = nos_tabela[aliases[0]]
-
-    for i in range(1, len(aliases)):
-        alias_atual = aliases[i]
-        join_cond = comp['joins'][i - 1]['on']
-        join_node = f"⨝: {join_cond}"
-        G.add_node(join_node)
-        G.add_edge(current, join_node)
-        G.add_edge(nos_tabela[alias_atual], join_node)
-        current = join_node
-
-    # WHERE multi-tabela (se houver)
-    selecoes = {alias: [] for _, alias in tabelas}
-    multi = []
-    if comp['where']:
-        conds_w = parser._quebrar_and(comp['where'])
-        for c in conds_w:
-            tabs = parser._extrair_tabelas_da_condicao(c, alias_para_tabela)
-            if len(tabs) == 1:
-                # Já foi aplicado antes da projeção? Não neste grafo.
-                # Para simplicidade, ignoramos σ aqui (foco é π)
-                pass
-            else:
-                multi.append(c)
-
-    if multi:
-        sigma_multi = f"σ: {' ∧ '.join(multi)}"
-        G.add_node(sigma_multi)
-        G.add_edge(current, sigma_multi)
-        current = sigma_multi
-
-    # SELECT final
-    select_node = f"SELECT: {comp['select']}"
-    G.add_node(select_node)
-    G.add_edge(current, select_node)
+    # Foco em π: só o σ multi-tabela (acima das junções) aparece
+    _adicionar_select(parser, parser.plano_otimizado(), G,
+                      lambda no: isinstance(no, Selecao) and not _tem_juncao(no.filho),
+                      estimativas, acessos, execucao)
 
 
-def gerar_grafos_otimizados(sql_query, base_nome="query"):
+def construir_grafos(consulta, estatisticas=None, banco=None, explicacao=None):
     """
-    Gera três grafos:
+    Os três grafos da consulta como (sufixo, título, nx.DiGraph):
       1. Literal
       2. Redução de Tuplas (seleções precoces)
       3. Redução de Atributos (projeções precoces)
+    `consulta` é o texto SQL ou um ParserSQL já usado (a análise e os planos
+    guardados nele são aproveitados). Com `estatisticas` (CatalogoEstatisticas),
+    σ e ⨝ mostram as linhas estimadas; com `banco` (executor.BancoDados), os
+    índices que usam. Com `explicacao` (de `ParserSQL.explicar`), os nós
+    do plano otimizado mostram as linhas, a largura e o tempo medidos, e os
+    de estimativa muito errada são destacados. None se a consulta for inválida.
     """
-    parser = ParserSQL(sql_query)
+    # networkx (e o matplotlib, no PNG) só são importados quando um grafo é
+    # pedido: importar este módulo não custa nada a quem só valida consultas
+    import networkx as nx
+
+    parser = consulta if isinstance(consulta, ParserSQL) else ParserSQL(consulta)
+    if estatisticas is not None:
+        parser.usar_estatisticas(estatisticas)
+    if banco is not None:
+        parser.usar_indices(banco)
     if not parser.eh_valido():
+        return None
+
+    with perfil.etapa("grafos"):
+        # Estimativas e acessos calculados uma vez para os dois grafos do plano otimizado
+        estimativas = parser.estimativas() if parser.estatisticas is not None else None
+        acessos = parser.acessos()
+        execucao = None
+        if explicacao is not None:
+            # A execução já traz as estimativas, ao lado das linhas reais
+            estimativas, execucao = None, explicacao.otimizado
+        grafos = []
+        for sufixo, titulo, construir in (
+            ("literal", "Grafo Literal", _construir_grafo_literal),
+            ("tuplas", "Heurística: Redução de Tuplas", _construir_grafo_reducao_tuplas),
+            ("atributos", "Heurística: Redução de Atributos", _construir_grafo_reducao_atributos),
+        ):
+            G = nx.DiGraph()
+            with perfil.etapa(f"grafo_{sufixo}"):
+                construir(parser, G, estimativas, acessos, execucao)
+            if perfil.ATIVO:
+                perfil.medir(f"grafo_{sufixo}", {'nos': G.number_of_nodes(), 'arestas': G.number_of_edges()})
+            grafos.append((sufixo, titulo, G))
+    return grafos
+
+
+def renderizar(G, titulo, formato="svg"):
+    """O grafo em SVG ou DOT (str) ou PNG (bytes, via matplotlib)."""
+    with perfil.etapa(f"desenho_{formato}"):
+        return _renderizar(G, titulo, formato)
+
+
+def _renderizar(G, titulo, formato):
+    if formato == "svg":
+        return para_svg(G, titulo)
+    if formato == "dot":
+        return para_dot(G, titulo)
+    if formato == "png":
+        return _png(G, titulo)
+    raise ValueError(f"Formato de grafo desconhecido: {formato} (use {', '.join(FORMATOS)})")
+
+
+def renderizar_grafos(grafos, formato="svg", workers=None):
+    """
+    Renderiza os grafos de `construir_grafos` num pool de threads e devolve
+    as saídas na mesma ordem. Sem `workers`, o PNG usa uma thread por grafo
+    e SVG / DOT saem um depois do outro: levam menos de 1 ms cada, menos
+    que subir o pool.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de grafo desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    if workers is None:
+        workers = len(grafos) if formato == "png" else 1
+    workers = min(workers, len(grafos))
+    with perfil.etapa("desenho"):
+        if workers <= 1:
+            return [renderizar(G, titulo, formato) for _, titulo, G in grafos]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pendentes = [executor.submit(renderizar, G, titulo, formato) for _, titulo, G in grafos]
+            return [f.result() for f in pendentes]
+
+
+def gerar_grafos_otimizados(consulta, base_nome="query", estatisticas=None, banco=None, formato="svg",
+                            workers=None):
+    """
+    Gera os três grafos da consulta (ver `construir_grafos`) em
+    grafos/<base_nome>_<sufixo>.<formato>, renderizados em paralelo, e
+    devolve os caminhos.
+    """
+    grafos = construir_grafos(consulta, estatisticas, banco)
+    if grafos is None:
         print("[!] Consulta inválida – nenhum grafo gerado.")
-        return
-
-    comp = parser.components
-
-    # 1. Grafo Literal
-    G1 = nx.DiGraph()
-    _construir_grafo_literal(comp, G1)
-    _salvar_grafo(G1, f"{base_nome}_literal.png", "Grafo Literal")
-
-    # 2. Grafo Redução de Tuplas
-    G2 = nx.DiGraph()
-    _construir_grafo_reducao_tuplas(parser, G2)
-    _salvar_grafo(G2, f"{base_nome}_tuplas.png", "Heurística: Redução de Tuplas")
-
-    # 3. Grafo Redução de Atributos
-    G3 = nx.DiGraph()
-    _construir_grafo_reducao_atributos(parser, G3)
-    _salvar_grafo(G3, f"{base_nome}_atributos.png", "Heurística: Redução de Atributos")
-
-
-def _salvar_grafo(G, nome_arquivo, titulo):
-    pos = nx.spring_layout(G, seed=42)  # layout mais estável que shell
-    plt.figure(figsize=(10, 6))
-    nx.draw(
-        G, pos,
-        with_labels=True,
-        node_size=2200,
-        node_color="#A3C4BC",
-        font_size=9,
-        arrows=True,
-        edge_color="gray"
-    )
+        return []
+
+    os.makedirs("grafos", exist_ok=True)
+    caminhos = []
+    for (sufixo, titulo, _), conteudo in zip(grafos, renderizar_grafos(grafos, formato, workers)):
+        caminho = os.path.join("grafos", f"{base_nome}_{sufixo}.{formato}")
+        if isinstance(conteudo, bytes):
+            with open(caminho, "wb") as f:
+                f.write(conteudo)
+        else:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+        print(f"[✔] {titulo} salvo: {caminho}")
+        caminhos.append(caminho)
+    return caminhos
+
+
+def _png(G, titulo):
+    # matplotlib só é importado quando alguém pede PNG. A figura é montada
+    # pela API de objetos (sem pyplot), que pode rodar em várias threads.
+    import io
+    import networkx as nx
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    pos = layout_em_camadas(G)
+    largura = max((x + tamanho_do_no(n)[0] / 2 for n, (x, _) in pos.items()), default=1)
+    altura = max((y + tamanho_do_no(n)[1] / 2 for n, (_, y) in pos.items()), default=1)
+    pos = {n: (x, -y) for n, (x, y) in pos.items()}     # no matplotlib o y cresce para cima
+
+    # As medidas do layout são px de uma fonte de 12px; a de 9pt fica na mesma escala a 100 dpi
+    fig = Figure(figsize=(max(largura / 100, 4), max(altura / 100, 3)))
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(0, largura)
+    ax.set_ylim(-altura, 0)
+    nx.draw_networkx_edges(G, pos, ax=ax, arrows=True, edge_color="gray", node_size=1200)
+    destacados = {n for n, d in G.nodes(data=True) if d.get('destaque')}
+    for nos, cor in ((set(G) - destacados, COR_NO), (destacados, COR_DESTAQUE)):
+        if nos:
+            nx.draw_networkx_labels(G, pos, labels={n: n for n in nos}, ax=ax, font_size=9,
+                                    font_family="monospace",
+                                    bbox=dict(boxstyle="round,pad=0.5", fc=cor, ec="#6b8f86"))
     edge_labels = nx.get_edge_attributes(G, 'label')
     if edge_labels:
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-    plt.title(titulo)
-    plt.tight_layout()
+        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=7, rotate=False, ax=ax)
+    ax.set_title(titulo)
 
-    os.makedirs("grafos", exist_ok=True)
-    caminho = os.path.join("grafos", nome_arquivo)
-    plt.savefig(caminho, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"[✔] {titulo} salvo: {caminho}")
\ No newline at end of file
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=150, bbox_inches='tight')
+    return buffer.getvalue()
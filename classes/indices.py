@@ -0,0 +1,304 @@
+"""
+Índices secundários sobre colunas das tabelas e a escolha do caminho de acesso.
+
+    banco.criar_indice('Pedido', 'Cliente_idCliente')          # hash: só '='
+    banco.criar_indice('Pedido', 'valor', tipo='ordenado')     # '=', '<', '<=', '>', '>='
+
+Os dois tipos guardam as posições das linhas agrupadas pelo valor da coluna:
+o hash num dicionário valor -> faixa de posições, o ordenado num array de
+chaves ordenadas percorrido com busca binária. Nas tabelas do formato
+colunar o índice é gravado na pasta da tabela (ver `classes.colunar`); nas
+tabelas em memória ele vive só no BancoDados.
+
+`escolher_acessos` decide onde o plano usa os índices:
+
+  - σ sobre uma tabela: busca no índice (index scan) pelo termo mais
+    seletivo que casa com uma coluna indexada, se ele deixar no máximo
+    LIMITE_SELETIVIDADE das linhas; os outros termos filtram o resultado;
+  - ⨝ com igualdade entre colunas: index nested loop quando um dos lados é
+    uma tabela (com seus σ/π empurrados) indexada na coluna da igualdade e
+    sondar o índice para cada linha do outro lado sai mais barato que ler a
+    tabela inteira.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .plano import Coluna, Comparacao, Juncao, Literal, Selecao, Vazia, cadeia_de_varredura, relacoes, termos
+from .juncoes import EstimadorPadrao
+from .estatisticas import estimar_linhas
+
+HASH = 'hash'
+ORDENADO = 'ordenado'
+
+# Index scan só quando o termo deixa no máximo esta fração das linhas
+LIMITE_SELETIVIDADE = 0.25
+
+# Custo de uma sonda no índice, em linhas lidas por uma varredura
+CUSTO_SONDA = 3
+
+_INVERSO = {'=': '=', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+def _compativel(dtype, valor) -> bool:
+    """O valor pode ser comparado com chaves desse dtype (número com número, texto com texto)?"""
+    if isinstance(valor, str):
+        return dtype.kind == 'U'
+    return isinstance(valor, (int, float)) and dtype.kind in 'iufb'
+
+
+def _como_array(valores):
+    arr = np.asarray(valores)
+    if arr.dtype.kind not in 'iufbU':
+        raise ValueError("Índice precisa de uma coluna de números ou de textos (sem tipos misturados)")
+    return arr
+
+
+def expandir_faixas(inicios, fins, posicoes):
+    """Para cada j, as posições posicoes[inicios[j]:fins[j]]: (j repetido, posições)."""
+    contagens = fins - inicios
+    externos = np.repeat(np.arange(len(inicios)), contagens)
+    deslocamentos = np.arange(len(externos)) - np.repeat(np.cumsum(contagens) - contagens, contagens)
+    return externos, posicoes[np.repeat(inicios, contagens) + deslocamentos]
+
+
+class Indice:
+    """Base dos índices: `campos` são os arrays gravados em disco."""
+    tipo = None
+    operadores = frozenset()
+    campos = ()
+
+    def aceita(self, op, valor) -> bool:
+        """O índice responde a `coluna op valor`?"""
+        return op in self.operadores and _compativel(self.chaves.dtype, valor)
+
+    def salvar(self, caminho):
+        np.savez(caminho, tipo=np.array(self.tipo), **{c: getattr(self, c) for c in self.campos})
+
+
+class IndiceHash(Indice):
+    """
+    Valores distintos da coluna (`chaves`) e, para o i-ésimo, as posições
+    posicoes[inicios[i]:inicios[i+1]], em ordem crescente.
+    """
+    tipo = HASH
+    operadores = frozenset({'='})
+    campos = ('chaves', 'inicios', 'posicoes')
+
+    def __init__(self, chaves, inicios, posicoes):
+        self.chaves = chaves
+        self.inicios = inicios
+        self.posicoes = posicoes
+        self._mapa = None
+
+    @classmethod
+    def construir(cls, valores):
+        valores = _como_array(valores)
+        posicoes = np.argsort(valores, kind='stable')
+        chaves, inicios = np.unique(valores[posicoes], return_index=True)
+        return cls(chaves, np.append(inicios, len(valores)), posicoes)
+
+    @property
+    def mapa(self) -> dict:
+        """Valor -> número da chave (montado na primeira busca)."""
+        if self._mapa is None:
+            self._mapa = {c: i for i, c in enumerate(self.chaves.tolist())}
+        return self._mapa
+
+    def buscar(self, op, valor):
+        i = self.mapa.get(valor)
+        if i is None:
+            return np.empty(0, dtype=np.intp)
+        return self.posicoes[self.inicios[i]:self.inicios[i + 1]]
+
+    def sondar(self, valores):
+        """Posições iguais a cada valor: (índices em `valores`, posições na tabela)."""
+        mapa = self.mapa
+        achadas = np.fromiter((mapa.get(v, -1) for v in valores), dtype=np.intp, count=len(valores))
+        externos = np.flatnonzero(achadas >= 0)
+        i = achadas[externos]
+        j, posicoes = expandir_faixas(self.inicios[i], self.inicios[i + 1], self.posicoes)
+        return externos[j], posicoes
+
+
+class IndiceOrdenado(Indice):
+    """As posições das linhas (`posicoes`) na ordem dos valores (`chaves`, ordenadas)."""
+    tipo = ORDENADO
+    operadores = frozenset({'=', '<', '<=', '>', '>='})
+    campos = ('chaves', 'posicoes')
+
+    def __init__(self, chaves, posicoes):
+        self.chaves = chaves
+        self.posicoes = posicoes
+
+    @classmethod
+    def construir(cls, valores):
+        valores = _como_array(valores)
+        posicoes = np.argsort(valores, kind='stable')
+        return cls(valores[posicoes], posicoes)
+
+    def buscar(self, op, valor):
+        inicio = np.searchsorted(self.chaves, valor, 'left')
+        fim = np.searchsorted(self.chaves, valor, 'right')
+        faixa = {
+            '=': (inicio, fim), '<': (0, inicio), '<=': (0, fim),
+            '>': (fim, len(self.chaves)), '>=': (inicio, len(self.chaves)),
+        }[op]
+        return np.sort(self.posicoes[slice(*faixa)])
+
+    def sondar(self, valores):
+        """Posições iguais a cada valor: (índices em `valores`, posições na tabela)."""
+        arr = np.asarray(valores)
+        if arr.dtype.kind in 'iufb' and self.chaves.dtype.kind in 'iufb' or arr.dtype.kind == self.chaves.dtype.kind == 'U':
+            inicios = np.searchsorted(self.chaves, arr, 'left')
+            fins = np.searchsorted(self.chaves, arr, 'right')
+        else:
+            # tipos misturados: valor a valor, sem comparar número com texto
+            faixas = [
+                (np.searchsorted(self.chaves, v, 'left'), np.searchsorted(self.chaves, v, 'right'))
+                if _compativel(self.chaves.dtype, v) else (0, 0)
+                for v in valores
+            ]
+            inicios = np.array([f[0] for f in faixas], dtype=np.intp)
+            fins = np.array([f[1] for f in faixas], dtype=np.intp)
+        return expandir_faixas(inicios, fins, self.posicoes)
+
+
+TIPOS = {HASH: IndiceHash, ORDENADO: IndiceOrdenado}
+
+
+def construir_indice(valores, tipo=HASH) -> Indice:
+    """Índice `tipo` ('hash' ou 'ordenado') sobre os valores de uma coluna."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de índice desconhecido: {tipo} (use {', '.join(TIPOS)})")
+    return TIPOS[tipo].construir(valores)
+
+
+def carregar_indice(caminho) -> Indice:
+    """Lê um índice gravado por `Indice.salvar`."""
+    with np.load(caminho, allow_pickle=False) as dados:
+        classe = TIPOS[str(dados['tipo'])]
+        return classe(*(dados[c] for c in classe.campos))
+
+
+# Escolha do caminho de acesso
+
+class VarreduraIndice(namedtuple('VarreduraIndice', 'tabela coluna tipo termo op valor')):
+    """σ resolvido por busca no índice: `coluna op valor` vem do `termo` do predicado."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"índice {self.tipo} {self.tabela}.{self.coluna}"
+
+
+class JuncaoIndice(namedtuple('JuncaoIndice', 'lado tabela coluna tipo termo externa')):
+    """
+    ⨝ por index nested loop: o lado `lado` ('esq' ou 'dir') é lido pelo
+    índice de tabela.coluna, sondado com a Coluna `externa` do outro lado.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"index nested loop: índice {self.tipo} {self.tabela}.{self.coluna}"
+
+
+def _coluna_op_literal(termo, alias, tabela):
+    """(nome, op, valor) de `coluna op literal` (ou `literal op coluna`) sobre a relação; None se não."""
+    if not isinstance(termo, Comparacao) or termo.op not in _INVERSO:
+        return None
+    coluna, op, literal = termo.esq, termo.op, termo.dir
+    if isinstance(coluna, Literal):
+        coluna, op, literal = literal, _INVERSO[op], coluna
+    if not isinstance(coluna, Coluna) or not isinstance(literal, Literal):
+        return None
+    if coluna.alias not in (None, alias, tabela):
+        return None
+    return coluna.nome, op, literal.valor
+
+
+def _varredura_indice(tabela, alias, predicado, da_tabela, estimador, alias_para_tabela):
+    melhor = None
+    for termo in termos(predicado):
+        partes = _coluna_op_literal(termo, alias, tabela)
+        if partes is None:
+            continue
+        nome, op, valor = partes
+        for tipo, indice in da_tabela.get(nome, {}).items():
+            if not indice.aceita(op, valor):
+                continue
+            # Empate fica com o hash (busca num dicionário, sem reordenar posições)
+            chave = (estimador.seletividade(termo, alias_para_tabela), tipo != HASH)
+            if melhor is None or chave < melhor[0]:
+                melhor = (chave, VarreduraIndice(tabela, nome, tipo, termo, op, valor))
+    if melhor is not None and melhor[0][0] <= LIMITE_SELETIVIDADE:
+        return melhor[1]
+    return None
+
+
+def _juncao_indice(no, indices, estimador, estimativas):
+    melhor = None
+    for lado, interno, externo in (('dir', no.dir, no.esq), ('esq', no.esq, no.dir)):
+        cadeia = cadeia_de_varredura(interno)
+        if cadeia is None:
+            continue
+        _, tabela, alias, _, _ = cadeia
+        da_tabela = indices.get(tabela)
+        if not da_tabela:
+            continue
+        de_fora = {nome for par in relacoes(externo) for nome in par}
+        # Ganho: linhas da tabela que deixam de ser lidas, descontado o custo das sondas
+        ganho = estimador.linhas(tabela) - CUSTO_SONDA * estimativas[externo]
+        for termo in termos(no.predicado):
+            if not (isinstance(termo, Comparacao) and termo.op == '='
+                    and isinstance(termo.esq, Coluna) and isinstance(termo.dir, Coluna)):
+                continue
+            for coluna, outra in ((termo.esq, termo.dir), (termo.dir, termo.esq)):
+                if coluna.alias not in (alias, tabela) or outra.alias not in de_fora:
+                    continue
+                for tipo in da_tabela.get(coluna.nome, {}):
+                    chave = (ganho, tipo == HASH)
+                    if melhor is None or chave > melhor[0]:
+                        melhor = (chave, JuncaoIndice(lado, tabela, coluna.nome, tipo, termo, outra))
+    if melhor is not None and melhor[0][0] > 0:
+        return melhor[1]
+    return None
+
+
+def escolher_acessos(plano, indices, estimador=None) -> dict:
+    """
+    Caminhos de acesso por índice para o plano: dict nó -> VarreduraIndice
+    (nós σ sobre uma tabela) ou JuncaoIndice (nós ⨝). Os nós ausentes usam
+    a varredura / o hash join de sempre. `indices` é o mapa tabela -> coluna
+    -> tipo -> Indice (ver `BancoDados.indices`).
+    """
+    if not indices or plano is None:
+        return {}
+    estimador = estimador or EstimadorPadrao()
+    alias_para_tabela = {alias: tabela for tabela, alias in relacoes(plano)}
+    estimativas = estimar_linhas(plano, estimador)
+    acessos = {}
+
+    def visitar(no):
+        cadeia = cadeia_de_varredura(no)
+        if cadeia is not None:
+            nos, tabela, alias, predicado, _ = cadeia
+            if predicado is not None and indices.get(tabela):
+                acesso = _varredura_indice(tabela, alias, predicado, indices[tabela],
+                                           estimador, alias_para_tabela)
+                if acesso is not None:
+                    acessos[next(n for n in nos if isinstance(n, Selecao))] = acesso
+        elif isinstance(no, Juncao):
+            visitar(no.esq)
+            visitar(no.dir)
+            acesso = _juncao_indice(no, indices, estimador, estimativas)
+            if acesso is not None:
+                acessos[no] = acesso
+                # O lado interno é lido pelo índice da junção, não pelo do σ
+                interno = no.dir if acesso.lado == 'dir' else no.esq
+                for n in cadeia_de_varredura(interno)[0]:
+                    acessos.pop(n, None)
+        elif hasattr(no, 'filho') and not isinstance(no, Vazia):
+            visitar(no.filho)
+
+    visitar(plano)
+    return acessos
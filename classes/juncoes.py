@@ -0,0 +1,187 @@
+"""
+Ordem das junções por custo.
+
+O grafo de junções tem uma relação por vértice e uma aresta por termo que
+cita mais de um alias (condições do ON e do WHERE). A ordem escolhida é a de
+menor custo, medido como a soma das cardinalidades estimadas dos resultados
+intermediários (árvores left-deep, sem produto cartesiano):
+
+  - até LIMITE_PD relações: programação dinâmica à la Selinger sobre os
+    subconjuntos conexos;
+  - acima disso: guloso, sempre juntando a relação que gera o menor
+    resultado intermediário.
+
+Se o grafo for desconexo, o produto cartesiano é inevitável. Nesse caso ele
+só entra depois que todas as relações de uma componente conexa já foram
+juntadas, o que dá componentes - 1 produtos, o mínimo possível.
+
+Empates ficam com a ordem escrita na consulta.
+"""
+from .plano import Coluna, Comparacao, colunas
+
+LIMITE_PD = 10
+
+
+class EstimadorPadrao:
+    """
+    Estimativas sem estatísticas das tabelas (valores padrão do System R):
+    toda tabela tem LINHAS_PADRAO linhas, igualdade com constante seleciona
+    1/10, desigualdade 9/10, intervalos 1/3 e a igualdade entre colunas de
+    relações diferentes 1/max(|R|, |S|) (chave estrangeira para chave).
+    Não olha os valores dos literais, então o plano só depende da forma da consulta.
+    """
+    LINHAS_PADRAO = 1000
+
+    def linhas(self, tabela) -> float:
+        return float(self.LINHAS_PADRAO)
+
+    def seletividade(self, termo, alias_para_tabela) -> float:
+        if not isinstance(termo, Comparacao):
+            return 1 / 3
+        esq, dir_ = termo.esq, termo.dir
+        if isinstance(esq, Coluna) and isinstance(dir_, Coluna):
+            tabelas = {alias_para_tabela.get(c.alias, c.alias) for c in (esq, dir_)}
+            if termo.op == '=' and len(tabelas) == 2:
+                return 1 / max(self.linhas(t) for t in tabelas)
+        if termo.op == '=':
+            return 1 / 10
+        if termo.op == '<>':
+            return 9 / 10
+        return 1 / 3
+
+
+def arestas_de_juncao(termos_multiplos, aliases, resolver):
+    """
+    Arestas do grafo: (máscara de bits dos aliases, termo) para cada termo
+    que cita mais de uma relação. None se algum termo tiver coluna sem dono
+    conhecido (aí não dá para saber onde ele pode ser aplicado).
+    """
+    posicao = {alias: i for i, alias in enumerate(aliases)}
+    arestas = []
+    for termo in termos_multiplos:
+        donos = {resolver(c) for c in colunas(termo)}
+        if None in donos:
+            return None
+        mascara = 0
+        for alias in donos:
+            mascara |= 1 << posicao[alias]
+        arestas.append((mascara, termo))
+    return arestas
+
+
+def _conexos(n, arestas):
+    """Para cada relação, a máscara das vizinhas (arestas com vários aliases ligam todos)."""
+    vizinhas = [0] * n
+    for mascara, _ in arestas:
+        for i in range(n):
+            if mascara >> i & 1:
+                vizinhas[i] |= mascara & ~(1 << i)
+    return vizinhas
+
+
+def componentes_conexas(n, arestas) -> list:
+    """Índices das relações de cada componente conexa do grafo, na ordem da consulta."""
+    vizinhas = _conexos(n, arestas)
+    vistas = 0
+    componentes = []
+    for i in range(n):
+        if vistas >> i & 1:
+            continue
+        componente = 1 << i
+        fronteira = vizinhas[i]
+        while fronteira & ~componente:
+            novas = fronteira & ~componente
+            componente |= novas
+            for j in range(n):
+                if novas >> j & 1:
+                    fronteira |= vizinhas[j]
+        vistas |= componente
+        componentes.append(tuple(j for j in range(n) if componente >> j & 1))
+    return componentes
+
+
+class _Cardinalidade:
+    """Cardinalidade estimada de um conjunto de relações (independência entre termos)."""
+
+    def __init__(self, linhas_base, arestas, seletividades):
+        self.linhas_base = linhas_base
+        self.arestas = [(m, s) for (m, _), s in zip(arestas, seletividades)]
+        self._memo = {}
+
+    def __call__(self, conjunto):
+        resultado = self._memo.get(conjunto)
+        if resultado is None:
+            resultado = 1.0
+            for i, linhas in enumerate(self.linhas_base):
+                if conjunto >> i & 1:
+                    resultado *= linhas
+            for mascara, seletividade in self.arestas:
+                if mascara & conjunto == mascara:
+                    resultado *= seletividade
+            resultado = max(resultado, 1.0)
+            self._memo[conjunto] = resultado
+        return resultado
+
+
+def _programacao_dinamica(n, vizinhas, cardinalidade):
+    # melhor[conjunto] = (custo, ordem): só conjuntos alcançados por junções com aresta
+    melhor = {1 << i: (0.0, (i,)) for i in range(n)}
+    completo = (1 << n) - 1
+    for tamanho in range(2, n + 1):
+        atuais = [c for c in melhor if bin(c).count('1') == tamanho - 1]
+        novos = {}
+        for conjunto in atuais:
+            custo, ordem = melhor[conjunto]
+            fronteira = 0
+            for i in ordem:
+                fronteira |= vizinhas[i]
+            fronteira &= ~conjunto
+            if not fronteira:
+                # componente esgotada: o produto cartesiano com outra é inevitável
+                fronteira = completo & ~conjunto
+            for j in range(n):
+                if not fronteira >> j & 1:
+                    continue
+                destino = conjunto | 1 << j
+                # o último resultado é igual para toda ordem; só os intermediários contam
+                novo_custo = custo + (cardinalidade(destino) if tamanho < n else 0.0)
+                # arredonda para que somas iguais em outra ordem empatem de verdade
+                candidato = (float(f"{novo_custo:.12g}"), ordem + (j,))
+                if destino not in novos or candidato < novos[destino]:
+                    novos[destino] = candidato
+        melhor.update(novos)
+    return melhor[completo][1]
+
+
+def _guloso(n, vizinhas, cardinalidade):
+    inicio = min(range(n), key=lambda i: (cardinalidade(1 << i), i))
+    ordem = [inicio]
+    conjunto = 1 << inicio
+    while len(ordem) < n:
+        fronteira = 0
+        for i in ordem:
+            fronteira |= vizinhas[i]
+        fronteira &= ~conjunto
+        if not fronteira:
+            fronteira = (1 << n) - 1 & ~conjunto
+        candidatas = [j for j in range(n) if fronteira >> j & 1]
+        j = min(candidatas, key=lambda j: (cardinalidade(conjunto | 1 << j), j))
+        ordem.append(j)
+        conjunto |= 1 << j
+    return tuple(ordem)
+
+
+def ordem_de_juncao(linhas_base, arestas, seletividades):
+    """
+    Índices das relações na ordem de junção escolhida. Com o grafo desconexo,
+    cada componente é juntada inteira antes do produto cartesiano com a
+    próxima. `linhas_base` já considera as seleções empurradas para cada relação.
+    """
+    n = len(linhas_base)
+    if n < 2:
+        return tuple(range(n))
+    vizinhas = _conexos(n, arestas)
+    cardinalidade = _Cardinalidade(linhas_base, arestas, seletividades)
+    if n <= LIMITE_PD:
+        return _programacao_dinamica(n, vizinhas, cardinalidade)
+    return _guloso(n, vizinhas, cardinalidade)
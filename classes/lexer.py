@@ -0,0 +1,155 @@
+import re
+
+from . import perfil
+
+# Um token é a tupla (tipo, valor, inicio): o texto original e a posição onde
+# começa na query, para que os componentes possam ser recortados da string
+# original sem perdas. Tuplas simples saem bem mais baratas que objetos, e o
+# lexer roda dezenas de milhares de vezes por minuto.
+
+# Tipos de token
+IDENT = 'IDENT'
+NUMERO = 'NUMERO'
+STRING = 'STRING'
+OPERADOR = 'OPERADOR'
+ABRE_PAR = '('
+FECHA_PAR = ')'
+OUTRO = 'OUTRO'
+
+# Palavras reservadas viram tokens do próprio tipo (ex: tipo 'FROM')
+PALAVRAS_RESERVADAS = frozenset({
+    'SELECT', 'FROM', 'AS', 'INNER', 'JOIN', 'ON', 'WHERE', 'AND',
+    'OR', 'NOT', 'LIKE', 'IS', 'NULL',
+})
+
+# Palavras que invalidam uma condição (WHERE / ON)
+PROIBIDOS = frozenset({'OR', 'NOT', 'LIKE', 'IS', 'NULL'})
+
+# Usado só para o conteúdo de strings, que o validador antigo também rejeitava
+_PROIBIDO_EM_TEXTO = re.compile(r"\b(?:OR|NOT|LIKE|IS|NULL)\b|~", re.IGNORECASE)
+
+# Padrão mestre: espaços opcionais seguidos de exatamente um token. Toda
+# posição da entrada casa com alguma alternativa (a última pega qualquer
+# caractere), então um único findall cobre a query inteira em tempo linear.
+# Palavras reservadas casam como identificadores e são separadas depois por
+# consulta ao conjunto, o que sai mais barato que alternativas IGNORECASE.
+_MESTRE = re.compile(r"""
+    (\s*)
+    (?:
+        ([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)        # coluna ou tabela.coluna
+      | (<=|>=|<>|=|<|>)                         # operadores
+      | (\d+(?:\.\d+)?)                          # número
+      | ('[^']*')                                # string
+      | ([()])                                   # parênteses
+      | (\S)                                     # qualquer outro caractere
+    )
+""", re.VERBOSE)
+
+
+def tokenizar(texto: str) -> list:
+    """Converte o texto em uma lista de tokens numa única passada (espaços são descartados)."""
+    if perfil.ATIVO:
+        perfil.contar('lexer.tokenizar')
+        perfil.contar('regex.findall')
+    tokens = []
+    append = tokens.append
+    pos = 0
+    for espacos, ident, operador, numero, string, par, outro in _MESTRE.findall(texto):
+        inicio = pos + len(espacos)
+        if ident:
+            upper = ident.upper()
+            append((upper if upper in PALAVRAS_RESERVADAS else IDENT, ident, inicio))
+            pos = inicio + len(ident)
+        elif operador:
+            append((OPERADOR, operador, inicio))
+            pos = inicio + len(operador)
+        elif numero:
+            append((NUMERO, numero, inicio))
+            pos = inicio + len(numero)
+        elif string:
+            append((STRING, string, inicio))
+            pos = inicio + len(string)
+        elif par:
+            append((par, par, inicio))
+            pos = inicio + 1
+        else:
+            append((OUTRO, outro, inicio))
+            pos = inicio + 1
+    return tokens
+
+
+def fim_do_token(token) -> int:
+    return token[2] + len(token[1])
+
+
+def normalizar_espacos(texto: str) -> str:
+    """
+    A query com cada trecho de espaços (inclusive quebras de linha) trocado
+    por um espaço só e sem espaços nas pontas. O conteúdo das strings e a
+    adjacência entre tokens, que o parser olha, não mudam.
+    """
+    tokens = tokenizar(texto)
+    partes = []
+    fim_anterior = None
+    for tok in tokens:
+        if fim_anterior is not None and tok[2] > fim_anterior:
+            partes.append(' ')
+        partes.append(tok[1])
+        fim_anterior = fim_do_token(tok)
+    return ''.join(partes)
+
+
+def texto_proibido(valor: str) -> bool:
+    """O texto (ex: conteúdo de uma string) contém uma palavra/operador proibido?"""
+    if perfil.ATIVO:
+        perfil.contar('regex.search')
+    return _PROIBIDO_EM_TEXTO.search(valor) is not None
+
+
+def consumir_condicao(tokens: list, inicio: int, juncao: bool = False) -> int:
+    """
+    Avança sobre a condição (WHERE / ON) que começa em tokens[inicio],
+    validando-a na mesma passada:
+      - apenas identificadores, números, strings, operadores de comparação,
+        parênteses e AND;
+      - nenhum operador proibido (OR, NOT, LIKE, IS, NULL, ~);
+      - parênteses balanceados.
+    Com juncao=True a condição termina antes de um WHERE ou INNER JOIN.
+    Retorna o índice logo após a condição, ou -1 se ela for inválida/vazia.
+    """
+    n = len(tokens)
+    nivel = 0
+    k = inicio
+    while k < n:
+        tipo, valor, _ = tokens[k]
+        if tipo is IDENT:
+            # "t.is" também era barrado pelo \bIS\b do validador por regex
+            if '.' in valor:
+                tabela, _, coluna = valor.upper().partition('.')
+                if tabela in PROIBIDOS or coluna in PROIBIDOS:
+                    return -1
+        elif tipo is OPERADOR or tipo is NUMERO:
+            pass
+        elif tipo is STRING:
+            if texto_proibido(valor):
+                return -1
+        elif tipo == ABRE_PAR:
+            nivel += 1
+        elif tipo == FECHA_PAR:
+            nivel -= 1
+            if nivel < 0:
+                return -1
+        elif tipo is OUTRO or tipo in PROIBIDOS:
+            return -1
+        elif juncao and (tipo == 'WHERE' or (tipo == 'INNER' and k + 1 < n and tokens[k + 1][0] == 'JOIN')):
+            break
+        # demais palavras reservadas (AND, SELECT, JOIN...) valem como identificadores
+        k += 1
+    if k == inicio or nivel != 0:
+        return -1
+    return k
+
+
+def condicao_valida(tokens: list) -> bool:
+    """A lista de tokens inteira forma uma condição válida?"""
+    return len(tokens) > 0 and consumir_condicao(tokens, 0) == len(tokens)
@@ -0,0 +1,186 @@
+"""
+Análise em lote: distribui muitas consultas entre processos.
+
+    for r in optimize_many(open("consultas.sql")):
+        print(r.valida, r.algebra_otimizada)
+
+As consultas são agrupadas em lotes e enviadas a um ProcessPoolExecutor com
+um número limitado de lotes em voo, então o iterável de entrada é consumido
+aos poucos e os resultados saem na mesma ordem, à medida que ficam prontos
+(ou na ordem em que os lotes terminam, com ordenado=False).
+
+Para arquivos de log, `dividir_comandos` lê o texto em blocos e separa os
+comandos no `;`, sem carregar o arquivo inteiro; `python -m classes lote`
+junta as duas coisas e escreve um JSON por linha.
+"""
+import os
+import re
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from .cache import cache_planos
+
+# Registro leve (picklable) devolvido para cada consulta. `indice` é a
+# posição na entrada (a partir de 0), `tempos` os ms de cada etapa,
+# `grafos` os arquivos gravados (só quando pedidos) e `avisos` os de
+# `ParserSQL.avisos` (com a otimização).
+RegistroConsulta = namedtuple(
+    'RegistroConsulta',
+    'sql valida components algebra algebra_otimizada indice tempos grafos avisos',
+    defaults=(None, None, None, None),
+)
+
+_SEPARADORES = re.compile(r"[';]")
+
+
+def dividir_comandos(fluxo, tamanho_bloco=1 << 16):
+    """
+    Gera os comandos de um arquivo de texto aberto (ou sys.stdin) separados
+    por `;`, sem espaços nas pontas e sem os vazios. Um `;` dentro de uma
+    string ('...') não separa. Lê `tamanho_bloco` caracteres por vez.
+    """
+    pendente = []       # pedaços do comando atual que vieram em blocos anteriores
+    em_texto = False
+    for bloco in iter(lambda: fluxo.read(tamanho_bloco), ''):
+        inicio = 0
+        for m in _SEPARADORES.finditer(bloco):
+            if m.group() == "'":
+                em_texto = not em_texto
+            elif not em_texto:
+                pendente.append(bloco[inicio:m.start()])
+                comando = ''.join(pendente).strip()
+                pendente = []
+                inicio = m.end()
+                if comando:
+                    yield comando
+        pendente.append(bloco[inicio:])
+    comando = ''.join(pendente).strip()
+    if comando:
+        yield comando
+
+
+def _analisar(sql, otimizar, indice=None, grafos=None):
+    relogio = time.perf_counter
+    inicio = relogio()
+    parser = cache_planos.analisar(sql)
+    valida = parser.eh_valido()
+    tempos = {'analise': (relogio() - inicio) * 1e3}
+    if not valida:
+        return RegistroConsulta(sql, False, None, None, None, indice, tempos)
+    if not otimizar:
+        return RegistroConsulta(sql, True, parser.components, None, None, indice, tempos)
+    t1 = relogio()
+    algebra = parser.to_rel_algebra()
+    t2 = relogio()
+    algebra_otimizada = parser.otimizar_algebra_relacional()
+    t3 = relogio()
+    tempos['algebra'] = (t2 - t1) * 1e3
+    tempos['otimizacao'] = (t3 - t2) * 1e3
+    caminhos = None
+    if grafos is not None:
+        caminhos = _gravar_grafos(parser, indice, *grafos)
+        tempos['grafos'] = (relogio() - t3) * 1e3
+    return RegistroConsulta(sql, True, parser.components, algebra, algebra_otimizada,
+                            indice, tempos, caminhos, parser.avisos())
+
+
+def _gravar_grafos(parser, indice, pasta, formato):
+    from .grafos import construir_grafos, renderizar_grafos
+
+    grafos = construir_grafos(parser)
+    caminhos = []
+    for (sufixo, _, _), conteudo in zip(grafos, renderizar_grafos(grafos, formato, workers=1)):
+        caminho = os.path.join(pasta, f"consulta_{indice}_{sufixo}.{formato}")
+        modo, codificacao = ("wb", None) if isinstance(conteudo, bytes) else ("w", "utf-8")
+        with open(caminho, modo, encoding=codificacao) as f:
+            f.write(conteudo)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def _processar_lote(inicio, consultas, otimizar, grafos=None):
+    """Executado nos processos de trabalho; usa o cache de planos de cada processo."""
+    return [_analisar(sql, otimizar, inicio + k, grafos) for k, sql in enumerate(consultas)]
+
+
+def _lotes(consultas, tamanho_lote):
+    """(posição do primeiro, lote) para cada lote de até `tamanho_lote` consultas."""
+    it = iter(consultas)
+    inicio = 0
+    while True:
+        lote = list(islice(it, tamanho_lote))
+        if not lote:
+            return
+        yield inicio, lote
+        inicio += len(lote)
+
+
+def _analisar_muitas(consultas, otimizar, workers, tamanho_lote, lotes_em_voo, ordenado=True, grafos=None):
+    # Valida aqui, e não dentro do gerador, para o erro sair na chamada
+    if tamanho_lote < 1:
+        raise ValueError("tamanho_lote precisa ser pelo menos 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if grafos is not None:
+        os.makedirs(grafos[0], exist_ok=True)
+    if workers <= 1:
+        return _gerar_local(consultas, otimizar, tamanho_lote, grafos)
+    gerar = _gerar if ordenado else _gerar_desordenado
+    return gerar(consultas, otimizar, workers, tamanho_lote, lotes_em_voo or 2 * workers, grafos)
+
+
+def _gerar_local(consultas, otimizar, tamanho_lote, grafos):
+    for inicio, lote in _lotes(consultas, tamanho_lote):
+        yield from _processar_lote(inicio, lote, otimizar, grafos)
+
+
+def _gerar(consultas, otimizar, workers, tamanho_lote, lotes_em_voo, grafos):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = deque()
+        for inicio, lote in _lotes(consultas, tamanho_lote):
+            pendentes.append(executor.submit(_processar_lote, inicio, lote, otimizar, grafos))
+            # Contrapressão: não lê mais entrada enquanto a janela estiver cheia
+            if len(pendentes) >= lotes_em_voo:
+                yield from pendentes.popleft().result()
+        while pendentes:
+            yield from pendentes.popleft().result()
+
+
+def _gerar_desordenado(consultas, otimizar, workers, tamanho_lote, lotes_em_voo, grafos):
+    # Mesma janela de lotes em voo, mas devolve qualquer lote que terminar:
+    # um lote lento não segura os que vêm depois dele
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = set()
+        for inicio, lote in _lotes(consultas, tamanho_lote):
+            pendentes.add(executor.submit(_processar_lote, inicio, lote, otimizar, grafos))
+            if len(pendentes) >= lotes_em_voo:
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield from futuro.result()
+        while pendentes:
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                yield from futuro.result()
+
+
+def parse_many(consultas, workers=None, tamanho_lote=256, lotes_em_voo=None, ordenado=True):
+    """
+    Valida e extrai os componentes de cada consulta do iterável.
+    Gera um RegistroConsulta por consulta, na ordem de entrada (sem álgebra).
+    workers=1 processa no próprio processo; None usa todos os núcleos.
+    Com ordenado=False os lotes saem na ordem em que terminam (use `indice`).
+    """
+    return _analisar_muitas(consultas, False, workers, tamanho_lote, lotes_em_voo, ordenado)
+
+
+def optimize_many(consultas, workers=None, tamanho_lote=256, lotes_em_voo=None, ordenado=True,
+                  grafos=None, formato="svg"):
+    """
+    Como parse_many, incluindo a álgebra relacional original e a otimizada.
+    Com `grafos` (uma pasta), os três grafos de cada consulta válida são
+    gravados lá, como consulta_<indice>_<sufixo>.<formato>.
+    """
+    return _analisar_muitas(consultas, True, workers, tamanho_lote, lotes_em_voo, ordenado,
+                            (grafos, formato) if grafos is not None else None)
@@ -0,0 +1,281 @@
+"""
+Otimização heurística do plano lógico.
+
+Recebe o plano literal (ver `plano.plano_literal`) e devolve um plano novo com:
+  - push-down de seleções (σ) para as relações base, incluindo as
+    comparações implicadas pelas igualdades entre colunas (ver `classes.equivalencias`);
+  - projeção precoce (π) apenas com os atributos necessários;
+  - junções na ordem de menor custo estimado (ver `classes.juncoes`), com
+    cada condição do ON e do WHERE na junção mais baixa em que cabe e
+    produto cartesiano só quando nenhuma condição liga as relações.
+
+A análise do plano literal (aliases, termos e as relações que cada um cita,
+atributos por alias) é feita uma vez por `analisar` e pode ser guardada e
+reaproveitada (ver `ParserSQL.analise`).
+"""
+from collections import namedtuple
+
+from .lexer import IDENT, ABRE_PAR, tokenizar
+from .juncoes import EstimadorPadrao, arestas_de_juncao, componentes_conexas, ordem_de_juncao
+from .equivalencias import inferir_predicados
+from .plano import (
+    Coluna, Juncao, Projecao, Selecao,
+    colunas, conjuncao, folha, termos_planos,
+)
+
+
+def resolver_alias(coluna, alias_para_tabela):
+    """
+    Alias da relação a que a coluna pertence, ou None se não der para saber.
+    O prefixo pode ser o alias ou o nome real da tabela; coluna sem prefixo só
+    é resolvida quando há uma única relação na consulta.
+    """
+    if coluna.alias is None:
+        if len(alias_para_tabela) == 1:
+            return next(iter(alias_para_tabela))
+        return None
+    if coluna.alias in alias_para_tabela:
+        return coluna.alias
+    for alias, nome in alias_para_tabela.items():
+        if nome == coluna.alias:
+            return alias
+    return None
+
+
+def colunas_do_select(atributos) -> list:
+    """Colunas referenciadas pelos itens do SELECT (nomes de função são ignorados)."""
+    resultado = []
+    for item in atributos:
+        tokens = tokenizar(item)
+        for k, (tipo, valor, _) in enumerate(tokens):
+            if tipo != IDENT:
+                continue
+            if k + 1 < len(tokens) and tokens[k + 1][0] == ABRE_PAR:
+                continue    # COUNT(, SUM( ...
+            alias, _, nome = valor.rpartition('.')
+            resultado.append(Coluna(alias or None, nome))
+    return resultado
+
+
+def decompor(plano):
+    """
+    Separa um plano literal em (atributos finais, predicado do WHERE, folhas,
+    predicados de junção), com as folhas na ordem da consulta.
+    """
+    atributos_finais = ()
+    if isinstance(plano, Projecao):
+        atributos_finais = plano.atributos
+        plano = plano.filho
+
+    predicado_where = None
+    if isinstance(plano, Selecao):
+        predicado_where = plano.predicado
+        plano = plano.filho
+
+    folhas = []
+    predicados_juncao = []
+    while isinstance(plano, Juncao):
+        folhas.append(plano.dir)
+        predicados_juncao.append(plano.predicado)
+        plano = plano.esq
+    folhas.append(plano)
+    folhas.reverse()
+    predicados_juncao.reverse()
+    return atributos_finais, predicado_where, folhas, predicados_juncao
+
+
+def avisos_de_juncao(componentes, tabelas) -> list:
+    """
+    Avisos sobre o grafo de junções: um produto cartesiano quando as
+    relações formam mais de uma componente (nenhuma condição liga os grupos).
+    """
+    if not componentes or len(componentes) < 2:
+        return []
+    grupos = ['{' + ', '.join(tabelas[i][1] for i in componente) + '}' for componente in componentes]
+    return [f"Produto cartesiano: nenhuma condição de junção liga {', '.join(grupos[:-1])} e {grupos[-1]}"]
+
+
+def _escolher_ordem(tabelas, selecoes_por_tabela, arestas, alias_para_tabela, estimador):
+    """Ordem de junção de menor custo (índices em `tabelas`)."""
+    linhas_base = []
+    for nome, alias in tabelas:
+        linhas = estimador.linhas(nome)
+        for termo in selecoes_por_tabela[alias]:
+            linhas *= estimador.seletividade(termo, alias_para_tabela)
+        linhas_base.append(linhas)
+    multiplas = [(m, t) for m, t in arestas if m & (m - 1)]
+    seletividades = [estimador.seletividade(t, alias_para_tabela) for _, t in multiplas]
+    return ordem_de_juncao(linhas_base, multiplas, seletividades)
+
+
+def _juntar_na_ordem(expressoes_tabela, ordem, arestas):
+    """
+    Árvore left-deep na ordem dada; cada termo vai para a primeira junção em
+    que todas as relações que ele cita já estão presentes.
+    """
+    pendentes = list(arestas)
+    presentes = 1 << ordem[0]
+    expr_atual = expressoes_tabela[ordem[0]]
+    for j in ordem[1:]:
+        presentes |= 1 << j
+        aplicaveis = [t for m, t in pendentes if m & presentes == m]
+        pendentes = [(m, t) for m, t in pendentes if m & presentes != m]
+        expr_atual = Juncao(expr_atual, expressoes_tabela[j], conjuncao(aplicaveis))
+    return expr_atual
+
+
+AnaliseConsulta = namedtuple('AnaliseConsulta', [
+    'atributos_finais',     # itens do SELECT (vazio para *)
+    'predicado_where',
+    'folhas',               # Relacao / ρ(Relacao), na ordem da consulta
+    'predicados_juncao',    # predicado do ON de cada JOIN
+    'tabelas',              # (tabela, alias) de cada folha
+    'alias_para_tabela',
+    'aliases_dos_termos',   # termo do WHERE / ON -> frozenset dos aliases que ele cita (None = sem dono)
+    'selecoes_por_tabela',  # alias -> termos do WHERE só dele
+    'condicoes_multiplas',  # termos do WHERE que citam várias relações (ou sem dono)
+    'atributos_por_alias',  # alias -> nomes das colunas usadas
+    'projecao_precoce',     # dá para projetar cedo sem mudar o resultado?
+    'predicados_inferidos', # (alias, termo) implicados pelas igualdades entre colunas
+    'arestas',              # grafo de junções: (máscara de bits das folhas, termo); None se não der para montar
+    'componentes',          # índices das folhas de cada componente conexa do grafo (None idem)
+])
+
+
+def analisar(plano) -> AnaliseConsulta:
+    """Análise do plano literal usada pelo otimizador e pelos grafos (uma passada)."""
+    # === ETAPA 1: Desmontar o plano literal ===
+    atributos_finais, predicado_where, folhas, predicados_juncao = decompor(plano)
+
+    tabelas = [folha(no) for no in folhas]
+    alias_para_tabela = {alias: nome for nome, alias in tabelas}
+
+    aliases_dos_termos = {}
+    for pred in [predicado_where] + predicados_juncao:
+        for termo in termos_planos(pred):
+            aliases_dos_termos[termo] = frozenset(resolver_alias(c, alias_para_tabela) for c in colunas(termo))
+
+    # === ETAPA 2: Seleções por tabela (conjuntos de um único alias) ===
+    selecoes_por_tabela = {alias: [] for _, alias in tabelas}
+    condicoes_multiplas = []
+    for termo in termos_planos(predicado_where):
+        aliases = aliases_dos_termos[termo]
+        if len(aliases) == 1 and None not in aliases:
+            selecoes_por_tabela[next(iter(aliases))].append(termo)
+        else:
+            condicoes_multiplas.append(termo)
+
+    # Comparações com constante que valem para as outras colunas da mesma
+    # classe de equivalência (a = b AND b > 3 => a > 3) descem junto. Com
+    # alias repetido não dá para saber a que relação cada coluna pertence.
+    predicados_inferidos = []
+    if len(tabelas) > 1 and len(alias_para_tabela) == len(tabelas):
+        predicados_inferidos = inferir_predicados([predicado_where] + predicados_juncao,
+                                                  lambda c: resolver_alias(c, alias_para_tabela))
+        for alias, termo in predicados_inferidos:
+            aliases_dos_termos[termo] = frozenset((alias,))
+            selecoes_por_tabela[alias].append(termo)
+
+    # Grafo de junções: um vértice por relação, uma aresta por termo do ON ou
+    # multi-tabela do WHERE. Com alias repetido ou coluna sem dono não dá
+    # para saber onde cada termo pode ser aplicado.
+    arestas = componentes = None
+    if len(tabelas) > 1 and len(alias_para_tabela) == len(tabelas):
+        termos_juncao = []
+        filtros_do_on = []      # termos do ON sobre uma relação só (ON c.id = 8)
+        for termo in (t for pred in predicados_juncao for t in termos_planos(pred)):
+            donos = aliases_dos_termos[termo]
+            if len(donos) == 1 and None not in donos:
+                filtros_do_on.append((next(iter(donos)), termo))
+            else:
+                termos_juncao.append(termo)
+        arestas = arestas_de_juncao(termos_juncao + condicoes_multiplas, [alias for _, alias in tabelas],
+                                    lambda c: resolver_alias(c, alias_para_tabela))
+        if arestas is not None:
+            componentes = componentes_conexas(len(tabelas), arestas)
+            # Com junções internas eles filtram a relação antes de qualquer junção,
+            # como os do WHERE (e não ligam nada no grafo)
+            for alias, termo in filtros_do_on:
+                if termo not in selecoes_por_tabela[alias]:
+                    selecoes_por_tabela[alias].append(termo)
+
+    # === ETAPA 3: Atributos necessários por alias ===
+    # Só projeta cedo quando há junções e todas as colunas usadas têm dono
+    # conhecido; com SELECT * ou coluna ambígua, cortar atributos mudaria o resultado.
+    atributos_por_alias = {alias: set() for _, alias in tabelas}
+    projecao_precoce = len(tabelas) > 1 and bool(atributos_finais)
+    if projecao_precoce:
+        usadas = colunas_do_select(atributos_finais)
+        for pred in [predicado_where] + predicados_juncao:
+            usadas.extend(colunas(pred))
+        for c in usadas:
+            alias = resolver_alias(c, alias_para_tabela)
+            if alias is not None:
+                atributos_por_alias[alias].add(c.nome)
+            elif c.alias is None:
+                projecao_precoce = False
+                break
+
+    return AnaliseConsulta(atributos_finais, predicado_where, folhas, predicados_juncao, tabelas,
+                           alias_para_tabela, aliases_dos_termos, selecoes_por_tabela,
+                           condicoes_multiplas, atributos_por_alias, projecao_precoce,
+                           predicados_inferidos, arestas, componentes)
+
+
+def otimizar(plano, estimador=None, analise=None):
+    """
+    Aplica push-down de σ, projeção precoce e a escolha da ordem das junções
+    sobre o plano literal. `estimador` fornece linhas por tabela e
+    seletividades (padrão: EstimadorPadrao); `analise` é a `analisar(plano)`
+    já feita, se houver.
+    """
+    estimador = estimador or EstimadorPadrao()
+    if analise is None:
+        analise = analisar(plano)
+    atributos_finais = analise.atributos_finais
+    folhas = analise.folhas
+    predicados_juncao = analise.predicados_juncao
+    tabelas = analise.tabelas
+    alias_para_tabela = analise.alias_para_tabela
+    selecoes_por_tabela = analise.selecoes_por_tabela
+    condicoes_multiplas = analise.condicoes_multiplas
+    atributos_por_alias = analise.atributos_por_alias
+    projecao_precoce = analise.projecao_precoce
+
+    # === ETAPA 4: σ e π precoces sobre cada relação ===
+    expressoes_tabela = []
+    for no, (_, alias) in zip(folhas, tabelas):
+        expr = no
+        if selecoes_por_tabela[alias]:
+            expr = Selecao(expr, conjuncao(selecoes_por_tabela[alias]))
+        if projecao_precoce and atributos_por_alias[alias]:
+            expr = Projecao(expr, tuple(sorted(atributos_por_alias[alias])))
+        expressoes_tabela.append(expr)
+
+    # === ETAPA 5: Ordem das junções por custo ===
+    ordem = None
+    if analise.arestas is not None:
+        ordem = _escolher_ordem(tabelas, selecoes_por_tabela, analise.arestas,
+                                alias_para_tabela, estimador)
+    reordenado = ordem is not None and ordem != tuple(range(len(tabelas)))
+
+    if ordem is not None:
+        # As condições do ON e do WHERE viram predicados das junções mais
+        # baixas em que cabem, mesmo sem trocar a ordem
+        expr_atual = _juntar_na_ordem(expressoes_tabela, ordem, analise.arestas)
+    else:
+        # === ETAPA 6: Sem grafo de junções: ordem original e σ multi-tabela no topo ===
+        expr_atual = expressoes_tabela[0]
+        for relacao, pred in zip(expressoes_tabela[1:], predicados_juncao):
+            expr_atual = Juncao(expr_atual, relacao, pred)
+        if condicoes_multiplas:
+            expr_atual = Selecao(expr_atual, conjuncao(condicoes_multiplas))
+
+    # === ETAPA 7: Projeção final ===
+    if atributos_finais:
+        expr_atual = Projecao(expr_atual, atributos_finais)
+    elif reordenado:
+        # SELECT * com a ordem trocada: mantém as colunas na ordem do FROM
+        expr_atual = Projecao(expr_atual, tuple(f"{alias}.*" for _, alias in tabelas))
+
+    return expr_atual
@@ -0,0 +1,169 @@
+"""
+Hash join paralelo: as duas entradas são particionadas pelo hash da chave e
+cada par de partições é juntado num processo (ver `classes.fisico`).
+
+    ie, id_ = juntar_em_paralelo(chaves_esq, chaves_dir, processos=8)
+
+Linhas com a mesma chave caem sempre na mesma partição dos dois lados, então
+as partições são independentes: cada processo monta a tabela de hash sobre o
+lado menor da sua e sonda com o outro, como o hash join serial. As chaves
+são passadas aos processos por memória compartilhada
+(`multiprocessing.shared_memory`), sem serializar os arrays; só as posições
+das linhas que casam voltam, e são concatenadas no fim.
+
+As chaves viram números antes de particionar: inteiros (e booleanos) como
+int64, números com casas decimais como float64 e textos pelo código de cada
+valor distinto nos dois lados juntos. Outros tipos (objetos misturados)
+ficam com o hash join serial.
+
+O pool de processos é criado na primeira junção e reaproveitado pelas
+seguintes; `encerrar` o desliga (é chamado na saída do interpretador).
+"""
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Partições por processo: com mais de uma, um processo que pega uma partição
+# pequena já parte para a próxima e as chaves desiguais se equilibram
+PARTICOES_POR_PROCESSO = 2
+
+_MULTIPLICADOR = np.uint64(0x9E3779B97F4A7C15)
+
+_pool = None
+_processos = 0
+
+
+def _executor(processos):
+    """O pool de processos, recriado se o número de processos mudar."""
+    global _pool, _processos
+    if _pool is None or _processos != processos:
+        encerrar()
+        _pool = ProcessPoolExecutor(max_workers=processos)
+        _processos = processos
+    return _pool
+
+
+def encerrar():
+    """Desliga o pool de processos das junções (se houver)."""
+    global _pool, _processos
+    if _pool is not None:
+        _pool.shutdown()
+        _pool, _processos = None, 0
+
+
+atexit.register(encerrar)
+
+
+def _codigos(a, b):
+    """As chaves dos dois lados como arrays numéricos comparáveis, ou None."""
+    tipos = {a.dtype.kind, b.dtype.kind}
+    if tipos <= {'i', 'u', 'b'}:
+        if any(x.dtype.kind == 'u' and len(x) and int(x.max()) >= 1 << 63 for x in (a, b)):
+            return None
+        return a.astype(np.int64), b.astype(np.int64)
+    if tipos <= {'i', 'u', 'b', 'f'}:
+        inteiros = [x for x in (a, b) if x.dtype.kind != 'f' and len(x)]
+        # Inteiros acima de 2**53 não têm float64 exato: 2**53 + 1 casaria com 2**53
+        if any(np.abs(x.astype(np.float64)).max() > 2 ** 53 for x in inteiros):
+            return None
+        # + 0.0 troca -0.0 por 0.0, que são iguais mas teriam hash diferente
+        return a.astype(np.float64) + 0.0, b.astype(np.float64) + 0.0
+    if tipos <= {'U', 'S'} and len(tipos) == 1:
+        _, codigos = np.unique(np.concatenate([a, b]), return_inverse=True)
+        return codigos[:len(a)].astype(np.int64), codigos[len(a):].astype(np.int64)
+    return None
+
+
+def _particionar(chaves, particoes):
+    """(ordem das linhas agrupadas por partição, início de cada partição + o fim)."""
+    bits = chaves.view(np.uint64)
+    particao = ((bits * _MULTIPLICADOR) >> np.uint64(32)) % np.uint64(particoes)
+    ordem = np.argsort(particao, kind='stable')
+    limites = np.zeros(particoes + 1, dtype=np.intp)
+    np.cumsum(np.bincount(particao.astype(np.intp), minlength=particoes), out=limites[1:])
+    return ordem, limites
+
+
+def _compartilhar(valores, memorias):
+    """Copia o array para um bloco de memória compartilhada; devolve como achá-lo nos processos."""
+    memoria = SharedMemory(create=True, size=max(valores.nbytes, 1))
+    memorias.append(memoria)
+    np.ndarray(valores.shape, valores.dtype, buffer=memoria.buf)[:] = valores
+    return memoria.name, valores.dtype.str, len(valores)
+
+
+def _anexar(descricao, inicio, fim):
+    """Os valores [inicio:fim) de um array compartilhado, como lista."""
+    nome, tipo, n = descricao
+    # Os processos do pool herdam o resource_tracker de quem criou o bloco,
+    # que é quem o apaga; aqui ele só é lido
+    memoria = SharedMemory(name=nome)
+    try:
+        return np.ndarray((n,), np.dtype(tipo), buffer=memoria.buf)[inicio:fim].tolist()
+    finally:
+        memoria.close()
+
+
+def _juntar_particao(descricao_esq, inicio_esq, fim_esq, descricao_dir, inicio_dir, fim_dir):
+    """Executado nos processos: hash join de uma partição; posições nos arrays particionados."""
+    chaves_esq = _anexar(descricao_esq, inicio_esq, fim_esq)
+    chaves_dir = _anexar(descricao_dir, inicio_dir, fim_dir)
+    construir_esq = len(chaves_esq) < len(chaves_dir)
+    constroi, sonda = (chaves_esq, chaves_dir) if construir_esq else (chaves_dir, chaves_esq)
+
+    tabela_hash = {}
+    for i, chave in enumerate(constroi):
+        tabela_hash.setdefault(chave, []).append(i)
+    posicoes_constroi = []
+    posicoes_sonda = []
+    for j, chave in enumerate(sonda):
+        for i in tabela_hash.get(chave, ()):
+            posicoes_constroi.append(i)
+            posicoes_sonda.append(j)
+
+    posicoes_constroi = np.array(posicoes_constroi, dtype=np.intp)
+    posicoes_sonda = np.array(posicoes_sonda, dtype=np.intp)
+    if construir_esq:
+        return posicoes_constroi + inicio_esq, posicoes_sonda + inicio_dir
+    return posicoes_sonda + inicio_esq, posicoes_constroi + inicio_dir
+
+
+def juntar_em_paralelo(chaves_esq, chaves_dir, processos):
+    """
+    Posições (esquerda, direita) dos pares de linhas com chaves iguais,
+    juntando as partições em `processos` processos; None se o tipo das
+    chaves não serve (aí o chamador fica com o hash join serial).
+    """
+    codigos = _codigos(np.asarray(chaves_esq), np.asarray(chaves_dir))
+    if codigos is None:
+        return None
+    if not len(codigos[0]) or not len(codigos[1]):
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    particoes = processos * PARTICOES_POR_PROCESSO
+    ordem_esq, limites_esq = _particionar(codigos[0], particoes)
+    ordem_dir, limites_dir = _particionar(codigos[1], particoes)
+    memorias = []
+    try:
+        descricao_esq = _compartilhar(codigos[0][ordem_esq], memorias)
+        descricao_dir = _compartilhar(codigos[1][ordem_dir], memorias)
+        executor = _executor(processos)
+        tarefas = [
+            executor.submit(_juntar_particao,
+                            descricao_esq, int(limites_esq[p]), int(limites_esq[p + 1]),
+                            descricao_dir, int(limites_dir[p]), int(limites_dir[p + 1]))
+            for p in range(particoes)
+            if limites_esq[p] < limites_esq[p + 1] and limites_dir[p] < limites_dir[p + 1]
+        ]
+        partes = [tarefa.result() for tarefa in tarefas]
+    finally:
+        for memoria in memorias:
+            memoria.close()
+            memoria.unlink()
+
+    if not partes:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return (ordem_esq[np.concatenate([p[0] for p in partes])],
+            ordem_dir[np.concatenate([p[1] for p in partes])])
@@ -0,0 +1,187 @@
+"""
+Instrumentação por etapa do parser, do otimizador e dos grafos.
+
+Desligada, cada ponto instrumentado custa a leitura de uma variável global:
+`etapa()` devolve um contexto nulo e `contar()` / `medir()` nem são
+chamados (os pontos quentes testam `perfil.ATIVO` antes). Ligada, por
+`perfilar()` ou por um gancho registrado, cada etapa grava:
+  - o tempo de relógio;
+  - a variação de blocos de memória alocados (sys.getallocatedblocks) e, se
+    o perfil for criado com memoria=True, o pico de bytes alocados além do
+    que já havia no início (tracemalloc, que deixa tudo bem mais lento);
+além de contadores (chamadas do lexer, buscas por regex, acertos do cache
+de planos...) e medidas (nós e arestas de cada grafo).
+
+    with perfilar() as p:
+        parser = ParserSQL(sql)
+        parser.otimizar_algebra_relacional()
+    print(p.para_dict())
+
+A coleta é por thread: sessões simultâneas (o app Streamlit roda cada uma
+numa thread) não misturam seus perfis. Etapas rodadas em outras threads
+(o pool de renderizar_grafos) entram só no tempo da etapa que as espera.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Perfis ativos + ganchos registrados, em qualquer thread. Zero = nada a coletar.
+ATIVO = 0
+
+_local = threading.local()
+_ganchos = []
+_lock = threading.Lock()
+_NULO = nullcontext()
+
+
+class Perfil:
+    """Etapas (em pré-ordem, com a profundidade), contadores e medidas de uma coleta."""
+
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.etapas = []
+        self.contadores = {}
+        self.medidas = {}
+        self._profundidade = 0
+
+    def para_dict(self) -> dict:
+        total = sum(e['tempo_ms'] for e in self.etapas if e['profundidade'] == 0)
+        medidas = {nome: dict(valores) if isinstance(valores, dict) else valores
+                   for nome, valores in self.medidas.items()}
+        consultas_cache = self.contadores.get('cache.acertos', 0) + self.contadores.get('cache.faltas', 0)
+        if consultas_cache:
+            medidas['cache.taxa_acerto'] = round(self.contadores.get('cache.acertos', 0) / consultas_cache, 4)
+        return {
+            'total_ms': round(total, 4),
+            'etapas': [dict(e) for e in self.etapas],
+            'contadores': dict(self.contadores),
+            'medidas': medidas,
+        }
+
+    def tabela(self) -> str:
+        """As etapas, contadores e medidas como texto, para o terminal."""
+        linhas = [f"{'etapa':<32} {'ms':>10} {'blocos':>9}" + (f" {'pico KiB':>10}" if self.memoria else '')]
+        for e in self.etapas:
+            nome = '  ' * e['profundidade'] + e['nome']
+            linha = f"{nome:<32} {e['tempo_ms']:>10.3f} {e['blocos']:>9}"
+            if self.memoria:
+                linha += f" {e['pico_bytes'] / 1024:>10.1f}"
+            linhas.append(linha)
+        for nome, valor in sorted(self.contadores.items()):
+            linhas.append(f"{nome:<32} {valor:>10}")
+        for nome, valor in self.para_dict()['medidas'].items():
+            linhas.append(f"{nome:<32} {valor}")
+        return '\n'.join(linhas)
+
+
+def _atual():
+    return getattr(_local, 'perfil', None)
+
+
+def _ligar(delta):
+    global ATIVO
+    with _lock:
+        ATIVO += delta
+
+
+@contextmanager
+def perfilar(memoria=False):
+    """Coleta o perfil do que rodar dentro do bloco, nesta thread."""
+    iniciou_tracemalloc = False
+    if memoria:
+        import tracemalloc     # fica fora do import do pacote: só o memoria=True usa
+        iniciou_tracemalloc = not tracemalloc.is_tracing()
+        if iniciou_tracemalloc:
+            tracemalloc.start()
+    anterior = _atual()
+    perfil = Perfil(memoria)
+    _local.perfil = perfil
+    _ligar(1)
+    try:
+        yield perfil
+    finally:
+        _ligar(-1)
+        if iniciou_tracemalloc:
+            tracemalloc.stop()
+        _local.perfil = anterior
+
+
+def registrar_gancho(funcao):
+    """
+    Chama funcao(nome, registro) ao fim de cada etapa, em qualquer thread,
+    com ou sem perfilar(); `registro` é o dict da etapa (tempo_ms, blocos...).
+    Devolve a própria função, para uso como decorador.
+    """
+    with _lock:
+        _ganchos.append(funcao)
+    _ligar(1)
+    return funcao
+
+
+def remover_gancho(funcao):
+    with _lock:
+        _ganchos.remove(funcao)
+    _ligar(-1)
+
+
+class _Etapa:
+    __slots__ = ('perfil', 'registro', 'inicio', 'blocos', 'memoria')
+
+    def __init__(self, perfil, nome):
+        self.perfil = perfil
+        self.registro = {'nome': nome, 'tempo_ms': 0.0, 'blocos': 0,
+                         'profundidade': perfil._profundidade if perfil is not None else 0}
+
+    def __enter__(self):
+        perfil = self.perfil
+        if perfil is not None:
+            perfil.etapas.append(self.registro)     # pré-ordem: o pai antes dos filhos
+            perfil._profundidade += 1
+            if perfil.memoria:
+                import tracemalloc
+                tracemalloc.reset_peak()
+                self.memoria = tracemalloc.get_traced_memory()[0]
+        self.blocos = sys.getallocatedblocks()
+        self.inicio = time.perf_counter()
+        return self.registro
+
+    def __exit__(self, *exc):
+        registro = self.registro
+        registro['tempo_ms'] = (time.perf_counter() - self.inicio) * 1e3
+        registro['blocos'] = sys.getallocatedblocks() - self.blocos
+        perfil = self.perfil
+        if perfil is not None:
+            perfil._profundidade -= 1
+            if perfil.memoria:
+                import tracemalloc
+                # Acima do que já estava alocado no início. Numa etapa com
+                # filhas, o pico só cobre o trecho desde o início da última filha.
+                registro['pico_bytes'] = max(0, tracemalloc.get_traced_memory()[1] - self.memoria)
+        for gancho in tuple(_ganchos):
+            gancho(registro['nome'], registro)
+        return False
+
+
+def etapa(nome):
+    """Contexto que cronometra a etapa `nome` (nulo com a instrumentação desligada)."""
+    if not ATIVO:
+        return _NULO
+    perfil = _atual()
+    if perfil is None and not _ganchos:
+        return _NULO
+    return _Etapa(perfil, nome)
+
+
+def contar(nome, n=1):
+    """Soma `n` ao contador `nome` do perfil desta thread."""
+    perfil = _atual()
+    if perfil is not None:
+        perfil.contadores[nome] = perfil.contadores.get(nome, 0) + n
+
+
+def medir(nome, valor):
+    """Grava uma medida (número, dict...) no perfil desta thread."""
+    perfil = _atual()
+    if perfil is not None:
+        perfil.medidas[nome] = valor
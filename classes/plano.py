@@ -0,0 +1,413 @@
+"""
+Plano lógico (IR) das consultas: árvore imutável de operadores da álgebra
+relacional e, abaixo deles, as expressões dos predicados.
+
+Os nós usam __slots__ (sem __dict__ por instância) e não aceitam atribuição
+depois de criados; "reescrever" um plano é sempre construir nós novos,
+reaproveitando as subárvores que não mudaram.
+"""
+from .lexer import (IDENT, NUMERO, STRING, OPERADOR, ABRE_PAR, FECHA_PAR, PALAVRAS_RESERVADAS,
+                    tokenizar, fim_do_token)
+
+
+_atribuir = object.__setattr__
+
+
+class No:
+    """Base dos nós: atributos posicionais, imutáveis, com igualdade estrutural."""
+    __slots__ = ()
+
+    def __init__(self, *valores):
+        for nome, valor in zip(self.__slots__, valores):
+            _atribuir(self, nome, valor)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def __delattr__(self, nome):
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def _valores(self):
+        return tuple(getattr(self, nome) for nome in self.__slots__)
+
+    def __eq__(self, outro):
+        return type(self) is type(outro) and self._valores() == outro._valores()
+
+    def __hash__(self):
+        return hash((type(self).__name__,) + self._valores())
+
+    def __reduce__(self):
+        # O pickle padrão usa setattr nos slots, que aqui é bloqueado
+        return (type(self), self._valores())
+
+    def __repr__(self):
+        args = ', '.join(repr(v) for v in self._valores())
+        return f"{type(self).__name__}({args})"
+
+
+# Expressões de predicado
+
+class Coluna(No):
+    """Referência a coluna: `alias.nome`, ou só `nome` quando não qualificada (alias=None)."""
+    __slots__ = ('alias', 'nome')
+
+    def __str__(self):
+        return f"{self.alias}.{self.nome}" if self.alias else self.nome
+
+
+class Literal(No):
+    """Constante: `valor` já convertido (str, int ou float) e `texto` como escrito na query."""
+    __slots__ = ('valor', 'texto')
+
+    def __str__(self):
+        return self.texto
+
+
+class Parametro(No):
+    """Marcador do i-ésimo literal em planos-modelo (ver `classes.cache`)."""
+    __slots__ = ('indice',)
+
+    def __str__(self):
+        return f"${self.indice}"
+
+
+class Comparacao(No):
+    """`esq op dir`, com op em =, <>, <, >, <=, >=."""
+    __slots__ = ('esq', 'op', 'dir')
+
+    def __str__(self):
+        return f"{self.esq} {self.op} {self.dir}"
+
+
+class Conjuncao(No):
+    """Termos ligados por AND. Quando aninhada em outra conjunção, aparece entre parênteses."""
+    __slots__ = ('termos',)
+
+    def __str__(self):
+        return ' ∧ '.join(f"({t})" if isinstance(t, Conjuncao) else str(t) for t in self.termos)
+
+
+class CondicaoBruta(No):
+    """Condição aceita pelo parser mas sem forma `operando op operando` (ex: `a = = b`)."""
+    __slots__ = ('texto', 'colunas_usadas')
+
+    def __str__(self):
+        return self.texto
+
+
+# Operadores do plano
+
+class Relacao(No):
+    """Leitura (scan) de uma tabela base."""
+    __slots__ = ('tabela',)
+
+
+class Renomear(No):
+    """ρ: renomeia a relação filha para `alias`."""
+    __slots__ = ('filho', 'alias')
+
+
+class Selecao(No):
+    """σ: filtra as tuplas do filho pelo predicado."""
+    __slots__ = ('filho', 'predicado')
+
+
+class Projecao(No):
+    """π: mantém só os `atributos` (tupla de str) do filho."""
+    __slots__ = ('filho', 'atributos')
+
+
+class Juncao(No):
+    """⨝: junção interna de `esq` e `dir` pelo predicado (×, produto cartesiano, se None)."""
+    __slots__ = ('esq', 'dir', 'predicado')
+
+
+class Vazia(No):
+    """
+    ∅: relação sem linhas, no lugar de um `filho` cujo predicado `motivo` é
+    uma contradição (ver `classes.simplificacao`). O filho só dá o esquema.
+    """
+    __slots__ = ('filho', 'motivo')
+
+
+# Consultas sobre predicados e planos
+
+def termos(predicado) -> tuple:
+    """Termos de nível superior de um predicado (o equivalente a quebrar no AND)."""
+    if predicado is None:
+        return ()
+    if isinstance(predicado, Conjuncao):
+        return predicado.termos
+    return (predicado,)
+
+
+def termos_planos(predicado) -> tuple:
+    """Como `termos`, abrindo também as conjunções aninhadas: a AND (b AND c) -> (a, b, c)."""
+    resultado = []
+    for termo in termos(predicado):
+        if isinstance(termo, Conjuncao):
+            resultado.extend(termos_planos(termo))
+        else:
+            resultado.append(termo)
+    return tuple(resultado)
+
+
+def conjuncao(lista):
+    """Monta o predicado de uma lista de termos (None se vazia)."""
+    lista = tuple(lista)
+    if not lista:
+        return None
+    if len(lista) == 1:
+        return lista[0]
+    return Conjuncao(lista)
+
+
+def colunas(predicado) -> list:
+    """Colunas referenciadas pelo predicado, na ordem em que aparecem."""
+    if isinstance(predicado, Coluna):
+        return [predicado]
+    if isinstance(predicado, Comparacao):
+        return colunas(predicado.esq) + colunas(predicado.dir)
+    if isinstance(predicado, Conjuncao):
+        resultado = []
+        for t in predicado.termos:
+            resultado.extend(colunas(t))
+        return resultado
+    if isinstance(predicado, CondicaoBruta):
+        return list(predicado.colunas_usadas)
+    return []
+
+
+def folha(no):
+    """(tabela, alias) de uma folha Relacao / ρ(Relacao); None para outros nós."""
+    if isinstance(no, Relacao):
+        return no.tabela, no.tabela
+    if isinstance(no, Renomear) and isinstance(no.filho, Relacao):
+        return no.filho.tabela, no.alias
+    return None
+
+
+def relacoes(plano) -> list:
+    """Folhas (tabela, alias) do plano, da esquerda para a direita."""
+    f = folha(plano)
+    if f is not None:
+        return [f]
+    if isinstance(plano, Juncao):
+        return relacoes(plano.esq) + relacoes(plano.dir)
+    if isinstance(plano, (Selecao, Projecao, Renomear, Vazia)):
+        return relacoes(plano.filho)
+    return []
+
+
+def cadeia_de_varredura(no):
+    """
+    Decompõe π?(σ?(ρ?(Relacao))) em (nós de cima para baixo, tabela, alias,
+    predicado, atributos), ou None se `no` não tiver essa forma.
+    """
+    nos = []
+    atributos = predicado = None
+    if isinstance(no, Projecao):
+        nos.append(no)
+        atributos = no.atributos
+        no = no.filho
+    if isinstance(no, Selecao):
+        nos.append(no)
+        predicado = no.predicado
+        no = no.filho
+    alias = None
+    if isinstance(no, Renomear):
+        nos.append(no)
+        alias = no.alias
+        no = no.filho
+    if not isinstance(no, Relacao):
+        return None
+    nos.append(no)
+    return nos, no.tabela, alias or no.tabela, predicado, atributos
+
+
+def mapear(no, funcao):
+    """
+    Reconstrói a árvore de baixo para cima aplicando `funcao` a cada nó.
+    Os campos são visitados na ordem dos slots, o que para planos literais
+    coincide com a ordem do texto da consulta. Subárvores inalteradas são
+    reaproveitadas.
+    """
+    if isinstance(no, tuple):
+        return tuple(mapear(v, funcao) for v in no)
+    if not isinstance(no, No):
+        return no
+    valores = no._valores()
+    novos = tuple(mapear(v, funcao) for v in valores)
+    if any(a is not b for a, b in zip(novos, valores)):
+        no = type(no)(*novos)
+    return funcao(no)
+
+
+def contem(no, tipo) -> bool:
+    """Algum nó da árvore é do tipo dado?"""
+    if isinstance(no, tipo):
+        return True
+    if isinstance(no, tuple):
+        return any(contem(v, tipo) for v in no)
+    if isinstance(no, No):
+        return any(contem(v, tipo) for v in no._valores())
+    return False
+
+
+# Construção a partir do texto
+
+def literal_de_token(tok):
+    """Literal de um token NUMERO/STRING (None para os demais)."""
+    tipo, valor, _ = tok
+    if tipo == NUMERO:
+        return Literal(float(valor) if '.' in valor else int(valor), valor)
+    if tipo == STRING:
+        return Literal(valor[1:-1], valor)
+    return None
+
+
+def _operando(tok):
+    tipo, valor, _ = tok
+    if tipo == NUMERO or tipo == STRING:
+        return literal_de_token(tok)
+    if tipo == IDENT or (tipo in PALAVRAS_RESERVADAS and tipo != 'AND'):
+        # palavras reservadas (exceto AND) valem como identificador em condições
+        alias, _, nome = valor.rpartition('.')
+        return Coluna(alias or None, nome)
+    return None
+
+
+def _predicado_de_tokens(texto, tokens, inicio, fim):
+    # Divide no AND de nível 0
+    partes = []
+    nivel = 0
+    comeco = inicio
+    for k in range(inicio, fim):
+        tipo = tokens[k][0]
+        if tipo == ABRE_PAR:
+            nivel += 1
+        elif tipo == FECHA_PAR:
+            nivel -= 1
+        elif tipo == 'AND' and nivel == 0:
+            partes.append((comeco, k))
+            comeco = k + 1
+    partes.append((comeco, fim))
+    return conjuncao(_termo_de_tokens(texto, tokens, i, j) for i, j in partes)
+
+
+def _termo_de_tokens(texto, tokens, inicio, fim):
+    n = fim - inicio
+    if n >= 2 and tokens[inicio][0] == ABRE_PAR and tokens[fim - 1][0] == FECHA_PAR:
+        # Só desembrulha se o primeiro "(" fecha no último ")"
+        nivel = 0
+        for k in range(inicio, fim):
+            tipo = tokens[k][0]
+            if tipo == ABRE_PAR:
+                nivel += 1
+            elif tipo == FECHA_PAR:
+                nivel -= 1
+                if nivel == 0 and k < fim - 1:
+                    break
+        else:
+            return _predicado_de_tokens(texto, tokens, inicio + 1, fim - 1)
+
+    if n == 3 and tokens[inicio + 1][0] == OPERADOR:
+        esq = _operando(tokens[inicio])
+        dir_ = _operando(tokens[inicio + 2])
+        if esq is not None and dir_ is not None:
+            return Comparacao(esq, tokens[inicio + 1][1], dir_)
+
+    trecho = texto[tokens[inicio][2]:fim_do_token(tokens[fim - 1])] if n else ''
+    usadas = tuple(
+        op for op in (_operando(tokens[k]) for k in range(inicio, fim))
+        if isinstance(op, Coluna)
+    )
+    return CondicaoBruta(trecho, usadas)
+
+
+def predicado_de_texto(texto: str):
+    """Converte o texto de uma condição já validada (WHERE / ON) em predicado."""
+    tokens = tokenizar(texto)
+    if not tokens:
+        return None
+    return _predicado_de_tokens(texto, tokens, 0, len(tokens))
+
+
+def _origem(texto: str):
+    """'tabela', 'tabela alias' ou 'tabela AS alias' -> nó folha."""
+    partes = texto.split()
+    if len(partes) == 3 and partes[1].upper() == 'AS':
+        partes = [partes[0], partes[2]]
+    if len(partes) == 2 and partes[1] != partes[0]:
+        return Renomear(Relacao(partes[0]), partes[1])
+    return Relacao(partes[0])
+
+
+def atributos_do_select(select: str) -> tuple:
+    """Atributos da projeção final ('*' -> tupla vazia, isto é, sem π)."""
+    select = select.strip()
+    if select == '*':
+        return ()
+    return tuple(s.strip() for s in select.split(','))
+
+
+def plano_literal(components: dict):
+    """
+    Plano na ordem exata da consulta:
+      π_attrs( σ_where( FROM ⨝_{on1} T1 ⨝_{on2} T2 ... ) )
+    """
+    plano = _origem(components['from'])
+    for j in components['joins']:
+        plano = Juncao(plano, _origem(j['table']), predicado_de_texto(j['on']))
+
+    if components['where']:
+        plano = Selecao(plano, predicado_de_texto(components['where']))
+
+    atributos = atributos_do_select(components['select'])
+    if atributos:
+        plano = Projecao(plano, atributos)
+    return plano
+
+
+# Impressão em álgebra relacional
+
+def para_algebra(no, estimativas=None, acessos=None) -> str:
+    """
+    Imprime o plano na notação σ/π/ρ/⨝. Com `estimativas` (dict nó -> linhas),
+    cada σ e ⨝ sai anotado com as linhas estimadas: σ_{...}[≈N](...). Com
+    `acessos` (ver `indices.escolher_acessos`), σ e ⨝ resolvidos por índice
+    mostram o índice usado: σ_{...}[índice hash T.c](...).
+    """
+    def rec(filho):
+        return para_algebra(filho, estimativas, acessos)
+
+    if isinstance(no, Relacao):
+        return no.tabela
+    if isinstance(no, Renomear):
+        origem = no.filho.tabela if isinstance(no.filho, Relacao) else rec(no.filho)
+        return f"ρ_{{{no.alias}←{origem}}}({rec(no.filho)})"
+    if isinstance(no, Selecao):
+        return f"σ_{{{no.predicado}}}{_anotacao(no, estimativas, acessos)}({rec(no.filho)})"
+    if isinstance(no, Projecao):
+        return f"π_{{{', '.join(no.atributos)}}}({rec(no.filho)})"
+    if isinstance(no, Juncao):
+        if no.predicado is None:
+            return f"({rec(no.esq)} ×{_anotacao(no, estimativas, acessos)} {rec(no.dir)})"
+        return f"({rec(no.esq)} ⨝_{{{no.predicado}}}{_anotacao(no, estimativas, acessos)} {rec(no.dir)})"
+    if isinstance(no, Vazia):
+        return f"∅_{{{no.motivo}}}"
+    raise TypeError(f"Nó de plano desconhecido: {type(no).__name__}")
+
+
+def linhas_estimadas(linhas) -> str:
+    """Texto de uma estimativa de linhas: ≈1,234."""
+    return f"≈{linhas:,.0f}"
+
+
+def _anotacao(no, estimativas, acessos=None):
+    texto = ''
+    if estimativas and no in estimativas:
+        texto += f"[{linhas_estimadas(estimativas[no])}]"
+    if acessos and no in acessos:
+        texto += f"[{acessos[no]}]"
+    return texto
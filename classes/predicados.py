@@ -0,0 +1,123 @@
+"""
+Compilação dos predicados do plano em máscaras booleanas.
+
+As condições aceitas pelo parser são conjunções de comparações
+(=, <>, <, >, <=, >=) entre colunas e literais, então cada termo vira uma
+operação vetorizada do NumPy sobre a coluna inteira e os termos são
+combinados com `&`. A avaliação linha a linha em Python fica só como
+alternativa: sem NumPy, com colunas em listas ou quando o NumPy não tem a
+comparação para os tipos envolvidos (colunas com tipos misturados, por exemplo).
+"""
+import operator
+
+from .plano import Coluna, Comparacao, Conjuncao, Literal
+
+try:
+    import numpy as np
+except ImportError:     # NumPy é opcional; listas funcionam sem ele
+    np = None
+
+
+class ErroPredicado(Exception):
+    """Predicado que não pode ser avaliado (condição não suportada, tipos incompatíveis...)."""
+
+
+OPERADORES = {
+    '=': operator.eq,
+    '<>': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+if np is not None:
+    OPERADORES_NUMPY = {
+        '=': np.equal,
+        '<>': np.not_equal,
+        '<': np.less,
+        '>': np.greater,
+        '<=': np.less_equal,
+        '>=': np.greater_equal,
+    }
+
+
+def _buscar_operando(expr):
+    """Função rel -> (valores, é_coluna) para um operando da comparação."""
+    if isinstance(expr, Coluna):
+        return lambda rel: (rel.valores(expr), True)
+    if isinstance(expr, Literal):
+        valor = expr.valor
+        return lambda rel: (valor, False)
+    raise ErroPredicado(f"Operando não suportado: {expr}")
+
+
+def _linha_a_linha(op, esq, esq_coluna, dir_, dir_coluna, n):
+    if esq_coluna and dir_coluna:
+        return [op(a, b) for a, b in zip(esq, dir_)]
+    if esq_coluna:
+        return [op(a, dir_) for a in esq]
+    if dir_coluna:
+        return [op(esq, b) for b in dir_]
+    return [op(esq, dir_)] * n
+
+
+def _compilar_comparacao(comparacao, vetorizar):
+    op = OPERADORES[comparacao.op]
+    op_numpy = OPERADORES_NUMPY[comparacao.op] if vetorizar else None
+    buscar_esq = _buscar_operando(comparacao.esq)
+    buscar_dir = _buscar_operando(comparacao.dir)
+
+    def avaliar(rel):
+        esq, esq_coluna = buscar_esq(rel)
+        dir_, dir_coluna = buscar_dir(rel)
+        if op_numpy is not None and (
+                isinstance(esq, np.ndarray) or isinstance(dir_, np.ndarray)):
+            try:
+                mascara = op_numpy(esq, dir_)
+                if isinstance(mascara, np.ndarray) and mascara.dtype == np.bool_:
+                    return mascara
+            except TypeError:
+                pass    # sem laço do NumPy para esses tipos: cai no Python
+        try:
+            mascara = _linha_a_linha(op, esq, esq_coluna, dir_, dir_coluna, rel.n)
+        except TypeError as e:
+            raise ErroPredicado(f"Tipos incompatíveis em {comparacao}: {e}") from None
+        return np.array(mascara, dtype=bool) if vetorizar else mascara
+
+    return avaliar
+
+
+def _compilar(predicado, vetorizar):
+    if isinstance(predicado, Comparacao):
+        return _compilar_comparacao(predicado, vetorizar)
+    if not isinstance(predicado, Conjuncao):
+        raise ErroPredicado(f"Condição não suportada na execução: {predicado}")
+    avaliadores = [_compilar(termo, vetorizar) for termo in predicado.termos]
+
+    if vetorizar:
+        def mascara(rel):
+            resultado = avaliadores[0](rel)
+            for avaliar in avaliadores[1:]:
+                if not resultado.any():
+                    break   # nada sobrou; os demais termos não mudam o resultado
+                resultado = resultado & avaliar(rel)
+            return resultado
+    else:
+        def mascara(rel):
+            resultado = avaliadores[0](rel)
+            for avaliar in avaliadores[1:]:
+                resultado = [a and b for a, b in zip(resultado, avaliar(rel))]
+            return resultado
+
+    return mascara
+
+
+def compilar_predicado(predicado, vetorizar=None):
+    """
+    Compila o predicado numa função rel -> máscara (array de bool com NumPy,
+    lista de bool sem). `rel` precisa de `valores(coluna)` e `n`.
+    """
+    if vetorizar is None:
+        vetorizar = np is not None
+    return _compilar(predicado, vetorizar)
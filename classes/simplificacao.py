@@ -0,0 +1,233 @@
+"""
+Simplificação dos predicados do plano otimizado.
+
+Cada σ (e cada ⨝) tem o predicado reescrito termo a termo:
+  - comparações entre dois literais são avaliadas: as verdadeiras somem e
+    uma falsa torna a consulta vazia (1 = 1, 'a' = 'b');
+  - termos repetidos saem;
+  - várias comparações com constante sobre a mesma coluna viram os limites
+    mais justos: a.x > 5 AND a.x > 3 => a.x > 5; a.x >= 2 AND a.x <= 2 => a.x = 2.
+
+Limites que não se cruzam (a.x > 5 AND a.x < 2) ou igualdades a valores
+diferentes são uma contradição: nenhuma linha passa. Como as junções são
+todas internas, o resultado da consulta inteira é vazio e o plano abaixo da
+π final vira um nó Vazia, que a execução e os desenhos não percorrem.
+
+Aqui os valores dos literais importam, então a simplificação roda sobre o
+plano concreto, depois da religação do cache (ver `classes.cache`): os
+planos-modelo, com Parametro no lugar dos literais, continuam valendo para
+qualquer valor.
+"""
+import operator
+
+from .plano import (
+    Coluna, Comparacao, Conjuncao, Juncao, Literal, Projecao, Renomear, Selecao, Vazia, conjuncao, termos,
+    termos_planos,
+)
+
+_OPERADORES = {
+    '=': operator.eq,
+    '<>': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+# `5 < a.x` é `a.x > 5`
+_INVERSO = {'=': '=', '<>': '<>', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+def _familia(valor):
+    """Valores da mesma família podem ser ordenados entre si."""
+    if isinstance(valor, (int, float)):
+        return 'numero'
+    if isinstance(valor, str):
+        return 'texto'
+    return None
+
+
+def _com_constante(termo):
+    """(coluna, op, literal) com a coluna à esquerda, ou None se o termo não for coluna op literal."""
+    if not isinstance(termo, Comparacao):
+        return None
+    if isinstance(termo.esq, Coluna) and isinstance(termo.dir, Literal):
+        return termo.esq, termo.op, termo.dir
+    if isinstance(termo.dir, Coluna) and isinstance(termo.esq, Literal):
+        return termo.dir, _INVERSO[termo.op], termo.esq
+    return None
+
+
+class _Limites:
+    """Restrições acumuladas sobre uma coluna: igualdade, limites inferior / superior e <>."""
+
+    def __init__(self):
+        self.igual = None       # Literal
+        self.inferior = None    # (Literal, inclusivo)
+        self.superior = None
+        self.diferentes = []    # Literais, na ordem da consulta
+
+    def adicionar(self, op, literal) -> bool:
+        """Junta `coluna op literal`; False se contradiz o que já havia."""
+        valor = literal.valor
+        if op == '=':
+            if self.igual is not None and self.igual.valor != valor:
+                return False
+            self.igual = self.igual or literal
+        elif op == '<>':
+            if all(d.valor != valor for d in self.diferentes):
+                self.diferentes.append(literal)
+        elif op in ('>', '>='):
+            inclusivo = op == '>='
+            atual = self.inferior
+            if (atual is None or valor > atual[0].valor
+                    or (valor == atual[0].valor and atual[1] and not inclusivo)):
+                self.inferior = (literal, inclusivo)
+        else:
+            inclusivo = op == '<='
+            atual = self.superior
+            if (atual is None or valor < atual[0].valor
+                    or (valor == atual[0].valor and atual[1] and not inclusivo)):
+                self.superior = (literal, inclusivo)
+        return True
+
+    def _dentro(self, valor) -> bool:
+        if self.inferior is not None:
+            limite, inclusivo = self.inferior
+            if valor < limite.valor or (valor == limite.valor and not inclusivo):
+                return False
+        if self.superior is not None:
+            limite, inclusivo = self.superior
+            if valor > limite.valor or (valor == limite.valor and not inclusivo):
+                return False
+        return True
+
+    def termos(self, coluna):
+        """Os termos equivalentes mais justos, ou None se nenhum valor satisfaz a coluna."""
+        if self.igual is None and self.inferior is not None and self.superior is not None:
+            (baixo, inclui_baixo), (alto, inclui_alto) = self.inferior, self.superior
+            if baixo.valor > alto.valor:
+                return None
+            if baixo.valor == alto.valor:
+                if not (inclui_baixo and inclui_alto):
+                    return None
+                self.igual = baixo      # a.x >= 2 AND a.x <= 2
+        if self.igual is not None:
+            valor = self.igual.valor
+            if not self._dentro(valor) or any(d.valor == valor for d in self.diferentes):
+                return None
+            return [Comparacao(coluna, '=', self.igual)]
+
+        resultado = []
+        if self.inferior is not None:
+            literal, inclusivo = self.inferior
+            resultado.append(Comparacao(coluna, '>=' if inclusivo else '>', literal))
+        if self.superior is not None:
+            literal, inclusivo = self.superior
+            resultado.append(Comparacao(coluna, '<=' if inclusivo else '<', literal))
+        # <> fora do intervalo já é garantido pelos limites
+        resultado.extend(Comparacao(coluna, '<>', d) for d in self.diferentes if self._dentro(d.valor))
+        return resultado
+
+
+def simplificar_predicado(predicado):
+    """
+    (predicado simplificado, contradição). O predicado pode ficar None (todos
+    os termos eram verdadeiros); a contradição é None ou a conjunção dos
+    termos originais que não podem valer juntos.
+    """
+    if not isinstance(predicado, Conjuncao) and not (
+            isinstance(predicado, Comparacao) and isinstance(predicado.esq, Literal)
+            and isinstance(predicado.dir, Literal)):
+        return predicado, None      # um termo só, sem nada para avaliar
+
+    unicos = list(dict.fromkeys(termos_planos(predicado)))
+
+    # Onde cada termo vai parar: None = removido, lista = termos no lugar dele
+    substitutos = {}
+    por_coluna = {}     # coluna -> [(posição, op, literal)]
+    for i, termo in enumerate(unicos):
+        if (isinstance(termo, Comparacao) and isinstance(termo.esq, Literal)
+                and isinstance(termo.dir, Literal)):
+            try:
+                verdadeiro = _OPERADORES[termo.op](termo.esq.valor, termo.dir.valor)
+            except TypeError:
+                continue    # '5' < 3: fica para a execução acusar
+            if not verdadeiro:
+                return predicado, termo
+            substitutos[i] = None
+            continue
+        partes = _com_constante(termo)
+        if partes is not None:
+            coluna, op, literal = partes
+            por_coluna.setdefault(coluna, []).append((i, op, literal))
+
+    for coluna, restricoes in por_coluna.items():
+        familias = {_familia(literal.valor) for _, _, literal in restricoes}
+        if len(restricoes) < 2 or len(familias) != 1 or None in familias:
+            continue    # um termo só já é o mais justo; tipos misturados não têm ordem
+        limites = _Limites()
+        novos = None
+        if all(limites.adicionar(op, literal) for _, op, literal in restricoes):
+            novos = limites.termos(coluna)
+        if novos is None:
+            return predicado, conjuncao(unicos[i] for i, _, _ in restricoes)
+        for i, _, _ in restricoes:
+            substitutos[i] = None
+        substitutos[restricoes[0][0]] = novos
+
+    originais = termos(predicado)
+    if not substitutos and len(unicos) == len(originais) and all(a is b for a, b in zip(unicos, originais)):
+        return predicado, None      # nada mudou: o mesmo objeto, sem reconstruir o plano
+    resultado = []
+    for i, termo in enumerate(unicos):
+        if i not in substitutos:
+            resultado.append(termo)
+        elif substitutos[i] is not None:
+            resultado.extend(substitutos[i])
+    return conjuncao(resultado), None
+
+
+def simplificar(plano):
+    """
+    Plano com os predicados de σ e ⨝ simplificados. Se algum deles for uma
+    contradição, o resultado é π(Vazia(...)): a π final (quando há) fica para
+    dar nome às colunas e o resto do plano é guardado no Vazia só pelo esquema.
+    σ sem nenhum termo restante some; ⨝ que ficaria sem predicado mantém o
+    original, para não virar produto cartesiano na impressão.
+    """
+    if plano is None:
+        return None
+    contradicoes = []
+
+    # Só os operadores são percorridos (não as expressões dos predicados, como
+    # em `mapear`): isto roda a cada acerto do cache de planos
+    def reescrever(no):
+        if isinstance(no, Juncao):
+            esq, dir_ = reescrever(no.esq), reescrever(no.dir)
+            if esq is not no.esq or dir_ is not no.dir:
+                no = Juncao(esq, dir_, no.predicado)
+        elif isinstance(no, (Selecao, Projecao, Renomear)):
+            filho = reescrever(no.filho)
+            if filho is not no.filho:
+                no = type(no)(filho, *no._valores()[1:])
+        if not isinstance(no, (Selecao, Juncao)):
+            return no
+
+        predicado, contradicao = simplificar_predicado(no.predicado)
+        if contradicao is not None:
+            contradicoes.append(contradicao)
+            return no
+        if predicado is no.predicado:
+            return no
+        if isinstance(no, Selecao):
+            return Selecao(no.filho, predicado) if predicado is not None else no.filho
+        return Juncao(no.esq, no.dir, predicado) if predicado is not None else no
+
+    simplificado = reescrever(plano)
+    if not contradicoes:
+        return simplificado
+    motivo = conjuncao(contradicoes)
+    if isinstance(plano, Projecao):
+        return Projecao(Vazia(plano.filho, motivo), plano.atributos)
+    return Vazia(plano, motivo)
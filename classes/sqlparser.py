@@ -1,4 +1,14 @@
-import re
+from .lexer import IDENT, tokenizar, consumir_condicao, condicao_valida, fim_do_token
+from .plano import plano_literal, para_algebra
+from .otimizador import analisar, avisos_de_juncao, otimizar
+from .simplificacao import simplificar
+from .estatisticas import EstimadorEstatisticas, estimar_linhas
+from .explicacao import FATOR_DESVIO, explicar
+from .fisico import escolher_juncoes
+from . import perfil
+
+# O executor e os índices (que trazem o NumPy) são importados só quando
+# usados: validar e otimizar consultas não precisa deles.
 
 class ParserSQL:
     def __init__(self, sql_query: str):
@@ -11,108 +21,133 @@ class ParserSQL:
             'joins': [],        # lista de {'table': 'tabela [alias]', 'on': 'condição'}
             'where': None
         }
+        self._intervalos = None     # intervalos de tokens de cada componente
+        self._plano = None
+        self._analise = None
+        self._plano_otimizado = None
+        self.estatisticas = None    # CatalogoEstatisticas usado pelo otimizador
+        self.banco = None           # executor.BancoDados mostrado na álgebra (ver usar_indices)
+        self.indices = None         # índices do banco
 
     def parse(self):
-        """Parse simples para SELECT, FROM, múltiplos INNER JOIN e WHERE."""
-        try:
-            # Cabeçalho: SELECT ... FROM ...
-            head_pat = r"""
-                ^\s*SELECT\s+(?P<select>.+?)\s+
-                FROM\s+(?P<from>\w+(?:\s+(?:AS\s+)?\w+)?)
-                (?=\s+(?:INNER\s+JOIN|WHERE|$))
-                \s*(?P<rest>.*)$
-                """
-
-            m = re.search(head_pat, self.sql_query, re.IGNORECASE | re.VERBOSE | re.DOTALL)
-            if not m:
-                self.valid = False
-                return False
-
-            self.components['select'] = m.group('select').strip()
-            self.components['from']   = m.group('from').strip()
-
-            # Resto: zero ou mais INNER JOINs seguidos
-            rest = m.group('rest') or ''
-            joins = []
-
-            join_pat = re.compile(r"""
-                ^\s*INNER\s+JOIN\s+
-                (?P<table>\w+(?:\s+\w+)?)\s+          # tabela OU "tabela alias"
-                ON\s+(?P<cond>.+?)                    # condição do ON
-                (?=\s*(?:INNER\s+JOIN|WHERE|$))       # até o próximo JOIN/WHERE/fim
-            """, re.IGNORECASE | re.VERBOSE | re.DOTALL)
-
-            while True:
-                mjoin = join_pat.search(rest)
-                if not mjoin or mjoin.start() != 0:    # precisa estar logo no início (descontando espaços)
-                    break
-
-                table  = mjoin.group('table').strip()
-                cond   = mjoin.group('cond').strip()
-
-                if not self._validar_condicao(cond):
-                    self.valid = False
-                    return False
-
-                joins.append({'table': table, 'on': cond})
-                rest = rest[mjoin.end():]              # consome esse JOIN e continua
-
-            # WHERE (se sobrou algo em 'rest', precisa ser só WHERE ...)
-            mwhere = re.match(r"^\s*(?:WHERE\s+(?P<where>.+))?\s*$", rest, re.IGNORECASE | re.DOTALL)
-            if not mwhere:
-                self.valid = False
-                return False
-
-            where = (mwhere.group('where') or '').strip()
-            if where:
-                if not self._validar_condicao(where):
-                    self.valid = False
-                    return False
-                self.components['where'] = where
-
-            self.components['joins'] = joins
-            self.valid = True
-            self.parsed = True
-            return True
+        """
+        Parse por descida recursiva sobre o fluxo de tokens do lexer:
+          consulta := SELECT lista FROM origem juncao* [WHERE condicao]
+          origem   := tabela [[AS] alias]
+          juncao   := INNER JOIN tabela [alias] ON condicao
+        As condições são validadas enquanto os tokens são consumidos.
+        """
+        with perfil.etapa('parse'):
+            return self._parse_tokens(tokenizar(self.sql_query))
 
+    def _parse_tokens(self, tokens):
+        try:
+            self.valid = self._parse_consulta(tokens)
+            self.parsed = self.valid
+            return self.valid
         except Exception:
             self.valid = False
             return False
 
+    def _parse_consulta(self, tokens):
+        n = len(tokens)
+        if n < 4 or tokens[0][0] != 'SELECT' or not self._separados(tokens[0], tokens[1]):
+            return False
+
+        # A lista do SELECT é texto livre até um FROM cercado por espaços.
+        # Se o resto não casar a partir desse FROM, tenta o próximo (como o
+        # casamento preguiçoso da regex antiga fazia).
+        for k in range(2, n - 1):
+            tok = tokens[k]
+            if (tok[0] == 'FROM'
+                    and self._separados(tokens[k - 1], tok)
+                    and self._separados(tok, tokens[k + 1])):
+                resultado = self._parse_apos_from(tokens, k + 1)
+                if resultado is not None:
+                    self._preencher_componentes(tokens, ((1, k),) + resultado)
+                    return True
+        return False
+
+    def _parse_apos_from(self, tokens, i):
+        """
+        Consome origem, JOINs e WHERE a partir de tokens[i]. Devolve os
+        intervalos de tokens (from, [(tabela, on), ...], where) ou None se inválido.
+        """
+        n = len(tokens)
+        eh_nome = self._eh_nome
+
+        # origem := tabela [[AS] alias]
+        if not eh_nome(tokens[i]):
+            return None
+        inicio_from = i
+        i += 1
+        if i + 1 < n and tokens[i][0] == 'AS' and eh_nome(tokens[i + 1]):
+            i += 2
+        elif i < n and eh_nome(tokens[i]):
+            i += 1
+        from_ = (inicio_from, i)
+
+        # juncao*
+        joins = []
+        while i < n and tokens[i][0] == 'INNER':
+            # INNER JOIN tabela [alias] ON
+            if i + 3 >= n or tokens[i + 1][0] != 'JOIN' or not eh_nome(tokens[i + 2]):
+                return None
+            inicio_tabela = i + 2
+            i += 3
+            if eh_nome(tokens[i]):
+                i += 1
+            if i + 1 >= n or tokens[i][0] != 'ON' or not self._separados(tokens[i], tokens[i + 1]):
+                return None
+            table = (inicio_tabela, i)
+
+            inicio_cond = i + 1
+            i = consumir_condicao(tokens, inicio_cond, juncao=True)
+            if i < 0:
+                return None
+            joins.append((table, (inicio_cond, i)))
+
+        # [WHERE condicao]
+        where = None
+        if i < n:
+            if tokens[i][0] != 'WHERE' or i + 1 >= n or not self._separados(tokens[i], tokens[i + 1]):
+                return None
+            if consumir_condicao(tokens, i + 1) != n:
+                return None
+            where = (i + 1, n)
+
+        return from_, joins, where
+
+    def _preencher_componentes(self, tokens, intervalos):
+        """Recorta os componentes da query a partir dos intervalos de tokens do parse."""
+        self._intervalos = intervalos
+        select, from_, joins, where = intervalos
+        self.components['select'] = self._recortar(tokens, *select)
+        self.components['from'] = self._recortar(tokens, *from_)
+        self.components['joins'] = [
+            {'table': self._recortar(tokens, *table), 'on': self._recortar(tokens, *on)}
+            for table, on in joins
+        ]
+        self.components['where'] = self._recortar(tokens, *where) if where else None
+
+    @staticmethod
+    def _eh_nome(tok):
+        """Nome simples de tabela/alias (sem qualificação e sem ser palavra reservada)."""
+        return tok[0] is IDENT and '.' not in tok[1]
+
+    @staticmethod
+    def _separados(a, b):
+        """Há espaço entre dois tokens consecutivos? (os espaços não viram tokens)"""
+        return b[2] > fim_do_token(a)
+
+    def _recortar(self, tokens, inicio, fim):
+        """Texto original entre tokens[inicio] e tokens[fim - 1], inclusive."""
+        return self.sql_query[tokens[inicio][2]:fim_do_token(tokens[fim - 1])]
+
     # Validações auxiliares
 
     def _validar_condicao(self, cond):
-        # Rejeita operadores não permitidos explicitamente
-        proibidos = [r'\bOR\b', r'\bNOT\b', r'~~', r'~', r'\bLIKE\b', r'\bIS\b', r'\bNULL\b']
-        for padrao in proibidos:
-            if re.search(padrao, cond, re.IGNORECASE):
-                return False
-
-        # Depois, aplicar a validação estrutural
-        valid_pattern = r"""
-            ^(?:\s*
-                (?:[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?   # coluna ou tabela.coluna
-                |'[^']*'                            # string
-                |\d+(?:\.\d+)?                      # número
-                |<=|>=|<>|=|<|>                     # operadores
-                |\(|\)                              # parênteses
-                |AND                                # AND permitido
-                )
-            \s*)+$"""
-        if not re.match(valid_pattern, cond, re.IGNORECASE | re.VERBOSE):
-            return False
-        return self._checar_parenteses(cond)
-
-    def _checar_parenteses(self, text):
-        count = 0
-        for ch in text:
-            if ch == '(':
-                count += 1
-            elif ch == ')':
-                count -= 1
-                if count < 0:
-                    return False
-        return count == 0
+        return condicao_valida(tokenizar(cond))
 
     # Acesso/Exibição
 
@@ -126,232 +161,171 @@ class ParserSQL:
             self.parse()
         return self.components if self.valid else None
 
-    # Conversão p/ Álgebra Relacional 
+    # Plano lógico
 
-    def to_rel_algebra(self):
-        """
-        Converte para uma expressão de Álgebra Relacional simples:
-          π_attrs( σ_where( FROM ⨝_{on1} T1 ⨝_{on2} T2 ... ) )
-        Usa ρ (rename) quando houver alias.
-        """
+    def plano_logico(self):
+        """Plano na ordem literal da consulta (None se inválida)."""
         if not self.parsed:
             self.parse()
         if not self.valid:
             return None
+        if self._plano is None:
+            with perfil.etapa('plano_logico'):
+                self._plano = plano_literal(self.components)
+        return self._plano
 
-        def format_relation(name: str) -> str:
-            parts = name.split()
-            if len(parts) == 2:    # "tabela alias"
-                table, alias = parts
-                return f"ρ_{{{alias}←{table}}}({table})"
-            return name
+    def analise(self):
+        """
+        Análise do plano literal (aliases, termos e as relações que cada um
+        cita, atributos por alias; ver `otimizador.analisar`), feita uma vez
+        e usada pelo otimizador e pelos grafos. None se inválida.
+        """
+        if self._analise is None:
+            plano = self.plano_logico()
+            if plano is None:
+                return None
+            with perfil.etapa('analise'):
+                self._analise = analisar(plano)
+        return self._analise
+
+    def avisos(self) -> list:
+        """
+        Avisos sobre a consulta (texto), como o produto cartesiano que nenhuma
+        ordem de junção evita. Vazio se não houver ou se a consulta for inválida.
+        """
+        analise = self.analise()
+        if analise is None:
+            return []
+        return avisos_de_juncao(analise.componentes, analise.tabelas)
 
-        def fmt_cond(c: str) -> str:
-            # AND -> ∧ para ficar mais “RA-like”
-            return re.sub(r"\bAND\b", "∧", c, flags=re.IGNORECASE)
+    def plano_otimizado(self):
+        """
+        Plano reescrito pelas heurísticas do otimizador, com os predicados
+        simplificados (ver `simplificacao.simplificar`). None se inválida.
+        """
+        if self._plano_otimizado is None:
+            plano = self.plano_logico()
+            if plano is None:
+                return None
+            analise = self.analise()
+            with perfil.etapa('otimizacao'):
+                plano = otimizar(plano, self._estimador(), analise)
+            with perfil.etapa('simplificacao'):
+                self._plano_otimizado = simplificar(plano)
+        return self._plano_otimizado
+
+    # Estatísticas
+
+    def usar_estatisticas(self, catalogo):
+        """
+        Passa a otimizar com as estatísticas do catálogo (None volta aos
+        valores padrão). O plano otimizado é refeito na próxima consulta.
+        """
+        self.estatisticas = catalogo
+        self._plano_otimizado = None
+        return self
 
-        # Base: FROM
-        expr = format_relation(self.components['from'])
+    def _estimador(self):
+        return EstimadorEstatisticas(self.estatisticas) if self.estatisticas is not None else None
 
-        # ⨝ para cada JOIN
-        for j in self.components['joins']:
-            right = format_relation(j['table'])
-            expr = f"({expr} ⨝_{{{fmt_cond(j['on'])}}} {right})"
+    def estimativas(self, otimizado=True):
+        """Linhas estimadas na saída de cada nó do plano (dict nó -> linhas)."""
+        plano = self.plano_otimizado() if otimizado else self.plano_logico()
+        if plano is None:
+            return None
+        with perfil.etapa('estimativas'):
+            return estimar_linhas(plano, self._estimador())
 
-        # σ WHERE (se houver)
-        if self.components['where']:
-            expr = f"σ_{{{fmt_cond(self.components['where'])}}}({expr})"
+    # Índices
+
+    def usar_indices(self, banco):
+        """
+        Passa a mostrar (álgebra e grafos) como o plano otimizado roda sobre
+        `banco` (um executor.BancoDados): onde usa os índices e o algoritmo
+        de cada junção; None desliga.
+        """
+        self.banco = banco
+        self.indices = banco.indices if banco is not None else None
+        return self
+
+    def acessos(self, otimizado=True):
+        """
+        Caminhos de acesso por índice de cada nó (ver `indices.escolher_acessos`)
+        e o algoritmo das outras junções (ver `fisico.escolher_juncoes`).
+        """
+        plano = self.plano_otimizado() if otimizado else self.plano_logico()
+        if plano is None or self.banco is None:
+            return {}
+        acessos = {}
+        if self.indices:
+            try:
+                from .indices import escolher_acessos
+            except ImportError:     # índices precisam do NumPy
+                escolher_acessos = None
+            if escolher_acessos is not None:
+                with perfil.etapa('acessos'):
+                    acessos = escolher_acessos(plano, self.indices, self._estimador())
+        with perfil.etapa('fisico'):
+            acessos.update(escolher_juncoes(plano, self._estimador(), self.banco.ordem, acessos))
+        return acessos
+
+    # Conversão p/ Álgebra Relacional
 
-        # π SELECT (se não for *)
-        select = self.components['select'].strip()
-        if select != '*':
-            # normaliza espaços e vírgulas
-            attrs = ', '.join([s.strip() for s in select.split(',')])
-            expr = f"π_{{{attrs}}}({expr})"
+    def to_rel_algebra(self):
+        """
+        Converte para uma expressão de Álgebra Relacional simples:
+          π_attrs( σ_where( FROM ⨝_{on1} T1 ⨝_{on2} T2 ... ) )
+        Usa ρ (rename) quando houver alias.
+        """
+        plano = self.plano_logico()
+        if plano is None:
+            return None
+        with perfil.etapa('algebra'):
+            return para_algebra(plano)
 
-        return expr
-    
     def otimizar_algebra_relacional(self):
         """
         Otimiza a álgebra relacional com heurísticas:
           - Push-down de seleções (σ)
           - Projeção precoce (π) com atributos necessários
-          - Evita produtos cartesianos
+          - Junções na ordem de menor custo estimado
+          - Evita produtos cartesianos (ver `avisos` quando são inevitáveis)
+          - Simplifica os predicados (contradição => ∅)
+        Com estatísticas (usar_estatisticas), σ e ⨝ saem anotados com as
+        linhas estimadas; com um banco (usar_indices), com o índice usado e
+        o algoritmo de cada junção.
         """
-        if not self.parsed:
-            self.parse()
-        if not self.valid:
+        plano = self.plano_otimizado()
+        if plano is None:
             return None
+        estimativas = self.estimativas() if self.estatisticas is not None else None
+        acessos = self.acessos()
+        with perfil.etapa('algebra_otimizada'):
+            return para_algebra(plano, estimativas, acessos)
 
-        # === ETAPA 1: Coletar todas as tabelas e aliases ===
-        tabelas = []
-        from_part = self.components['from']
-        if ' ' in from_part:
-            tabela_base, alias_base = from_part.split(' ', 1)
-            tabelas.append((tabela_base, alias_base.strip()))
-        else:
-            tabelas.append((from_part, from_part))
-
-        for join in self.components['joins']:
-            jpart = join['table']
-            if ' ' in jpart:
-                t, a = jpart.split(' ', 1)
-                tabelas.append((t, a.strip()))
-            else:
-                tabelas.append((jpart, jpart))
-
-        alias_para_tabela = {alias: nome for nome, alias in tabelas}
-        tabela_para_alias = {nome: alias for nome, alias in tabelas}
-
-        # === ETAPA 2: Coletar todos os atributos usados ===
-        atributos_usados = set()
-
-        # Atributos no SELECT
-        select = self.components['select'].strip()
-        if select != '*':
-            for attr in select.split(','):
-                attr = attr.strip()
-                atributos_usados.add(attr)
-
-        # Atributos nas condições: WHERE e ON
-        todas_condicoes = []
-        if self.components['where']:
-            todas_condicoes.extend(self._quebrar_and(self.components['where']))
-        for join in self.components['joins']:
-            todas_condicoes.append(join['on'])
-
-        for cond in todas_condicoes:
-            # Extrair todos os identificadores do tipo [tabela.]coluna
-            ids = re.findall(r'\b([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)\b', cond)
-            for id_ in ids:
-                if '.' in id_:
-                    atributos_usados.add(id_)  # ex: a.nome
-                else:
-                    # Coluna sem qualificação – ambígua; mantemos como está (não otimizamos)
-                    # Em um sistema real, exigiria qualificação ou análise de esquema
-                    pass
-
-        # === ETAPA 3: Mapear atributos por tabela/alias ===
-        atributos_por_alias = {alias: set() for _, alias in tabelas}
-
-        for attr in atributos_usados:
-            if '.' in attr:
-                prefixo, coluna = attr.split('.', 1)
-                if prefixo in atributos_por_alias:
-                    atributos_por_alias[prefixo].add(coluna)
-                else:
-                    # Pode ser nome real da tabela; tentar mapear
-                    for alias, nome_real in alias_para_tabela.items():
-                        if nome_real == prefixo:
-                            atributos_por_alias[alias].add(coluna)
-                            break
-            else:
-                # Atributo não qualificado – não sabemos de qual tabela é.
-                # Para segurança, **não aplicamos projeção** nesse caso.
-                # Mas como nosso parser exige qualificação em joins, isso é raro.
-                pass
-
-        # === ETAPA 4: Analisar WHERE para seleções por tabela ===
-        selecoes_por_tabela = {alias: [] for _, alias in tabelas}
-        condicoes_multiplas = []
-
-        where = self.components['where']
-        if where:
-            condicoes = self._quebrar_and(where)
-            for cond in condicoes:
-                tabelas_na_cond = self._extrair_tabelas_da_condicao(cond, alias_para_tabela)
-                if len(tabelas_na_cond) == 1:
-                    tabela_unica = list(tabelas_na_cond)[0]
-                    selecoes_por_tabela[tabela_unica].append(cond)
-                else:
-                    condicoes_multiplas.append(cond)
-
-        # === ETAPA 5: Construir expressões com σ e π precoces ===
-        expressoes_tabela = {}
-
-        for nome_real, alias in tabelas:
-            expr = nome_real
-
-            # Renomeação se necessário
-            if alias != nome_real:
-                expr = f"ρ_{{{alias}←{nome_real}}}({nome_real})"
-
-            # Seleção (σ) se houver
-            if selecoes_por_tabela[alias]:
-                cond_join = " ∧ ".join(selecoes_por_tabela[alias])
-                expr = f"σ_{{{cond_join}}}({expr})"
-
-            # Projeção (π) com atributos necessários
-            attrs_necessarios = atributos_por_alias[alias]
-            if attrs_necessarios:
-                # Incluir também atributos usados nas condições de junção (ON)
-                # Já estão em `atributos_usados`, então ok.
-                attrs_list = ', '.join(sorted(attrs_necessarios))
-                expr = f"π_{{{attrs_list}}}({expr})"
-            # Se não soubermos os atributos (ex: SELECT *), não aplicamos π
-
-            expressoes_tabela[alias] = expr
-
-        # === ETAPA 6: Montar junções na ordem original ===
-        aliases_ordem = [alias for _, alias in tabelas]
-        expr_atual = expressoes_tabela[aliases_ordem[0]]
-
-        for i in range(1, len(aliases_ordem)):
-            alias_atual = aliases_ordem[i]
-            join_info = self.components['joins'][i - 1]
-            cond_join = join_info['on']
-            relacao_atual = expressoes_tabela[alias_atual]
-            expr_atual = f"({expr_atual} ⨝_{{{cond_join}}} {relacao_atual})"
-
-        # === ETAPA 7: Condições multi-tabela (WHERE) ===
-        if condicoes_multiplas:
-            cond_final = " ∧ ".join(condicoes_multiplas)
-            expr_atual = f"σ_{{{cond_final}}}({expr_atual})"
-
-        # === ETAPA 8: Projeção final (se SELECT não for *) ===
-        if select != '*':
-            attrs_finais = ', '.join([s.strip() for s in select.split(',')])
-            expr_atual = f"π_{{{attrs_finais}}}({expr_atual})"
-
-        return expr_atual
-
-    def _quebrar_and(self, condicao: str) -> list:
-        """Quebra uma condição com AND em partes, respeitando parênteses."""
-        partes = []
-        nivel = 0
-        inicio = 0
-        for i, ch in enumerate(condicao):
-            if ch == '(':
-                nivel += 1
-            elif ch == ')':
-                nivel -= 1
-            elif nivel == 0 and condicao[i:i+3].upper() == 'AND':
-                partes.append(condicao[inicio:i].strip())
-                inicio = i + 3
-        partes.append(condicao[inicio:].strip())
-        return partes
-
-    def _extrair_tabelas_da_condicao(self, condicao: str, alias_para_tabela: dict) -> set:
-        """Extrai os aliases (ou nomes de tabelas) usados em uma condição."""
-        # Padrão para identificadores: [tabela.]coluna
-        ids = re.findall(r'\b([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)\b', condicao)
-        tabelas_usadas = set()
-        for id_ in ids:
-            if '.' in id_:
-                prefixo = id_.split('.')[0]
-                if prefixo in alias_para_tabela:
-                    tabelas_usadas.add(prefixo)
-                elif prefixo in alias_para_tabela.values():
-                    # Caso o nome real seja usado diretamente
-                    for alias, nome in alias_para_tabela.items():
-                        if nome == prefixo:
-                            tabelas_usadas.add(alias)
-                            break
-            else:
-                # Coluna sem qualificação – ambígua, consideramos todas? 
-                # Para simplicidade, ignoramos (ou assumimos que não ocorre em queries válidas)
-                pass
-        return tabelas_usadas
+    # Execução
+
+    def executar(self, banco, otimizado=True, workers=None):
+        """
+        Executa o plano (otimizado ou literal) sobre as tabelas de `banco`
+        (um executor.BancoDados). None se a consulta for inválida. `workers`
+        é o número de processos dos hash joins paralelos (None: um por núcleo).
+        """
+        from .executor import executar
+
+        plano = self.plano_otimizado() if otimizado else self.plano_logico()
+        if plano is None:
+            return None
+        with perfil.etapa('execucao'):
+            return executar(plano, banco, self._estimador(), workers)
+
+    def explicar(self, banco, limiar=FATOR_DESVIO):
+        """
+        EXPLAIN ANALYZE: executa os dois planos sobre `banco` e devolve uma
+        explicacao.ExplicacaoConsulta com as linhas reais de cada operador ao
+        lado das estimadas (com `usar_estatisticas`). None se for inválida.
+        """
+        return explicar(self, banco, limiar)
 
     def print_components(self):
         if not self.parsed:
@@ -380,3 +354,5 @@ class ParserSQL:
         if ra_otimizada:
             print("\nÁlgebra Relacional (Otimizada):")
             print(f"  {ra_otimizada}")
+        for aviso in self.avisos():
+            print(f"\nAviso: {aviso}")
@@ -1,5 +1,9 @@
+import argparse
+from contextlib import nullcontext
+
 from classes import ParserSQL
 from classes.grafos import gerar_grafos_otimizados
+from classes.perfil import perfilar
 
 queries = [
     # Consultas válidas
@@ -21,16 +25,28 @@ queries = [
 ]
 
 
-for i, query in enumerate(queries):
-    print(f"\n--- Consulta {i+1} ---")
-    print(f"SQL: {query}")
-    parser = ParserSQL(query)
-    parser.print_components()
-
+def main(argv=None):
+    args = argparse.ArgumentParser(description="Analisa as consultas de exemplo e gera os grafos.")
+    args.add_argument('--profile', action='store_true',
+                      help="mostra o tempo e as alocações de cada etapa de cada consulta")
+    args.add_argument('--profile-memoria', action='store_true',
+                      help="com --profile, mede também o pico de memória (tracemalloc, mais lento)")
+    args = args.parse_args(argv)
 
-if __name__ == "__main__":
     for i, query in enumerate(queries, 1):
-        print(f"\n{'='*50}")
-        print(f"Gerando grafos para Consulta {i}")
+        print(f"\n--- Consulta {i} ---")
         print(f"SQL: {query}")
-        gerar_grafos_otimizados(query, f"query_{i}")
\ No newline at end of file
+        with perfilar(args.profile_memoria) if args.profile else nullcontext() as perfil:
+            parser = ParserSQL(query)
+            parser.print_components()
+
+            print(f"\n{'='*50}")
+            print(f"Gerando grafos para Consulta {i}")
+            gerar_grafos_otimizados(parser, f"query_{i}")
+        if perfil is not None:
+            print("\nPerfil:")
+            print(perfil.tabela())
+
+
+if __name__ == "__main__":
+    main()